@@ -1,41 +1,16 @@
 '''Assembles a short-list of buyable stocks based on the market data and saves
 it into a csv file.
+
+Kept for the shortcuts, same as: python peter.py --debug screen
 '''
 
-__last_change__ = '2017.08.30.'
+__last_change__ = '2026.10.18.'
 
-import configparser
-import os
-import logging
-import marketdata
-import registry
-import screener
+import peter
 import sys
 
 def main():
-
-    config = configparser.ConfigParser()
-    config.read('config.ini')
-
-##    logging.basicConfig(level=logging.INFO)
-    logging.basicConfig(level=logging.DEBUG)
-    
-    reg = registry.Registry()
-
-    market_data = marketdata.MarketData()
-    market_data.load_from_file()
-    
-### ??? ###
-
-
-##    slist = screener.ShortList()
-##    scr = screener.Screener()
-##    slist.assemble(scr)
-##
-##    slist.save_to_file()
-
-    # wait for key stroke
-    os.system('pause')
+    return peter.main(['--debug', 'screen'])
 
 if __name__ == '__main__':
     sys.exit(main())
@@ -0,0 +1,204 @@
+'''
+Backtests the screener rules over the stored market data for a grid of
+(fast SMA, slow SMA) pairs, to help choosing the windows of the config.
+
+Two rules are replayed over the price matrix of the Screener:
+- Crossover: the fast SMA crosses above the slow one,
+- TAZ: in an uptrend (fast SMA above the slow one) the close enters the TAZ
+  (the zone between the two SMAs).
+Each signal is judged by the return of the close 'Holding days' trading days
+later, a hit being a positive return.
+
+The pairs are evaluated in a process pool, the price matrix is put into
+shared memory once instead of being pickled to each worker.
+
+Usage: python backtest.py
+'''
+
+__last_change__ = '2026.10.18.'
+
+import concurrent.futures
+import csv_helper
+import logging
+import marketdata
+import multiprocessing.shared_memory
+import numpy
+import screener
+import settings
+import sys
+import time
+
+config = settings.config
+
+def _range_from_config(value):
+    '''Returns a range from a 'start, stop[, step]' config value.'''
+
+    return range(*(int(item) for item in value.split(',')))
+
+fast_range = _range_from_config(config['Backtest']['Fast SMA range'])
+slow_range = _range_from_config(config['Backtest']['Slow SMA range'])
+holding_days = config['Backtest'].getint('Holding days')
+_workers = config['Backtest'].getint('Workers')
+results_filename = config['Backtest']['Results filename']
+
+rules = ('Crossover', 'TAZ')
+
+header = ('Fast SMA', 'Slow SMA', 'Rule', 'Signals', 'Hit Rate', 'Mean Return')
+
+# the price matrix of a worker process, attached to the shared memory
+_shared = {}
+
+def backtest(closes, fasts=None, slows=None, holding=None, workers=None):
+    '''
+    Returns the results of every (fast, slow) pair with fast < slow, as
+    (fast, slow, rule, signals, hit rate, mean return) tuples sorted by the
+    pair and the rule.
+
+    Args:
+        closes: the price matrix (ISINs x trading days) of a Screener.
+        fasts, slows: optional ranges of the windows, default from config.
+        holding: optional number of days a signal is judged after.
+        workers: optional number of processes, 1 runs in this process.
+    '''
+
+    fasts = fasts or fast_range
+    slows = slows or slow_range
+    holding = holding or holding_days
+    workers = workers or _workers
+
+    tasks = [(fast, [slow for slow in slows if slow > fast], holding)
+             for fast in fasts]
+    tasks = [task for task in tasks if task[1]]
+    logging.info('Backtest: %d pair(s) over %d ISIN(s) x %d day(s).',
+                 sum(len(task[1]) for task in tasks),
+                 closes.shape[0], closes.shape[1])
+
+    if workers <= 1:
+        _shared['closes'] = closes
+        try:
+            results = [_task_results(task) for task in tasks]
+        finally:
+            _shared.clear()
+        return [row for rows in results for row in rows]
+
+    memory = multiprocessing.shared_memory.SharedMemory(create=True,
+                                                        size=max(closes.nbytes, 1))
+    try:
+        numpy.ndarray(closes.shape, dtype=closes.dtype,
+                      buffer=memory.buf)[...] = closes
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach,
+            initargs=(memory.name, closes.shape, closes.dtype.str))
+        with executor:
+            results = list(executor.map(_task_results, tasks))
+    finally:
+        memory.close()
+        memory.unlink()
+
+    return [row for rows in results for row in rows]
+
+def _attach(name, shape, dtype):
+    '''Attaches a worker process to the price matrix in shared memory.'''
+
+    _shared['memory'] = multiprocessing.shared_memory.SharedMemory(name=name)
+    _shared['closes'] = numpy.ndarray(shape, dtype=dtype,
+                                      buffer=_shared['memory'].buf)
+
+def _task_results(task):
+    '''Returns the results of one fast window with all its slow ones.'''
+
+    fast, slows, holding = task
+    closes = _shared['closes']
+    returns = _forward_returns(closes, holding)
+    fast_sma = screener.moving_average(closes, fast)
+
+    results = []
+    for slow in slows:
+        slow_sma = screener.moving_average(closes, slow)
+        for rule, signals in zip(rules, _signals(closes, fast_sma, slow_sma)):
+            results.append((fast, slow, rule) + _judged(signals, returns))
+    return results
+
+def _forward_returns(closes, holding):
+    '''Returns the return of each close 'holding' days later, NaN where
+    there is no such close.'''
+
+    returns = numpy.full(closes.shape, numpy.nan)
+    if holding < closes.shape[1]:
+        returns[:, :-holding] = closes[:, holding:] / closes[:, :-holding] - 1
+    return returns
+
+def _signals(closes, fast_sma, slow_sma):
+    '''Returns the boolean matrices of the Crossover and the TAZ rules.
+    Comparisons with NaN are False, so there is no signal without full
+    windows.'''
+
+    uptrend = fast_sma > slow_sma
+    in_taz = uptrend & (closes >= slow_sma) & (closes <= fast_sma)
+
+    crossover = numpy.zeros(closes.shape, dtype=bool)
+    crossover[:, 1:] = uptrend[:, 1:] & (fast_sma[:, :-1] <= slow_sma[:, :-1])
+    taz_entry = numpy.zeros(closes.shape, dtype=bool)
+    taz_entry[:, 1:] = in_taz[:, 1:] & ~in_taz[:, :-1]
+
+    return crossover, taz_entry
+
+def _judged(signals, returns):
+    '''Returns (number of signals, hit rate, mean return) of the signals
+    having a forward return.'''
+
+    signal_returns = returns[signals & ~numpy.isnan(returns)]
+    if not len(signal_returns):
+        return (0, numpy.nan, numpy.nan)
+    return (len(signal_returns),
+            float(numpy.count_nonzero(signal_returns > 0) / len(signal_returns)),
+            float(signal_returns.mean()))
+
+def save_to_file(results, filename=None):
+    '''Streams the results into a CSV file.'''
+
+    csv_helper.iter_writer(((fast, slow, rule, signals,
+                             _number_to_string(hit_rate),
+                             _number_to_string(mean_return))
+                            for fast, slow, rule, signals, hit_rate, mean_return
+                            in results),
+                           filename or results_filename,
+                           header=header,
+                           encoding=config['DEFAULT']['CSV encoding'])
+
+def _number_to_string(number):
+    '''Returns the number with decimal comma, empty for NaN.'''
+
+    if numpy.isnan(number):
+        return ''
+    return '{:.4f}'.format(number).replace('.', ',')
+
+def main():
+    '''Backtests the configured grid over the stored market data and saves
+    the results.'''
+
+    logging.basicConfig(level=logging.INFO)
+
+    market_data = marketdata.MarketData()
+    market_data.load_from_file()
+
+    scr = screener.Screener()
+    scr.load(market_data.marketdata)
+
+    start = time.perf_counter()
+    results = backtest(scr.closes)
+    logging.info('Backtest: %d result(s) in %.2f s.',
+                 len(results), time.perf_counter() - start)
+
+    for fast, slow, rule, signals, hit_rate, mean_return in sorted(
+            (result for result in results if result[3]),
+            key=lambda result: result[5], reverse=True)[:10]:
+        logging.info('Backtest: %s %d/%d: %d signal(s), hit rate %.1f%%, '
+                     'mean return %.2f%%.',
+                     rule, fast, slow, signals, 100 * hit_rate, 100 * mean_return)
+
+    save_to_file(results)
+
+if __name__ == '__main__':
+    sys.exit(main())
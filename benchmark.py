@@ -0,0 +1,515 @@
+'''
+Benchmarks of the Peter project, run on the files bundled in the repository.
+
+The pipeline benchmark times the stages of the daily run (HTML parse, CSV
+load, append, clean, save, registry load) on exp.htm, the snapshot CSVs,
+registry.csv and ISIN.csv, with warm-up and repeated runs. Its results can be
+saved as JSON and compared with a baseline saved earlier, failing if a stage
+got slower by more than the regression threshold.
+
+Usage: python benchmark.py [--pipeline] [--save [file]] [--compare baseline]
+                           [--threshold percent] [--warmup n] [--repeat n]
+'''
+
+__last_change__ = '2026.10.18.'
+
+import argparse
+import csv_helper
+import datetime
+import datetime_helper
+import gc
+import json
+import logging
+import os
+import platform
+import settings
+import statistics
+import sys
+import teletrader
+import tempfile
+import time
+import tracemalloc
+
+config = settings.config
+
+warmup_runs = config['Benchmark'].getint('Warm-up runs')
+repeated_runs = config['Benchmark'].getint('Repeated runs')
+# percent a stage may get slower than the baseline
+regression_threshold = config['Benchmark'].getfloat('Regression threshold')
+results_filename = config['Benchmark']['Results filename']
+
+# the exported daily snapshots (comma separated, UTF-8 with BOM)
+snapshot_filenames = ('2018-07-20-17-39.csv',
+                      '2018-07-23-17-39.csv')
+snapshot_delimiter = ','
+snapshot_encoding = 'utf-8-sig'
+snapshot_converters = {
+    'Closing Price': csv_helper.to_decimal,
+    'DateTime': csv_helper.to_datetime('%m/%d/%Y %I:%M:%S %p'),
+    'Volumen': csv_helper.to_int,
+    'Previous Day Closing Price': csv_helper.to_decimal}
+
+def measured(function, *args):
+    '''Runs the function twice and returns its result, the elapsed time in
+    seconds (untraced run) and the peak of the memory allocated in bytes
+    (traced run, as tracing slows the execution down).'''
+
+    gc.collect()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def csv_reading():
+    '''Compares the list-building reader with the streaming, typed reader
+    on the snapshot CSVs. Returns a list of (case, rows, seconds, bytes).'''
+
+    def list_reader(filename):
+        rows = csv_helper.reader(filename,
+                                 delimiter=snapshot_delimiter,
+                                 encoding=snapshot_encoding)
+        return len(rows)
+
+    def streaming_reader(filename):
+        return sum(1 for row in csv_helper.iter_reader(
+            filename,
+            delimiter=snapshot_delimiter,
+            encoding=snapshot_encoding))
+
+    def streaming_typed_reader(filename):
+        return sum(1 for row in csv_helper.iter_reader(
+            filename,
+            delimiter=snapshot_delimiter,
+            encoding=snapshot_encoding,
+            converters=snapshot_converters,
+            as_tuple=True))
+
+    results = []
+    for filename in snapshot_filenames:
+        for case, function in (('reader', list_reader),
+                               ('iter_reader', streaming_reader),
+                               ('iter_reader typed tuples', streaming_typed_reader)):
+            rows, elapsed, peak = measured(function, filename)
+            results.append((filename + ' ' + case, rows, elapsed, peak))
+    return results
+
+def csv_writing():
+    '''Compares writing a built list with writing from a generator.
+    Returns a list of (case, rows, seconds, bytes).'''
+
+    header = ('Name', 'ISIN', 'Closing Price', 'DateTime', 'Volumen',
+              'Previous Day Closing Price', 'Stock Exchange')
+
+    def list_writer(source, target):
+        content = [header]
+        content.extend(csv_helper.iter_reader(source,
+                                              delimiter=snapshot_delimiter,
+                                              encoding=snapshot_encoding,
+                                              as_tuple=True))
+        csv_helper.writer(content, target)
+        return len(content) - 1
+
+    def streaming_writer(source, target):
+        return csv_helper.iter_writer(
+            csv_helper.iter_reader(source,
+                                   delimiter=snapshot_delimiter,
+                                   encoding=snapshot_encoding,
+                                   as_tuple=True),
+            target,
+            header=header)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        target = os.path.join(directory, 'output.csv')
+        for filename in snapshot_filenames:
+            for case, function in (('writer', list_writer),
+                                   ('iter_writer', streaming_writer)):
+                rows, elapsed, peak = measured(function, filename, target)
+                results.append((filename + ' ' + case, rows, elapsed, peak))
+    return results
+
+def timestamp_decoding():
+    '''Compares strptime with DateTimeDecoder on the Date and Time columns of
+    a year of market data of 300 ISINs. Returns a list of
+    (case, rows, seconds, bytes).'''
+
+    first_day = datetime.date(2017, 1, 2)
+    rows = [((first_day + datetime.timedelta(days=day)).strftime('%Y.%m.%d'),
+             '17:35:00')
+            for day in range(365)
+            for isin in range(300)]
+
+    def strptime_decoding():
+        for date_string, time_string in rows:
+            date = datetime.datetime.strptime(date_string, '%Y.%m.%d')
+            time = datetime.datetime.strptime(time_string, '%H:%M:%S')
+            datetime.datetime(date.year, date.month, date.day,
+                              time.hour, time.minute, time.second)
+        return len(rows)
+
+    def decoder_decoding():
+        decode_date = datetime_helper.DateTimeDecoder('%Y.%m.%d')
+        decode_time = datetime_helper.DateTimeDecoder('%H:%M:%S')
+        for date_string, time_string in rows:
+            date = decode_date(date_string)
+            time = decode_time(time_string)
+            datetime.datetime(date.year, date.month, date.day,
+                              time.hour, time.minute, time.second)
+        return len(rows)
+
+    return [(case, *measured(function))
+            for case, function in (('strptime', strptime_decoding),
+                                   ('DateTimeDecoder', decoder_decoding))]
+
+class CallbackTeletraderHTMLParser(teletrader.TeletraderHTMLParser):
+    '''The former matcher of TeletraderHTMLParser, comparing pattern tuples
+    on each event. Kept as the baseline of html_parsing.'''
+
+    def handle_starttag(self, tag, attrs):
+        if teletrader.pattern[self.pattern_counter] == ('start', tag):
+            self.pattern_counter += 1
+
+    def handle_endtag(self, tag):
+        if teletrader.pattern[self.pattern_counter] == ('end', tag):
+            if tag == 'tr':
+                self.pattern_counter = 0
+                self.actual_stock.append(str(self.stock_exchange))
+                self.stocks.append(self.actual_stock)
+                self.actual_stock = []
+            else : self.pattern_counter += 1
+        elif tag == 'tr' or tag == 'td':
+            self.pattern_counter = 0
+            self.actual_stock = []
+
+    def handle_data(self, data):
+        if teletrader.pattern[self.pattern_counter] == ('data', 'read'):
+            self.pattern_counter += 1
+            self.actual_stock.append(data)
+
+class _CountingHTMLParser(teletrader.HTMLParser):
+    '''Counts the events of a page.'''
+
+    def __init__(self):
+        teletrader.HTMLParser.__init__(self)
+        self.events = 0
+
+    def handle_starttag(self, tag, attrs):
+        self.events += 1
+
+    def handle_endtag(self, tag):
+        self.events += 1
+
+    def handle_data(self, data):
+        self.events += 1
+
+def synthetic_page(rows):
+    '''Returns exp.htm with its stock table rows repeated to the given
+    number of rows.'''
+
+    with open('exp.htm', encoding='utf-8') as f:
+        page = f.read()
+
+    first = page.index('<tr><td title=')
+    last = page.index('</tr>', page.rindex('<tr><td title=')) + len('</tr>')
+    table_rows = page[first:last].replace('</tr><tr>', '</tr>\n<tr>').split('\n')
+
+    repeated = ''.join(table_rows[index % len(table_rows)]
+                       for index in range(rows))
+    return page[:first] + repeated + page[last:]
+
+def html_parsing(repeat=5):
+    '''Compares the callback and the table-driven matcher on exp.htm and on a
+    synthetic page of 5000 rows. Returns a list of
+    (case, rows, events/s, rows/s).'''
+
+    with open('exp.htm', encoding='utf-8') as f:
+        pages = (('exp.htm', f.read()),
+                 ('synthetic 5000 rows', synthetic_page(5000)))
+
+    results = []
+    for name, page in pages:
+        counter = _CountingHTMLParser()
+        counter.feed(page)
+
+        stocks = {}
+        for case, parser_class in (('callback matcher', CallbackTeletraderHTMLParser),
+                                   ('table matcher', teletrader.TeletraderHTMLParser)):
+            elapsed = []
+            for _ in range(repeat):
+                t = parser_class('Benchmark')
+                start = time.perf_counter()
+                t.feed(page)
+                t.close()
+                elapsed.append(time.perf_counter() - start)
+            stocks[case] = t.stocks
+            best = min(elapsed)
+            results.append((name + ' ' + case,
+                            len(t.stocks),
+                            counter.events / best,
+                            len(t.stocks) / best))
+
+        if stocks['callback matcher'] != stocks['table matcher']:
+            raise AssertionError('The matchers parsed different rows: ' + name)
+
+    return results
+
+def timed(function, setup=None, warmup=None, repeat=None):
+    '''Runs the function the warm-up times, then the repeat times, and
+    returns the elapsed seconds of the repeated runs. The setup (if any)
+    returns the arguments of each run, and is not timed.'''
+
+    warmup = warmup if warmup is not None else warmup_runs
+    repeat = repeat if repeat is not None else repeated_runs
+
+    elapsed = []
+    for run in range(warmup + repeat):
+        args = setup() if setup else ()
+        gc.collect()
+        start = time.perf_counter()
+        function(*args)
+        if run >= warmup:
+            elapsed.append(time.perf_counter() - start)
+    return elapsed
+
+class _PipelineFiles(object):
+    '''Redirects the files written by the pipeline into a directory, and
+    keeps the stages quiet.'''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.saved = []
+
+    def __enter__(self):
+        import marketdata_coupler as mdc
+
+        for module, name, value in (
+                (mdc, '_market_data_filename',
+                 os.path.join(self.directory, 'market_data.csv')),
+                (mdc, 'storage_format', 'csv'),
+                (mdc, 'incremental_save', False),
+                (mdc, 'retention_days', mdc.retention_days),
+                (teletrader, 'tt_resolved_filename',
+                 os.path.join(self.directory, 'ISIN.resolved.csv'))):
+            self.saved.append((module, name, getattr(module, name)))
+            setattr(module, name, value)
+        logging.disable(logging.CRITICAL)
+        return self
+
+    def __exit__(self, *exc_info):
+        logging.disable(logging.NOTSET)
+        for module, name, value in reversed(self.saved):
+            setattr(module, name, value)
+
+def pipeline(warmup=None, repeat=None):
+    '''
+    Times the stages of the daily run on the bundled files. Returns a dict
+    of stage -> elapsed seconds of the repeated runs.
+
+    The market data is the one of the snapshots: the first snapshot is the
+    stored data the second one is appended to, and clean deletes the older
+    half of the days.
+    '''
+
+    import marketdata
+    import marketdata_coupler as mdc
+    import marketdata_htmlparser as mdhp
+    import registry
+    import snapshot_importer
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, _PipelineFiles(directory):
+        converter = teletrader.TTConverter()
+        batches = [snapshot_importer._deduplicated(
+                       snapshot_importer._parsed_snapshot(filename), converter)
+                   for filename in snapshot_filenames]
+
+        def market_data(*batches):
+            data = marketdata.MarketData()
+            for batch in batches:
+                data.append(batch)
+            return data
+
+        full = market_data(*batches)
+        full.save_to_file()
+        days = sorted({this_datetime.date()
+                       for isin in full.marketdata
+                       for this_datetime in full.series(isin)})
+        mdc.retention_days = (datetime.date.today() - days[len(days) // 2]).days
+
+        def loaded():
+            data = marketdata.MarketData()
+            data.marketdata = mdc.loaded_past_market_data(converter)
+            return (data,)
+
+        def changed():
+            data, = loaded()
+            data.changed_after_load = True
+            return (data,)
+
+        registry_filename = 'registry.csv'
+        cache_filename = os.path.join(directory, 'registry.cache')
+
+        def uncached():
+            if os.path.exists(cache_filename):
+                os.remove(cache_filename)
+            return ()
+
+        stages = (
+            ('ISIN converter load', teletrader.TTConverter, None),
+            ('HTML parse', lambda: mdhp.loaded_market_data(converter, False), None),
+            ('CSV load', lambda: mdc.loaded_past_market_data(converter), None),
+            ('MarketData.append', lambda data: data.append(batches[1]),
+             lambda: (market_data(batches[0]),)),
+            ('MarketData.clean', lambda data: data.clean(), loaded),
+            ('MarketData.save_to_file', lambda data: data.save_to_file(), changed),
+            ('Registry load', lambda: registry.Registry().load_from_file(
+                registry_filename, cache_filename), uncached),
+            ('Registry load (cached)', lambda: registry.Registry().load_from_file(
+                registry_filename, cache_filename), None))
+
+        for stage, function, setup in stages:
+            results[stage] = timed(function, setup, warmup, repeat)
+    return results
+
+def save_results(results, filename=None):
+    '''Saves the pipeline results as JSON, in milliseconds.'''
+
+    content = {'Created': datetime.datetime.now().isoformat(timespec='seconds'),
+               'Python': platform.python_version(),
+               'Stages': {stage: {'Runs': [seconds * 1000 for seconds in elapsed],
+                                  'Minimum': min(elapsed) * 1000,
+                                  'Median': statistics.median(elapsed) * 1000}
+                          for stage, elapsed in results.items()}}
+    with open(filename or results_filename, 'w', encoding='utf-8') as f:
+        json.dump(content, f, indent=2)
+
+def loaded_results(filename):
+    '''Returns the stage -> minimum milliseconds of saved results.'''
+
+    with open(filename, encoding='utf-8') as f:
+        content = json.load(f)
+    return {stage: values['Minimum'] for stage, values in content['Stages'].items()}
+
+def compared(results, baseline, threshold=None):
+    '''
+    Returns the comparison of the pipeline results with the baseline minimums
+    as (stage, baseline ms, ms, change percent, regressed) tuples. The
+    fastest runs are compared, as they are the least disturbed by the other
+    load of the machine. The stages missing from the baseline are not
+    compared.
+    '''
+
+    threshold = threshold if threshold is not None else regression_threshold
+
+    comparison = []
+    for stage, elapsed in results.items():
+        if stage not in baseline:
+            continue
+        milliseconds = min(elapsed) * 1000
+        change = (milliseconds / baseline[stage] - 1) * 100 if baseline[stage] else 0.0
+        comparison.append((stage, baseline[stage], milliseconds, change,
+                           change > threshold))
+    return comparison
+
+def report_pipeline(title, results):
+    '''Prints the pipeline results as a table.'''
+
+    print(title)
+    print('{:<50} {:>8} {:>10} {:>10}'.format('Stage', 'Runs', 'Min ms', 'Median ms'))
+    for stage, elapsed in results.items():
+        print('{:<50} {:>8} {:>10.1f} {:>10.1f}'.format(
+            stage, len(elapsed), min(elapsed) * 1000,
+            statistics.median(elapsed) * 1000))
+    print()
+
+def report_comparison(title, comparison, threshold=None):
+    '''Prints the comparison with the baseline as a table.'''
+
+    threshold = threshold if threshold is not None else regression_threshold
+
+    print('{} (regression threshold: {:.0f}%)'.format(title, threshold))
+    print('{:<50} {:>10} {:>10} {:>8}'.format('Stage', 'Base ms', 'Min ms',
+                                              'Change'))
+    for stage, baseline, milliseconds, change, regressed in comparison:
+        print('{:<50} {:>10.1f} {:>10.1f} {:>+7.1f}%{}'.format(
+            stage, baseline, milliseconds, change,
+            ' REGRESSED' if regressed else ''))
+    print()
+
+def report_rates(title, results):
+    '''Prints the parsing results as a table.'''
+
+    print(title)
+    print('{:<50} {:>8} {:>12} {:>12}'.format('Case', 'Rows', 'Events/s', 'Rows/s'))
+    for case, rows, events_rate, rows_rate in results:
+        print('{:<50} {:>8} {:>12.0f} {:>12.0f}'.format(case,
+                                                         rows,
+                                                         events_rate,
+                                                         rows_rate))
+    print()
+
+def report(title, results):
+    '''Prints the results as a table.'''
+
+    print(title)
+    print('{:<50} {:>8} {:>10} {:>12}'.format('Case', 'Rows', 'ms', 'Peak KiB'))
+    for case, rows, elapsed, peak in results:
+        print('{:<50} {:>8} {:>10.1f} {:>12.1f}'.format(case,
+                                                         rows,
+                                                         elapsed * 1000,
+                                                         peak / 1024))
+    print()
+
+def main(argv=None):
+    '''Runs the benchmarks and prints the results. Returns 1 if a stage of
+    the pipeline regressed compared with the baseline.'''
+
+    parser = argparse.ArgumentParser(description='Benchmarks of the Peter project.')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='run the pipeline benchmark only')
+    parser.add_argument('--save', nargs='?', const=results_filename,
+                        help='save the pipeline results as JSON '
+                             '(default: %(const)s)')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='compare the pipeline results with saved ones')
+    parser.add_argument('--threshold', type=float, default=regression_threshold,
+                        help='percent a stage may get slower '
+                             '(default: %(default)s)')
+    parser.add_argument('--warmup', type=int, default=warmup_runs,
+                        help='warm-up runs per stage (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=repeated_runs,
+                        help='timed runs per stage (default: %(default)s)')
+    arguments = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if not arguments.pipeline:
+        report('CSV reading', csv_reading())
+        report('CSV writing', csv_writing())
+        report('Timestamp decoding', timestamp_decoding())
+        report_rates('HTML parsing', html_parsing())
+
+    results = pipeline(arguments.warmup, arguments.repeat)
+    report_pipeline('Pipeline', results)
+
+    if arguments.save:
+        save_results(results, arguments.save)
+
+    if arguments.compare:
+        comparison = compared(results, loaded_results(arguments.compare),
+                              arguments.threshold)
+        report_comparison('Pipeline compared with ' + arguments.compare,
+                          comparison, arguments.threshold)
+        if any(regressed for *_, regressed in comparison):
+            return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
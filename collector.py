@@ -0,0 +1,330 @@
+'''
+Keeps the market data in memory and fetches the exchange pages on a
+schedule (e.g. after the close of each exchange), so the history is loaded
+once instead of on every fetch.
+
+The fetched quotes are merged in memory and folded into the indicator
+state, and the market data and the state are saved (the market data
+incrementally, if configured) only if something changed. A running
+collector is controlled through a Unix socket, one command per connection:
+    fetch       fetch the pages now
+    flush       save the market data and the indicator state if changed
+    status      report the state of the collector
+    shutdown    save the market data and the indicator state if changed,
+                and stop
+and by signals: SIGUSR1 fetches, SIGUSR2 flushes, SIGTERM and SIGINT shut
+down.
+
+Usage: python collector.py [fetch|flush|status|shutdown]
+(without a command the collector itself is run)
+'''
+
+__last_change__ = '2026.10.18.'
+
+import collections
+import datetime
+import indicators
+import instrumentation
+import logging
+import marketdata
+import os
+import selectors
+import settings
+import signal
+import socket
+import sys
+
+config = settings.config
+
+# the local times of the fetches, e.g. 17:40 after the close of Xetra
+fetch_times = tuple(datetime.datetime.strptime(value.strip(), '%H:%M').time()
+                    for value in config['Collector']['Fetch times'].split(','))
+fetch_on_weekends = config['Collector'].getboolean('Fetch on weekends')
+control_filename = config['Collector']['Control socket filename']
+
+commands = ('fetch', 'flush', 'status', 'shutdown')
+
+_signal_commands = {'SIGUSR1': 'fetch',
+                    'SIGUSR2': 'flush',
+                    'SIGTERM': 'shutdown',
+                    'SIGINT': 'shutdown'}
+
+# the length of a command or a reply on the control socket
+_message_size = 4096
+
+def next_fetch_time(now, times=None, weekends=None):
+    '''Returns the first scheduled fetch after now (a datetime).'''
+
+    times = sorted(times or fetch_times)
+    weekends = fetch_on_weekends if weekends is None else weekends
+
+    day = now.date()
+    while True:
+        if weekends or day.weekday() < 5:
+            for fetch_time in times:
+                scheduled = datetime.datetime.combine(day, fetch_time)
+                if scheduled > now:
+                    return scheduled
+        day += datetime.timedelta(days=1)
+
+class Collector(object):
+    '''
+    The market data kept in memory with its fetch schedule and control
+    socket.
+
+    The collector runs in one thread: it waits for the next scheduled fetch,
+    a connection on the control socket or a signal, whichever comes first.
+    '''
+
+    def __init__(self, source_is_web=None, control=None, times=None,
+                 weekends=None):
+        self.source_is_web = (config['DEFAULT'].getboolean('Source is web')
+                              if source_is_web is None else source_is_web)
+        self.control_filename = control or control_filename
+        self.times = times
+        self.weekends = weekends
+
+        self.market_data = marketdata.MarketData()
+        self.indicator_state = indicators.IndicatorState()
+        self.last_fetch = None
+        self.next_fetch = None
+        self.fetches = 0
+        self.running = False
+        # commands of the signal handlers, executed by the loop
+        self._pending = collections.deque()
+
+    def load(self):
+        '''Loads the stored market data, starting with an empty one if there
+        is none, and the indicator state.'''
+
+        try:
+            self.market_data.load_from_file()
+        except FileNotFoundError:
+            logging.warning('Collector: No stored market data, starting with '
+                            'an empty one.')
+        self.indicator_state.load_from_file()
+
+    def fetch(self):
+        '''Fetches the pages and merges them into the market data, folds the
+        new quotes into the indicator state, then saves both if changed.'''
+
+        logging.info('Collector: Fetching.')
+
+        actual_market_data = marketdata.MarketData()
+        actual_market_data.load_from_html(self.source_is_web)
+        self.market_data.append(actual_market_data.marketdata)
+        self.market_data.clean()
+
+        # only the new quotes are folded into the moving averages; the
+        # rewritten ISINs are rebuilt once, then the set starts over
+        self.indicator_state.update(self.market_data)
+        self.market_data.rewritten = set()
+        self.flush()
+
+        self.last_fetch = datetime.datetime.now()
+        self.fetches += 1
+
+        if instrumentation.enabled:
+            instrumentation.save_report()
+            instrumentation.reset()
+
+    def flush(self):
+        '''Saves the market data and the indicator state, if changed.'''
+
+        self.market_data.save_to_file()
+        self.indicator_state.save_to_file()
+
+    def status(self):
+        '''Returns the state of the collector as text.'''
+
+        return ('ISINs: {}, fetches: {}, last fetch: {}, next fetch: {}, '
+                'unsaved changes: {}'.format(len(self.market_data.marketdata),
+                                             self.fetches,
+                                             self.last_fetch or '-',
+                                             self.next_fetch or '-',
+                                             self.market_data.changed_after_load))
+
+    def execute(self, command):
+        '''Executes a control command, returns the reply.'''
+
+        if command == 'fetch':
+            self.fetch()
+            return 'fetched'
+        if command == 'flush':
+            self.flush()
+            return 'flushed'
+        if command == 'status':
+            return self.status()
+        if command == 'shutdown':
+            self.running = False
+            return 'shutting down'
+        return 'unknown command: ' + command
+
+    def run(self, signals=True):
+        '''Loads the market data, then fetches on schedule and executes the
+        commands until shut down. The signals can be handled only if run in
+        the main thread.'''
+
+        self.load()
+        listener = _listening_socket(self.control_filename)
+        selector = selectors.DefaultSelector()
+        if listener is not None:
+            selector.register(listener, selectors.EVENT_READ, 'control')
+
+        wakeup = None
+        if signals:
+            wakeup = socket.socketpair()
+            wakeup[0].setblocking(False)
+            wakeup[1].setblocking(False)
+            selector.register(wakeup[0], selectors.EVENT_READ, 'signal')
+            previous = _installed_signal_handlers(self._pending, wakeup[1])
+
+        self.running = True
+        logging.info('Collector: Running (control socket: %s).',
+                     self.control_filename if listener is not None else 'none')
+        self.next_fetch = next_fetch_time(datetime.datetime.now(),
+                                          self.times, self.weekends)
+        try:
+            while self.running:
+                timeout = (self.next_fetch - datetime.datetime.now()).total_seconds()
+                for key, _ in selector.select(max(timeout, 0)):
+                    if key.data == 'control':
+                        self._served(listener)
+                    else:
+                        _drained(key.fileobj)
+                while self._pending:
+                    self._executed_safely(self._pending.popleft())
+
+                if self.running and datetime.datetime.now() >= self.next_fetch:
+                    self._executed_safely('fetch')
+                    self.next_fetch = next_fetch_time(datetime.datetime.now(),
+                                                      self.times, self.weekends)
+        finally:
+            self.flush()
+            if wakeup is not None:
+                _restored_signal_handlers(previous)
+                for end in wakeup:
+                    end.close()
+            selector.close()
+            if listener is not None:
+                listener.close()
+                os.remove(self.control_filename)
+            logging.info('Collector: Stopped.')
+
+    def _served(self, listener):
+        '''Executes the command of one control connection.'''
+
+        connection, _ = listener.accept()
+        with connection:
+            connection.settimeout(5)
+            try:
+                command = connection.recv(_message_size).decode('utf-8').strip()
+            except OSError as error:
+                logging.warning('Collector: Control connection failed (%s).',
+                                error)
+                return
+            reply = self._executed_safely(command)
+            try:
+                connection.sendall(reply.encode('utf-8'))
+            except OSError:
+                pass
+
+    def _executed_safely(self, command):
+        '''Executes the command, logging instead of raising its error, so a
+        failed fetch does not stop the collector.'''
+
+        logging.info('Collector: Command: %s.', command)
+        try:
+            return self.execute(command)
+        except Exception as error:
+            logging.exception('Collector: %s failed.', command)
+            return '{} failed: {}'.format(command, error)
+
+def _listening_socket(filename):
+    '''Returns the listening control socket, None where there are no Unix
+    sockets (Windows). Raises RuntimeError if a collector is running.'''
+
+    if not hasattr(socket, 'AF_UNIX'):
+        logging.warning('Collector: No Unix sockets, controlled by signals only.')
+        return None
+
+    if os.path.exists(filename):
+        try:
+            sent(filename, 'status')
+        except OSError:
+            # left by a collector stopped abruptly
+            os.remove(filename)
+        else:
+            raise RuntimeError('A collector is already running ({}).'.format(filename))
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(filename)
+    listener.listen()
+    return listener
+
+def _installed_signal_handlers(pending, wakeup):
+    '''Installs the handlers queueing the commands of the signals, returns
+    the previous handlers.'''
+
+    previous = {}
+
+    def handler(number, frame):
+        pending.append(_signal_commands[signal.Signals(number).name])
+        try:
+            wakeup.send(b'\0')
+        except OSError:
+            pass
+
+    for name in _signal_commands:
+        number = getattr(signal, name, None)
+        if number is not None:
+            previous[number] = signal.signal(number, handler)
+    return previous
+
+def _restored_signal_handlers(previous):
+    '''Installs the previous signal handlers again.'''
+
+    for number, handler in previous.items():
+        signal.signal(number, handler)
+
+def _drained(wakeup):
+    '''Reads the bytes the signal handlers woke the loop up with.'''
+
+    try:
+        while wakeup.recv(_message_size):
+            pass
+    except (BlockingIOError, InterruptedError):
+        pass
+
+def sent(filename, command, timeout=None):
+    '''Sends a command to a running collector, returns its reply. The reply
+    of a fetch may take a while, so there is no timeout by default.'''
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(filename)
+        connection.sendall(command.encode('utf-8'))
+        connection.shutdown(socket.SHUT_WR)
+        chunks = []
+        for chunk in iter(lambda: connection.recv(_message_size), b''):
+            chunks.append(chunk)
+    return b''.join(chunks).decode('utf-8')
+
+def main(argv=None):
+    '''Runs the collector, or sends a command to the running one.'''
+
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO)
+
+    if argv:
+        if argv[0] not in commands:
+            print('Unknown command: {} (one of {})'.format(argv[0],
+                                                          ', '.join(commands)))
+            return 2
+        print(sent(control_filename, argv[0]))
+        return
+
+    Collector().run()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,28 +1,72 @@
 '''Library to access CSV (comma separated values) files.'''
 
-__last_change__ = '2017.08.28.'
+__last_change__ = '2026.10.18.'
 
 import csv
+import datetime_helper
+import decimal
 import logging
 import sys
 
-def reader(filename):
+def reader(filename, delimiter=';', encoding=None):
     '''Reads a list of lists data from a CSV file.
 
     The first line must be a header.
 
     Args:
         filename: the path (full, or relative) to the file to be written.
-    Returns: 
+        delimiter: optional parameter, defaults to semicolon.
+        encoding: optional parameter, defaults to the platform encoding.
+    Returns:
         An OrderedDict.'''
 
-    content = []
-    
-    with open(filename, newline='') as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=';')
-        content.extend(line for line in reader)
+    return list(iter_reader(filename, delimiter=delimiter, encoding=encoding))
 
-    return(content)
+def iter_reader(filename, delimiter=';', encoding=None,
+                converters=None, as_tuple=False):
+    '''Yields the rows of a CSV file one by one (constant memory).
+
+    The first line must be a header.
+
+    Args:
+        filename: the path (full, or relative) to the file to be read.
+        delimiter: optional parameter, defaults to semicolon.
+        encoding: optional parameter, defaults to the platform encoding.
+        converters: optional dict of column name -> function, the function
+            is called with the string value of the column.
+        as_tuple: optional parameter, if True the rows are yielded as tuples
+            in header order instead of dicts.
+    Yields:
+        A dict (column name -> value) or a tuple per row.'''
+
+    converters = converters or {}
+
+    with open(filename, newline='', encoding=encoding) as csvfile:
+        csvreader = csv.reader(csvfile, delimiter=delimiter)
+        try:
+            header = next(csvreader)
+        except StopIteration:
+            return
+
+        # converter per column position, None where the string is kept
+        column_converters = [converters.get(column) for column in header]
+        if not any(column_converters):
+            column_converters = None
+
+        for fields in csvreader:
+            if not fields:
+                continue
+            if len(fields) < len(header):
+                fields.extend([''] * (len(header) - len(fields)))
+            elif len(fields) > len(header):
+                del fields[len(header):]
+            if column_converters:
+                fields = [convert(field) if convert else field
+                          for convert, field in zip(column_converters, fields)]
+            if as_tuple:
+                yield tuple(fields)
+            else:
+                yield dict(zip(header, fields))
 
 def writer(content, filename, has_header=True):
     '''Saves a list of lists data into a CSV file.
@@ -32,10 +76,7 @@ def writer(content, filename, has_header=True):
     Args:
         content: a list of lists containing the data to be written.
         filename: the path (full, or relative) to the file to be written.
-        has_header: optional parameter, defaults to True.
-    Returns: 
-        TODO: True: if everythings OK.
-        TODO: False: if any of the files is missing.'''
+        has_header: optional parameter, defaults to True.'''
 
     if content is None:
         raise ValueError("No content passed.")
@@ -43,19 +84,103 @@ def writer(content, filename, has_header=True):
         raise ValueError("No file name/path passed.")
     if len(content) == 0 or (len(content) == 1 and has_header):
         raise ValueError("Empty list passed.")
-    
-    with open(filename, 'w', newline='') as csvfile:
-        csvwriter = csv.writer(csvfile, delimiter = ';')
-        if has_header:
-            csvwriter.writerow(content.pop(0))
-        csvwriter.writerows([field for field in content])
-        
-        logging.info(''.join(['Number of lines written in CSV (with header if exists): ',
-                              str(len(content))]))
+
+    if has_header:
+        iter_writer(content[1:], filename, header=content[0])
+    else:
+        iter_writer(content, filename)
+
+def iter_writer(rows, filename, header=None, delimiter=';', encoding=None,
+                mode='w'):
+    '''Saves the rows of any iterable (e.g. a generator) into a CSV file,
+    without building a list of them.
+
+    Args:
+        rows: an iterable of lists/tuples containing the data to be written.
+        filename: the path (full, or relative) to the file to be written.
+        header: optional header row.
+        delimiter: optional parameter, defaults to semicolon.
+        encoding: optional parameter, defaults to the platform encoding.
+        mode: optional parameter, 'a' appends to an existing file.
+    Returns:
+        The number of rows written (without header).'''
+
+    if rows is None:
+        raise ValueError("No content passed.")
+    if filename is None:
+        raise ValueError("No file name/path passed.")
+
+    counter = 0
+    with open(filename, mode, newline='', encoding=encoding) as csvfile:
+        csvwriter = csv.writer(csvfile, delimiter=delimiter)
+        if header is not None:
+            csvwriter.writerow(header)
+        for row in rows:
+            csvwriter.writerow(row)
+            counter += 1
+
+    logging.info(''.join(['Number of lines written in CSV (without header): ',
+                          str(counter)]))
+    return counter
+
+def to_date(date_format):
+    '''Returns a converter parsing a date string with the given format.
+    Empty strings are converted to None.'''
+
+    decoder = datetime_helper.DateTimeDecoder(date_format)
+
+    def converter(s):
+        return decoder(s).date() if s else None
+
+    return converter
+
+def to_datetime(datetime_format):
+    '''Returns a converter parsing a datetime string with the given format.
+    Empty strings are converted to None.'''
+
+    decoder = datetime_helper.DateTimeDecoder(datetime_format)
+
+    def converter(s):
+        return decoder(s) if s else None
+
+    return converter
+
+def to_decimal(s):
+    '''Converts a string to decimal. Accepts either comma or point as decimal
+    mark (and the other one as thousand separator). Empty or faulty strings
+    are converted to None.'''
+
+    if ',' in s:
+        s = s.replace('.', '').replace(',', '.')
+    try:
+        return decimal.Decimal(s) if s else None
+    except decimal.InvalidOperation:
+        return None
+
+def to_float(s):
+    '''Converts a string to float. Accepts either comma or point as decimal
+    mark (and the other one as thousand separator). Empty or faulty strings
+    are converted to None.'''
+
+    if ',' in s:
+        s = s.replace('.', '').replace(',', '.')
+    try:
+        return float(s) if s else None
+    except ValueError:
+        return None
+
+def to_int(s):
+    '''Converts a string to int. Empty or faulty strings are converted to
+    None.'''
+
+    try:
+        return int(s) if s else None
+    except ValueError:
+        return None
 
 def main():
     '''Entry point for testing purposes only'''
-    
+
     logging.basicConfig(level=logging.DEBUG)
     logging.debug('Running modul in debugging mode.')
 
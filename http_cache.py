@@ -0,0 +1,404 @@
+'''
+On-disk cache of the fetched web pages, with conditional requests and
+persistent (keep-alive) connections per host.
+
+Every url has two files in the cache directory: the body of the page and a
+JSON entry with its ETag, Last-Modified, fetch timestamp, content hash and the
+rows parsed from it. A page fetched within the freshness time is taken from
+the cache; otherwise the server is asked with If-None-Match/If-Modified-Since.
+When it answers 304, or sends the same content again, the parsed rows are
+reused, so the page need not be parsed again.
+
+The proxies configured for urllib (the http_proxy, https_proxy and no_proxy
+environment variables, or the system settings) are honoured: a plain HTTP
+request is sent to the proxy, an HTTPS one is tunnelled through it.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import base64
+import collections
+import hashlib
+import http.client
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# status of a Page: taken from the cache without a request, answered 304,
+# sent again with the same content, or sent with a new content
+fresh, not_modified, unchanged, modified = ('fresh',
+                                            'not modified',
+                                            'unchanged',
+                                            'modified')
+
+# a fetched page, rows is None if the page has to be parsed
+Page = collections.namedtuple('Page', ('body', 'rows', 'status'))
+
+_redirect_statuses = (301, 302, 303, 307, 308)
+_max_redirects = 5
+
+class ResponseCache(object):
+    '''The on-disk cache of the pages, keyed by url.'''
+
+    def __init__(self, directory, freshness):
+        self.directory = directory
+        self.freshness = freshness
+
+    def entry(self, url):
+        '''Returns the cached entry of the url, or None.'''
+
+        try:
+            with open(self._filename(url, '.json'), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('URL') != url or not os.path.exists(self._filename(url, '.body')):
+            return None
+        return entry
+
+    def body(self, url):
+        '''Returns the cached body of the url.'''
+
+        with open(self._filename(url, '.body'), 'rb') as f:
+            return f.read()
+
+    def store(self, url, entry, body=None):
+        '''Stores the entry of the url and, if given, its body.'''
+
+        os.makedirs(self.directory, exist_ok=True)
+        if body is not None:
+            _replaced(self._filename(url, '.body'), body)
+        _replaced(self._filename(url, '.json'),
+                  json.dumps(entry).encode('utf-8'))
+
+    def store_rows(self, url, rows):
+        '''Stores the rows parsed from the cached body of the url.'''
+
+        entry = self.entry(url)
+        if entry is not None:
+            entry['Rows'] = rows
+            self.store(url, entry)
+
+    def _filename(self, url, extension):
+        '''Returns the name of a cache file of the url.'''
+
+        return os.path.join(self.directory,
+                            hashlib.sha256(url.encode('utf-8')).hexdigest()
+                            + extension)
+
+class ConnectionPool(object):
+    '''Keeps the idle HTTP connections per host, so consecutive requests to
+    the same host reuse them. Thread safe: a connection is used by one
+    thread at a time.'''
+
+    def __init__(self):
+        self._idle = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def request(self, url, headers, timeout, stream=False):
+        '''Sends a GET request and returns (status, headers, body).
+        Follows redirects, raises urllib.error.HTTPError for HTTP errors and
+        OSError for network errors.
+
+        If stream is True, the body is not read but returned as a file-like
+        PooledResponse, which gives its connection back when closed.'''
+
+        for _ in range(_max_redirects + 1):
+            status, response_headers, body = self._request(url, headers,
+                                                           timeout, stream)
+            if status not in _redirect_statuses or 'Location' not in response_headers:
+                break
+            if stream:
+                body.close()
+            url = urllib.parse.urljoin(url, response_headers['Location'])
+
+        if status >= 400:
+            if stream:
+                body.close()
+            raise urllib.error.HTTPError(url, status,
+                                         http.client.responses.get(status, ''),
+                                         response_headers, None)
+        return status, response_headers, body
+
+    def close(self):
+        '''Closes the idle connections.'''
+
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+    def _request(self, url, headers, timeout, stream):
+        '''Sends one GET request on a pooled connection.'''
+
+        parts = urllib.parse.urlsplit(url)
+        host = (parts.scheme, parts.netloc)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        proxy = _proxy(parts)
+        if proxy is not None and parts.scheme == 'http':
+            # the proxy is asked for the absolute url
+            path = urllib.parse.urlunsplit(parts._replace(fragment=''))
+            headers = dict(headers, **_proxy_authorization(proxy))
+
+        while True:
+            connection, reused = self._connection(host, timeout, proxy)
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                if stream:
+                    return (response.status,
+                            response.msg,
+                            PooledResponse(self, host, connection, response))
+                body = response.read()
+            except (http.client.HTTPException, OSError) as error:
+                connection.close()
+                if reused:
+                    # the server closed the idle connection meanwhile
+                    continue
+                if isinstance(error, OSError):
+                    raise
+                raise ConnectionError(str(error)) from error
+            break
+
+        self._release(host, connection, response)
+        return response.status, response.msg, body
+
+    def _release(self, host, connection, response):
+        '''Gives the connection back to the pool if the response is read
+        completely and the server keeps the connection alive.'''
+
+        if response.will_close or not response.isclosed():
+            connection.close()
+        else:
+            with self._lock:
+                self._idle[host].append(connection)
+
+    def _connection(self, host, timeout, proxy=None):
+        '''Returns an idle connection to the host or a new one (through the
+        proxy, a urlsplit result, if given), and whether it is reused.'''
+
+        with self._lock:
+            if self._idle[host]:
+                connection = self._idle[host].pop()
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+
+        scheme, netloc = host
+        if proxy is None:
+            if scheme == 'https':
+                return http.client.HTTPSConnection(netloc, timeout=timeout), False
+            return http.client.HTTPConnection(netloc, timeout=timeout), False
+
+        proxy_netloc = proxy.netloc.rpartition('@')[2]
+        if scheme == 'https':
+            connection = http.client.HTTPSConnection(proxy_netloc,
+                                                     timeout=timeout)
+            connection.set_tunnel(netloc, headers=_proxy_authorization(proxy))
+            return connection, False
+        return http.client.HTTPConnection(proxy_netloc, timeout=timeout), False
+
+def _proxy(parts):
+    '''Returns the proxy of the url parts (a urlsplit result) configured for
+    urllib, as a urlsplit result, or None for a direct connection.'''
+
+    proxy = urllib.request.getproxies().get(parts.scheme)
+    if not proxy or urllib.request.proxy_bypass(parts.hostname or ''):
+        return None
+    if '://' not in proxy:
+        proxy = 'http://' + proxy
+    return urllib.parse.urlsplit(proxy)
+
+def _proxy_authorization(proxy):
+    '''Returns the Proxy-Authorization header of the credentials in the proxy
+    url, if any.'''
+
+    if proxy.username is None:
+        return {}
+    credentials = '{}:{}'.format(urllib.parse.unquote(proxy.username),
+                                 urllib.parse.unquote(proxy.password or ''))
+    return {'Proxy-Authorization':
+            'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('ascii')}
+
+class PooledResponse(object):
+    '''The body of a streamed response. Closing it gives the connection back
+    to the pool (or closes it, if the body was not read completely).'''
+
+    def __init__(self, pool, host, connection, response):
+        self._pool = pool
+        self._host = host
+        self._connection = connection
+        self._response = response
+
+    def read(self, size=-1):
+        '''Reads at most size bytes of the body, b'' at its end.'''
+
+        return self._response.read(None if size < 0 else size)
+
+    def close(self):
+        if self._connection is not None:
+            self._pool._release(self._host, self._connection, self._response)
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class CachingBody(object):
+    '''The body of a streamed, modified page. What is read from it is written
+    to a temporary file at the same time; when the end is reached, the file
+    and the entry of the page are stored in the cache.'''
+
+    def __init__(self, cache, url, entry, response):
+        self._cache = cache
+        self._url = url
+        self._entry = entry
+        self._response = response
+        self._hash = hashlib.sha256()
+        os.makedirs(cache.directory, exist_ok=True)
+        fd, self._temp_filename = tempfile.mkstemp(dir=cache.directory,
+                                                   suffix='.tmp')
+        self._file = os.fdopen(fd, 'wb')
+
+    def read(self, size=-1):
+        '''Reads at most size bytes of the body, b'' at its end.'''
+
+        data = self._response.read(size)
+        if self._file is None:
+            return data
+        if data:
+            self._file.write(data)
+            self._hash.update(data)
+        else:
+            self._file.close()
+            self._file = None
+            self._entry['Content hash'] = self._hash.hexdigest()
+            os.replace(self._temp_filename,
+                       self._cache._filename(self._url, '.body'))
+            self._cache.store(self._url, self._entry)
+        return data
+
+    def close(self):
+        if self._file is not None:
+            # not read to the end, nothing is cached
+            self._file.close()
+            self._file = None
+            os.remove(self._temp_filename)
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+_pool = ConnectionPool()
+
+def fetched(url, cache, timeout, pool=_pool, stream=False):
+    '''Returns the Page of the url, from the cache or from the web.
+
+    If stream is True and the page has no reusable rows, the body of the Page
+    is a file-like object to be read (and closed) by the caller instead of
+    bytes, see CachingBody.'''
+
+    entry = cache.entry(url)
+    now = time.time()
+
+    if entry is not None and now - entry['Fetched'] < cache.freshness:
+        logging.debug('HTTPCache: %s is fresh.', url)
+        return Page(_cached_body(cache, url, entry, stream), entry['Rows'], fresh)
+
+    headers = {}
+    if entry is not None:
+        if entry['ETag']:
+            headers['If-None-Match'] = entry['ETag']
+        if entry['Last-Modified']:
+            headers['If-Modified-Since'] = entry['Last-Modified']
+
+    status, response_headers, body = pool.request(url, headers, timeout, stream)
+
+    if status == 304 and entry is not None:
+        logging.debug('HTTPCache: %s is not modified.', url)
+        if stream:
+            body.close()
+        entry['Fetched'] = now
+        cache.store(url, entry)
+        return Page(_cached_body(cache, url, entry, stream),
+                    entry['Rows'],
+                    not_modified)
+
+    if stream:
+        logging.debug('HTTPCache: %s is streamed.', url)
+        return Page(CachingBody(cache,
+                                url,
+                                {'URL': url,
+                                 'ETag': response_headers.get('ETag'),
+                                 'Last-Modified': response_headers.get('Last-Modified'),
+                                 'Fetched': now,
+                                 'Content hash': None,
+                                 'Rows': None},
+                                body),
+                    None,
+                    modified)
+
+    content_hash = hashlib.sha256(body).hexdigest()
+    rows = None
+    if entry is not None and entry['Content hash'] == content_hash:
+        rows = entry['Rows']
+
+    cache.store(url,
+                {'URL': url,
+                 'ETag': response_headers.get('ETag'),
+                 'Last-Modified': response_headers.get('Last-Modified'),
+                 'Fetched': now,
+                 'Content hash': content_hash,
+                 'Rows': rows},
+                body)
+
+    status = unchanged if rows is not None else modified
+    logging.debug('HTTPCache: %s is %s.', url, status)
+    return Page(body, rows, status)
+
+def _cached_body(cache, url, entry, stream):
+    '''Returns the cached body: bytes, or an open file if streaming. Not read
+    at all if the rows are reused in streaming mode.'''
+
+    if not stream:
+        return cache.body(url)
+    if entry['Rows'] is not None:
+        return None
+    return open(cache._filename(url, '.body'), 'rb')
+
+def _replaced(filename, data):
+    '''Writes the file through a temporary file, so readers never see it
+    half written.'''
+
+    fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(filename),
+                                         suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+def main():
+    pass
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,310 @@
+'''
+Library to keep the moving averages of the screener up to date incrementally.
+
+The state of every ISIN (the closes of the last days and the last quote
+processed) is stored next to the market data, so a daily
+screening folds in only the new quotes instead of recomputing the windows
+from the whole history. The results are the same as the ones of
+screener.Screener.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import bisect
+import datetime
+import json
+import logging
+import marketdata
+import math
+import numpy
+import os
+import screener
+import settings
+import sys
+import tempfile
+
+config = settings.config
+
+state_filename = config['Screening']['Indicator state filename']
+_version = 2
+
+class IndicatorState(object):
+    '''
+    The fast and slow moving averages of all the ISINs at their last quote.
+
+    Per ISIN it keeps the closes of the last trading days (the averages are
+    summed from these, so no rounding error builds up across the runs), the
+    last quote folded in, the first of the quotes the windows are
+    made of (the tail) and the number of quotes up to the last one. Only the
+    tail has to be unchanged for the new quotes to be folded in, so a clean
+    deleting older quotes keeps the state; otherwise (e.g. after a backfill
+    into the tail) the ISIN is rebuilt from its whole history.
+
+    The calendar keeps every trading day seen (the days with a quote of any
+    ISIN), the missing days of an ISIN carry its previous close forward.
+    '''
+
+    def __init__(self, filename=None, fast=None, slow=None):
+        self.filename = filename or state_filename
+        self.fast = fast or screener.fast_sma
+        self.slow = slow or screener.slow_sma
+        self.calendar = []
+        self.isins = {}
+        self.changed = False
+
+    def load_from_file(self):
+        '''Loads the state, starting with an empty one if the file is missing,
+        of another format or was saved with other SMA windows.'''
+
+        try:
+            with open(self.filename, encoding='utf-8') as f:
+                content = json.load(f)
+        except FileNotFoundError:
+            logging.info('IndicatorState: No state file, starting empty.')
+            return
+
+        if content.get('Version') != _version:
+            logging.info('IndicatorState: Unknown state format, starting '
+                         'empty.')
+            self.changed = True
+            return
+
+        if (content['Fast SMA'], content['Slow SMA']) != (self.fast, self.slow):
+            logging.info('IndicatorState: SMA windows changed, starting empty.')
+            self.changed = True
+            return
+
+        self.calendar = [datetime.date.fromisoformat(day)
+                         for day in content['Calendar']]
+        self.isins = {isin: _entry_from_json(entry)
+                      for isin, entry in content['ISINs'].items()}
+        logging.info('IndicatorState: %d ISIN(s) loaded.', len(self.isins))
+
+    def save_to_file(self):
+        '''Saves the state, if changed, dropping the calendar days older than
+        every ISIN.'''
+
+        if not self.changed:
+            logging.info('IndicatorState: No change, no save required.')
+            return
+
+        first_days = [entry['First day'] for entry in self.isins.values()
+                      if entry['First day'] is not None]
+        if first_days:
+            del self.calendar[:bisect.bisect_left(self.calendar, min(first_days))]
+
+        content = {'Version': _version,
+                   'Fast SMA': self.fast,
+                   'Slow SMA': self.slow,
+                   'Calendar': [day.isoformat() for day in self.calendar],
+                   'ISINs': {isin: _entry_to_json(entry)
+                             for isin, entry in self.isins.items()}}
+
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        with tempfile.NamedTemporaryFile('w', dir=directory, encoding='utf-8',
+                                         delete=False) as f:
+            json.dump(content, f)
+        os.replace(f.name, self.filename)
+
+        logging.info('IndicatorState: %d ISIN(s) saved.', len(self.isins))
+        self.changed = False
+
+    def update(self, market_data):
+        '''Folds the quotes added to the MarketData since the last update
+        into the state, rebuilding the ISINs whose history was rewritten.'''
+
+        for isin in list(self.isins):
+            if (isin not in market_data.marketdata
+                    or isin in market_data.rewritten):
+                del self.isins[isin]
+                self.changed = True
+
+        closes = {}
+        for isin in market_data.marketdata:
+            series = market_data.series(isin)
+            if not series:
+                self.isins.pop(isin, None)
+                continue
+            start = (_resumed_position(self.isins[isin], series,
+                                       max(self.fast, self.slow))
+                     if isin in self.isins else None)
+            if start is None:
+                self.isins[isin] = _new_entry()
+                start = 0
+            if start < len(series):
+                closes[isin] = (screener.daily_closes(series.items_from(start)),
+                                series)
+
+        rebuilt = [isin for isin in closes if self.isins[isin]['Count'] == 0]
+        backfilled = self._extend_calendar(
+            day for daily_closes, series in closes.values() for day in daily_closes)
+
+        # a trading day inserted into the past changes the carried closes
+        for isin, entry in self.isins.items():
+            if (entry['Count'] and entry['First day'] is not None
+                    and any(entry['First day'] < day < entry['Last'].date()
+                            for day in backfilled)):
+                series = market_data.series(isin)
+                self.isins[isin] = _new_entry()
+                closes[isin] = (screener.daily_closes(series.items_from(0)),
+                                series)
+                rebuilt.append(isin)
+
+        for isin, (daily_closes, series) in closes.items():
+            self._fold(self.isins[isin], daily_closes, series)
+
+        if closes:
+            self.changed = True
+        logging.info('IndicatorState: %d ISIN(s) updated, %d of them rebuilt.',
+                     len(closes), len(rebuilt))
+
+    def latest(self):
+        '''Returns the indicators of every ISIN at its last quote, see
+        screener.Latest.'''
+
+        isins = sorted(self.isins)
+        entries = [self.isins[isin] for isin in isins]
+
+        return screener.Latest(
+            numpy.array(isins, dtype=object),
+            numpy.array([entry['Last day'] for entry in entries],
+                        dtype='datetime64[D]'),
+            numpy.array([entry['Window'][-1] if entry['Window'] else numpy.nan
+                         for entry in entries]),
+            numpy.array([self._average(entry, self.fast)
+                         for entry in entries]),
+            numpy.array([self._average(entry, self.slow)
+                         for entry in entries]))
+
+    def _extend_calendar(self, days):
+        '''Adds the days to the calendar, returns the ones inserted before
+        its last day.'''
+
+        backfilled = []
+        known = set(self.calendar)
+        for day in sorted(set(days) - known):
+            if self.calendar and day < self.calendar[-1]:
+                backfilled.append(day)
+            bisect.insort(self.calendar, day)
+        return backfilled
+
+    def _fold(self, entry, daily_closes, series):
+        '''Folds the daily closes into the entry of an ISIN: the missing
+        trading days repeat the previous close, a close of the last day
+        replaces it.'''
+
+        for day, close in daily_closes.items():
+            if entry['Last day'] == day:
+                self._replace_last(entry, close)
+                continue
+            if entry['Last day'] is not None:
+                missing = (bisect.bisect_left(self.calendar, day)
+                           - bisect.bisect_right(self.calendar, entry['Last day']))
+                for _ in range(missing):
+                    self._push(entry, entry['Window'][-1])
+            else:
+                entry['First day'] = day
+            self._push(entry, close)
+            entry['Last day'] = day
+
+        entry['Count'] = len(series)
+        entry['Last'] = series.items_from(len(series) - 1)[0][0]
+        entry['Tail'] = series.items_from(
+            max(0, len(series) - max(self.fast, self.slow)))[0][0]
+
+    def _push(self, entry, close):
+        '''Appends a close to the window of an ISIN.'''
+
+        window = entry['Window']
+        window.append(close)
+        del window[:-max(self.fast, self.slow)]
+
+    def _replace_last(self, entry, close):
+        '''Replaces the last close in the window of an ISIN.'''
+
+        entry['Window'][-1] = close
+
+    def _average(self, entry, window):
+        '''Returns the moving average of the last closes, NaN if the window
+        is not full yet.'''
+
+        if len(entry['Window']) < window:
+            return numpy.nan
+        return math.fsum(entry['Window'][-window:]) / window
+
+def _new_entry():
+    '''Returns the empty state of an ISIN.'''
+
+    return {'Count': 0,
+            'Last': None,
+            'Tail': None,
+            'First day': None,
+            'Last day': None,
+            'Window': []}
+
+def _resumed_position(entry, series, length):
+    '''
+    Returns the position of the series from which the new quotes are to be
+    folded into the entry, or None if its tail (the last quotes of the
+    windows, at most length of them) has changed.
+
+    The quotes before the tail may have been deleted by a clean, so the
+    position is the one after the last quote folded, or that of the last
+    quote if it was updated by a later one of the same day.
+    '''
+
+    count = entry['Count']
+    tail = entry['Tail']
+    if not count or tail not in series:
+        return None
+    last = series.position(entry['Last'])
+    if last - series.position(tail) != min(count, length) - 1:
+        return None
+    if entry['Last'] in series:
+        return last + 1
+
+    if last < len(series):
+        this_datetime, _ = series.items_from(last)[0]
+        if this_datetime.date() == entry['Last'].date():
+            return last
+    return None
+
+def _entry_to_json(entry):
+    '''Returns the state of an ISIN in a JSON serialisable form.'''
+
+    return dict(entry,
+                **{'Last': entry['Last'].isoformat(),
+                   'Tail': entry['Tail'].isoformat(),
+                   'First day': _day_to_json(entry['First day']),
+                   'Last day': _day_to_json(entry['Last day'])})
+
+def _entry_from_json(entry):
+    '''Returns the state of an ISIN loaded from JSON.'''
+
+    return dict(entry,
+                **{'Last': datetime.datetime.fromisoformat(entry['Last']),
+                   'Tail': datetime.datetime.fromisoformat(entry['Tail']),
+                   'First day': _day_from_json(entry['First day']),
+                   'Last day': _day_from_json(entry['Last day'])})
+
+def _day_to_json(day):
+    return day.isoformat() if day is not None else None
+
+def _day_from_json(day):
+    return datetime.date.fromisoformat(day) if day is not None else None
+
+def main():
+    '''Updates the indicator state with the stored market data.'''
+
+    logging.basicConfig(level=logging.INFO)
+
+    market_data = marketdata.MarketData()
+    market_data.load_from_file()
+
+    state = IndicatorState()
+    state.load_from_file()
+    state.update(market_data)
+    state.save_to_file()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+'''
+Library to measure the stages of the fetch-and-merge pipeline.
+
+The timers sum the time spent in each stage, the counters the bytes fetched
+and the rows parsed, merged, discarded and pruned, both optionally labelled
+(e.g. by stock exchange). A run is dumped as a JSON report and as a
+Prometheus text file.
+
+The instrumentation is switched on by the config or by enable() at runtime.
+When it is off, timer() returns a shared do-nothing context manager and
+count() returns at once, so the instrumented code pays one check per call.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+import functools
+import json
+import logging
+import os
+import settings
+import sys
+import tempfile
+import threading
+import time
+
+config = settings.config
+
+enabled = config['Instrumentation'].getboolean('Enabled')
+report_filename = config['Instrumentation']['Report filename']
+prometheus_filename = config['Instrumentation']['Prometheus filename']
+
+_metric_prefix = 'peter_'
+
+# (name, labels) -> [calls, seconds] and (name, labels) -> value, the labels
+# being a sorted tuple of (label, value) pairs
+_timers = {}
+_counters = {}
+# the stages of the fetching run in threads
+_lock = threading.Lock()
+
+def enable(on=True):
+    '''Switches the instrumentation on (or off).'''
+
+    global enabled
+    enabled = on
+
+def reset():
+    '''Drops the timers and the counters collected so far.'''
+
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+class _Timer(object):
+    '''Adds the time spent in its block to a timer.'''
+
+    __slots__ = ('key', 'start')
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            timer = _timers.setdefault(self.key, [0, 0.0])
+            timer[0] += 1
+            timer[1] += elapsed
+
+class _NoTimer(object):
+    '''The timer of the instrumentation switched off.'''
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_no_timer = _NoTimer()
+
+def timer(stage, **labels):
+    '''Returns a context manager adding the time spent in it to the stage,
+    e.g. with instrumentation.timer('HTML parse', exchange='DAX30'): ...'''
+
+    if not enabled:
+        return _no_timer
+    return _Timer((stage, tuple(sorted(labels.items()))))
+
+def timed(stage):
+    '''Decorator timing every call of the function as the stage.'''
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            with timer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, value=1, **labels):
+    '''Adds the value to the counter, e.g.
+    instrumentation.count('rows_parsed', 50, exchange='DAX30').'''
+
+    if not enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def report():
+    '''Returns the timers and the counters collected as a JSON serialisable
+    dict.'''
+
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+
+    return {'Created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'Timers': [dict(labels, stage=stage, calls=calls, seconds=seconds)
+                       for (stage, labels), (calls, seconds) in timers],
+            'Counters': [dict(labels, name=name, value=value)
+                         for (name, labels), value in counters]}
+
+def prometheus_text():
+    '''Returns the timers and the counters collected in the Prometheus text
+    exposition format.'''
+
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+
+    lines = []
+    for metric, samples in (
+            ('stage_seconds_total',
+             [(dict(labels, stage=stage), seconds)
+              for (stage, labels), (calls, seconds) in timers]),
+            ('stage_calls_total',
+             [(dict(labels, stage=stage), calls)
+              for (stage, labels), (calls, seconds) in timers])):
+        if samples:
+            lines.extend(_metric_lines(metric, samples))
+
+    for name in sorted({name for (name, labels), value in counters}):
+        lines.extend(_metric_lines(name + '_total',
+                                   [(dict(labels), value)
+                                    for (counter, labels), value in counters
+                                    if counter == name]))
+    return ''.join(line + '\n' for line in lines)
+
+def _metric_lines(metric, samples):
+    '''Returns the TYPE line and the sample lines of a counter.'''
+
+    name = _metric_prefix + metric
+    lines = ['# TYPE {} counter'.format(name)]
+    for labels, value in samples:
+        label_text = ','.join('{}="{}"'.format(label, _escaped(str(labels[label])))
+                              for label in sorted(labels))
+        lines.append('{}{} {}'.format(name,
+                                      '{' + label_text + '}' if labels else '',
+                                      value))
+    return lines
+
+def _escaped(value):
+    '''Returns the label value escaped for the Prometheus text format.'''
+
+    return (value.replace('\\', '\\\\')
+                 .replace('"', '\\"')
+                 .replace('\n', '\\n'))
+
+def save_report(filename=None, prometheus=None):
+    '''Saves the JSON report and the Prometheus text file of the run.'''
+
+    for target, content in (
+            (filename or report_filename, json.dumps(report(), indent=2)),
+            (prometheus or prometheus_filename, prometheus_text())):
+        directory = os.path.dirname(os.path.abspath(target))
+        with tempfile.NamedTemporaryFile('w', dir=directory, encoding='utf-8',
+                                         delete=False) as f:
+            f.write(content)
+        os.replace(f.name, target)
+
+    logging.info('Instrumentation: Report saved (%d timer(s), %d counter(s)).',
+                 len(_timers), len(_counters))
+
+def main():
+    pass
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,18 +3,29 @@ Library to fetch the stock exchange closing prices and volume
 from tdcfinancial on a given day, sorted alphabetically by company name.
 '''
 
-__last_change__ = '2017.08.30.'
+__last_change__ = '2026.10.18.'
 
 
 import datetime
+import instrumentation
+import itertools
 import logging
 import marketdata_coupler as mdc
-import marketdata_htmlparser as mdhp
 import sys
 import teletrader
+import timeseries
 
 _datetimeformat = mdc.dateformat + ' ' + mdc.timeformat
 
+_header = ('Name',
+           'ISIN',
+           'Date',
+           'Time',
+           'Closing Price',
+           'Volume',
+           'TeleTrader Name',
+           'Stock Exchange')
+
 class MarketData(object):
     '''Holds all the data regarding the companies and the market data.'''
 
@@ -24,59 +35,115 @@ class MarketData(object):
         self.marketdata = {}
         self.converter = teletrader.TTConverter()
         self.changed_after_load = False
+        # (ISIN, datetime) pairs added by append since the last load/save
+        self.appended = []
+        # ISINs whose history was changed other than at its end (by a
+        # backfill) since the last load; a clean deleting the expired entries
+        # does not count
+        self.rewritten = set()
+        # the retention cutoff of the last clean deleting entries since the
+        # last load/save
+        self.cleaned_before = None
 
     def load_from_file(self):
-        '''Loads the market data from a CSV file.'''
+        '''Loads the market data from a CSV or a columnar file, an SQLite
+        database or monthly partitions, depending on the configured storage
+        format. Of the partitions only those within the retention days are
+        read.'''
+
+        if mdc.storage_format == 'columnar':
+            logging.info('MarketData: Loading market data from columnar file.')
+            self.marketdata = mdc.loaded_columnar_market_data()
+        elif mdc.storage_format == 'sqlite':
+            logging.info('MarketData: Loading market data from SQLite database.')
+            self.marketdata = mdc.loaded_sqlite_market_data()
+        elif mdc.storage_format == 'partitioned':
+            logging.info('MarketData: Loading market data from partitions.')
+            self.marketdata = mdc.loaded_partitioned_market_data(
+                start=_retention_cutoff())
+        else:
+            logging.info('MarketData: Loading market data from CSV.')
+            self.marketdata = mdc.loaded_past_market_data(self.converter)
 
-        logging.info('MarketData: Loading market data from CSV.')
-        self.marketdata = mdc.loaded_past_market_data(
-            self.converter.ttnames2isin)
+        self.appended = []
+        self.rewritten = set()
+        self.cleaned_before = None
 
         logging.info('MarketData: %d new entry(s) loaded.',
                      len(self.marketdata))
 
+        self.converter.save_resolved()
         for name in self.converter.missing_names:
             logging.warning("Marketdata: TeleTrader name (%s) has no ISIN.", name)
 
+    @instrumentation.timed('HTML load')
     def load_from_html(self, source_is_web = True):
         '''Loads the market data from HTML (either web or a file).'''
 
         logging.info('MarketData: Loading market data from HTML.')
 
-        self.marketdata = mdhp.loaded_market_data(self.converter.ttnames2isin,
+        # only the fetching needs the HTML parser and the HTTP stack
+        import marketdata_htmlparser as mdhp
+
+        self.marketdata = mdhp.loaded_market_data(self.converter,
                                                   source_is_web)
+        self.converter.save_resolved()
 
         logging.info('MarketData: %d new entry(s) loaded.',
                      len(self.marketdata))
 
+    @instrumentation.timed('Clean')
     def clean(self):
         '''Cleans the internal market data, which means deleting entries older
-        than 365 days.'''
+        than the configured retention days (365 by default).
+
+        The series are sorted, so the expired entries of an ISIN are found by
+        binary search and deleted at once; ISINs left empty are deleted
+        together at the end. Only the market data in memory is cleaned, the
+        stored one by the next save (with partitioned storage the expired
+        partitions, which are not loaded, are deleted then).'''
 
         logging.info('MarketData: Cleaning market data from entries older '
-                      'than 365 days.')
+                      'than %d days.', mdc.retention_days)
 
         deleted_counter = 0
-        today = datetime.datetime.today()
-        one_year = datetime.timedelta(days = 365)
-
-        for isin in tuple(self.marketdata.keys()):
-            for mydatetime in tuple(self.marketdata[isin]['Market Data'].keys()):
-                if mydatetime < today - one_year:
-                    del self.marketdata[isin]['Market Data'][mydatetime]
-                    if not self.marketdata[isin]['Market Data']:
-                        del self.marketdata[isin]
-                    deleted_counter += 1
+        cutoff = _retention_cutoff()
+        expired_isins = []
+
+        for isin in self.marketdata.keys():
+            deleted_counter += self.series(isin).prune_before(cutoff)
+            if not self.marketdata[isin]['Market Data']:
+                expired_isins.append(isin)
+
+        for isin in expired_isins:
+            del self.marketdata[isin]
+
+        instrumentation.count('rows_pruned', deleted_counter)
                     
         if deleted_counter:
-            logging.info('MarketData: %d old entry(s) deleted.',
-                         deleted_counter)
+            logging.info('MarketData: %d old entry(s) deleted, '
+                         '%d ISIN(s) expired.',
+                         deleted_counter,
+                         len(expired_isins))
+            self.cleaned_before = cutoff
             self.changed_after_load = True
         else:
             logging.info('MarketData: No old entry deleted.')
 
+        # the expired partitions were not loaded, the manifest tells whether
+        # there are any; the save deletes them
+        if (mdc.storage_format == 'partitioned'
+                and mdc.expired_partitions(cutoff)):
+            logging.info('MarketData: Expired partition(s) to be deleted.')
+            self.cleaned_before = cutoff
+            self.changed_after_load = True
+
+    @instrumentation.timed('Append')
     def append(self, other_market_data):
-        '''Appends the market data to the existing entries.'''
+        '''Appends the market data to the existing entries.
+
+        The whole batch of an ISIN is merged in one pass, by the same-day
+        rules of TimeSeries.merge (discard, update or insert).'''
 
         logging.info('MarketData: Appending market data to this database.')
         logging.debug('MarketData: %d new ISIN might be added.', len(other_market_data))
@@ -87,59 +154,39 @@ class MarketData(object):
             if isin not in self.marketdata:
                 self.marketdata[isin] = {}
                 self.marketdata[isin].update(other_market_data[isin])
+                self.marketdata[isin]['Market Data'] = timeseries.TimeSeries(
+                    other_market_data[isin]['Market Data'])
                 added_counter += len(other_market_data[isin]['Market Data'])
+                self.appended.extend((isin, addable_datetime)
+                                     for addable_datetime
+                                     in other_market_data[isin]['Market Data'])
                 logging.debug('MarketData: New ISIN (%s) appended.', isin)
                 continue
             
             logging.debug('MarketData: ISIN (%s) is found in existing market data.', isin)
-            
-            for addable_datetime in other_market_data[isin]['Market Data'].keys():
-
-                if 'Market Data' not in self.marketdata[isin]:
-                    self.marketdata[isin]['Market Data'] = other_market_data[isin]['Market Data']
-                    added_counter += len(other_market_data[isin]['Market Data'])
-                    logging.debug('MarketData: New market dataset added.')
-                    break
-
-                addable_date = _datetime_to_date(addable_datetime)
-
-                logging.debug('MarketData: Date (%s) might be added.',
-                              str(addable_date))
-                
-                for existing_datetime in sorted(
-                    self.marketdata[isin]['Market Data'].keys(),
-                    reverse=True):
-
-                    existing_date = _datetime_to_date(existing_datetime)
-
-                    # is there the same day? and if is, the new data is later?
-                    logging.debug('Existing datetime: %s, addable datetime: %s',
-                                  str(existing_datetime),
-                                  str(addable_datetime))
-
-                    # decision branches, what to do with the addable market data?
-                    update = existing_date == addable_date and existing_datetime < addable_datetime
-                    discard = existing_date == addable_date and existing_datetime >= addable_datetime
-                    insert = existing_datetime < addable_datetime
-
-                    if discard:
-                        logging.debug('MarketData: Datetime (%s) discarded.',
-                                      str(addable_datetime))                            
-                        break                    
-                    elif update or insert:
-                        if update:
-                            del self.marketdata[isin]['Market Data'][existing_datetime]
-                            logging.debug('Existing datetime (%s) deleted.',
-                                          str(existing_datetime))
-                        
-                        self.marketdata[isin]['Market Data'][addable_datetime] = {}
-                        self.marketdata[isin]['Market Data'][
-                            addable_datetime] = other_market_data[isin]['Market Data'][
-                                addable_datetime]
-                        logging.debug('MarketData: Datetime (%s) added.',
-                                      str(addable_datetime))
-                        added_counter += 1
-                        break
+
+            series = self.series(isin)
+            added_datetimes = series.merge(other_market_data[isin]['Market Data'])
+            # the added datetimes are not all at the end of the series
+            if (added_datetimes
+                    and series.position(min(added_datetimes))
+                        < len(series) - len(added_datetimes)):
+                self.rewritten.add(isin)
+
+            logging.debug('MarketData: ISIN (%s): %d of %d datetime(s) added.',
+                          isin,
+                          len(added_datetimes),
+                          len(other_market_data[isin]['Market Data']))
+            added_counter += len(added_datetimes)
+            self.appended.extend((isin, added_datetime)
+                                 for added_datetime in added_datetimes)
+
+        if instrumentation.enabled:
+            instrumentation.count('rows_merged', added_counter)
+            instrumentation.count('rows_discarded',
+                                  sum(len(other_market_data[isin]['Market Data'])
+                                      for isin in other_market_data)
+                                  - added_counter)
 
         if added_counter:
             logging.info('MarketData: %d new entry(s) added.',
@@ -148,27 +195,74 @@ class MarketData(object):
         else:
             logging.info('MarketData: No new entry added.')
 
+    def series(self, isin):
+        '''Returns the market data series of the ISIN, converting a plain
+        dict (e.g. loaded from HTML) into a TimeSeries first.'''
+
+        if 'Market Data' not in self.marketdata[isin]:
+            self.marketdata[isin]['Market Data'] = timeseries.TimeSeries()
+        elif isinstance(self.marketdata[isin]['Market Data'], dict):
+            self.marketdata[isin]['Market Data'] = timeseries.TimeSeries(
+                self.marketdata[isin]['Market Data'])
+        return self.marketdata[isin]['Market Data']
+
     def save_to_file(self):
-        '''Saves the market data into a CSV file.'''
+        '''Saves the market data into a CSV or a columnar file, an SQLite
+        database or monthly partitions, depending on the configured storage
+        format.'''
 
-        logging.info('MarketData: Saving market data to CSV.')
+        logging.info('MarketData: Saving market data (%s).', mdc.storage_format)
         if not self.changed_after_load:
             logging.info('MarketData: No change after load, no save required.')
             return
 
-        content = list()
+        if mdc.storage_format == 'columnar':
+            mdc.save_columnar_to_file(self.marketdata)
+        elif mdc.storage_format == 'sqlite':
+            # only the new entries are written, the expired ones deleted
+            mdc.save_sqlite_to_file(self.marketdata,
+                                    self.appended,
+                                    self.cleaned_before)
+        elif mdc.storage_format == 'partitioned':
+            # only the partitions of the new entries are rewritten, the
+            # expired ones deleted
+            mdc.save_partitioned_to_file(self.marketdata,
+                                         self.appended,
+                                         self.cleaned_before)
+        elif mdc.journal_is_appendable():
+            self._save_appended_to_journal()
+        else:
+            mdc.save_to_file(itertools.chain((_header,),
+                                             _dict_to_rows(self.marketdata)))
+
+        self.appended = []
+        self.cleaned_before = None
+        self.changed_after_load = False
+
+    def _save_appended_to_journal(self):
+        '''Saves only the entries added by append since the last save.
+        Entries deleted by clean are left to the next compaction.'''
+
+        content = [_row(self.marketdata, isin, this_datetime)
+                   for isin, this_datetime in sorted(set(self.appended))
+                   if isin in self.marketdata
+                   and this_datetime in self.marketdata[isin]['Market Data']]
+
+        if not content:
+            logging.info('MarketData: No new entry to journal.')
+            return
 
-        # create a header
-        content.append(('Name',
-                        'ISIN',
-                        'Date',
-                        'Time',
-                        'Closing Price',
-                        'Volume',
-                        'TeleTrader Name',
-                        'Stock Exchange'))
-        content.extend(_dict_to_tuple(self.marketdata))
-        mdc.save_to_file(content)
+        logging.info('MarketData: %d new entry(s) written to journal.',
+                     len(content))
+        content.insert(0, _header)
+        mdc.append_to_journal(content)
+
+def _retention_cutoff():
+    '''Returns the cutoff of cleaning, the entries older than it are
+    deleted.'''
+
+    return (datetime.datetime.today()
+            - datetime.timedelta(days = mdc.retention_days))
 
 def _datetime_to_date(dt):
     '''Returns a date obtained from the given datetime.'''
@@ -187,20 +281,26 @@ def _datetime_to_time(dt):
 def _dict_to_tuple(marketdata):
     '''Returns a tuple converted from the given dict.'''
 
-    # TODO: needs double loop comprehension
-
-    content = []
-    for isin in sorted(marketdata):        
-        for this_datetime in sorted(marketdata[isin]['Market Data']):
-            content.append(['',
-                            isin,
-                            this_datetime.strftime(mdc.dateformat),
-                            this_datetime.strftime(mdc.timeformat),
-                            marketdata[isin]['Market Data'][this_datetime]['Closing Price'],
-                            marketdata[isin]['Market Data'][this_datetime]['Volume'],
-                            marketdata[isin]['TeleTrader Name'],
-                            marketdata[isin]['Stock Exchange']])
-    return(tuple(content))
+    return tuple(_dict_to_rows(marketdata))
+
+def _dict_to_rows(marketdata):
+    '''Yields the CSV rows of the given dict, sorted by ISIN and datetime.'''
+
+    return (_row(marketdata, isin, this_datetime)
+            for isin in sorted(marketdata)
+            for this_datetime in sorted(marketdata[isin]['Market Data']))
+
+def _row(marketdata, isin, this_datetime):
+    '''Returns the CSV row of one entry of the given dict.'''
+
+    return ['',
+            isin,
+            this_datetime.strftime(mdc.dateformat),
+            this_datetime.strftime(mdc.timeformat),
+            marketdata[isin]['Market Data'][this_datetime]['Closing Price'],
+            marketdata[isin]['Market Data'][this_datetime]['Volume'],
+            marketdata[isin]['TeleTrader Name'],
+            marketdata[isin]['Stock Exchange']]
 
 def main():
     pass
@@ -0,0 +1,384 @@
+'''
+Columnar, memory-mapped storage of the market data.
+
+The file holds a small directory (ISIN, TeleTrader name, stock exchange and the
+position of the series) followed by three sorted arrays per ISIN: timestamps
+(seconds since 1970, int64), closing prices (float64) and volumes (int64).
+The offsets in the directory are relative to the start of the arrays.
+
+The arrays are for the numeric access (e.g. the query module). The quotes
+themselves are the original price and volume strings, kept in a string
+table after the arrays, so a quote reads back exactly as it was stored in
+the CSV file.
+
+On load the file is memory-mapped read-only, only the directory is decoded,
+and the arrays are read lazily when an ISIN's market data is accessed. This
+way loading is nearly instant and the pages are shared between processes.
+A save copies the series still mapped into memory and closes the mapping
+before replacing the file, which Windows does not allow while it is mapped.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import bisect
+import collections.abc
+import datetime
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import timeseries
+
+_magic = b'PETERCOL'
+_version = 2
+# the string table separators: between the price and the volume of a quote,
+# and between the quotes
+_unit_separator = '\x1f'
+_record_separator = '\x1e'
+# magic, version, length of the directory in bytes
+_header = struct.Struct('<8sII')
+_item_size = 8
+
+_epoch = datetime.datetime(1970, 1, 1)
+_one_second = datetime.timedelta(seconds=1)
+
+class ColumnarFile(object):
+    '''A read-only, memory-mapped columnar market data file.'''
+
+    def __init__(self, filename):
+        self.filename = filename
+
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, directory_length = _header.unpack_from(self._mmap, 0)
+        if magic != _magic or version != _version:
+            self._mmap.close()
+            raise ValueError('Not a columnar market data file: ' + filename)
+
+        self.directory = json.loads(
+            self._mmap[_header.size:_header.size + directory_length].decode('utf-8'))
+        self._data_start = _aligned(_header.size + directory_length)
+        self._data = memoryview(self._mmap)
+
+    def columns(self, entry):
+        '''Returns the timestamp, price and volume arrays of a directory
+        entry as memoryviews on the mapped file.'''
+
+        offset, count = self._data_start + entry['Offset'], entry['Count']
+        size = count * _item_size
+
+        return (_array_view(self._data, offset, size, 'q'),
+                _array_view(self._data, offset + size, size, 'd'),
+                _array_view(self._data, offset + 2 * size, size, 'q'))
+
+    def strings(self, entry):
+        '''Returns the string table part of a directory entry as a memoryview
+        on the mapped file.'''
+
+        offset = self._data_start + entry['Strings Offset']
+        return self._data[offset:offset + entry['Strings Size']]
+
+    def close(self):
+        '''Closes the mapping. Raises BufferError while a series still has
+        views on it.'''
+
+        self._data.release()
+        self._mmap.close()
+
+class ColumnarSeries(collections.abc.MutableMapping):
+    '''
+    The market data of one ISIN (datetime -> {'Closing Price', 'Volume'})
+    backed by the arrays of a ColumnarFile.
+
+    Reading goes directly to the mapped arrays. The first modification copies
+    the series into memory, the mapped file is never written.
+
+    The string table of the series is decoded on the first quote read.
+    '''
+
+    def __init__(self, timestamps, prices, volumes, strings, source=None):
+        # the ColumnarFile mapped, None once copied into memory
+        self.source = source
+        self._timestamps = timestamps
+        self._prices = prices
+        self._volumes = volumes
+        # the mapped string table, then the decoded quote strings
+        self._strings = strings
+        # the position of the first quote in the string table (after pruning)
+        self._first = 0
+        self._materialised = None
+
+    def __getitem__(self, key):
+        if self._materialised is not None:
+            return self._materialised[key]
+
+        index = self._index(key)
+        if index is None:
+            raise KeyError(key)
+        return self._quote(index)
+
+    def __contains__(self, key):
+        if self._materialised is not None:
+            return key in self._materialised
+        return self._index(key) is not None
+
+    def __iter__(self):
+        if self._materialised is not None:
+            return iter(self._materialised)
+        return (_timestamp_to_datetime(ts) for ts in self._timestamps)
+
+    def __len__(self):
+        if self._materialised is not None:
+            return len(self._materialised)
+        return len(self._timestamps)
+
+    def __setitem__(self, key, value):
+        self._materialise()[key] = value
+
+    def __delitem__(self, key):
+        del self._materialise()[key]
+
+    def merge(self, quotes):
+        '''Copies the series into memory and merges the quotes, see
+        TimeSeries.merge.'''
+
+        return self._materialise().merge(quotes)
+
+    def position(self, this_datetime):
+        '''Returns the number of datetimes before the given one.'''
+
+        if self._materialised is not None:
+            return self._materialised.position(this_datetime)
+        return bisect.bisect_left(self._timestamps,
+                                  _datetime_to_timestamp(this_datetime))
+
+    def items_from(self, index):
+        '''Returns the (datetime, quote) pairs from the given position on,
+        decoding only those.'''
+
+        if self._materialised is not None:
+            return self._materialised.items_from(index)
+        return [(_timestamp_to_datetime(self._timestamps[position]),
+                 self._quote(position))
+                for position in range(index, len(self._timestamps))]
+
+    def arrays(self):
+        '''Returns the timestamp, price and volume arrays (memoryviews on the
+        mapped file), None once the series is copied into memory.'''
+
+        if self._materialised is not None:
+            return None
+        return self._timestamps, self._prices, self._volumes
+
+    def prune_before(self, cutoff):
+        '''Deletes the quotes older than the cutoff datetime and returns their
+        number. While the series is not modified, only the views on the
+        mapped arrays are narrowed, nothing is decoded.'''
+
+        if self._materialised is not None:
+            return self._materialised.prune_before(cutoff)
+
+        index = bisect.bisect_left(self._timestamps,
+                                   _datetime_to_timestamp(cutoff))
+        self._timestamps = self._timestamps[index:]
+        self._prices = self._prices[index:]
+        self._volumes = self._volumes[index:]
+        self._first += index
+        return index
+
+    def _index(self, key):
+        '''Returns the position of the given datetime in the arrays, or None.'''
+
+        if not isinstance(key, datetime.datetime):
+            return None
+        ts = _datetime_to_timestamp(key)
+        index = bisect.bisect_left(self._timestamps, ts)
+        if index < len(self._timestamps) and self._timestamps[index] == ts:
+            return index
+        return None
+
+    def _quote(self, index):
+        '''Returns the quote dict at the position in the arrays.'''
+
+        if isinstance(self._strings, memoryview):
+            self._strings = bytes(self._strings).decode('utf-8').split(
+                _record_separator)
+        price, volume = self._strings[self._first + index].split(
+            _unit_separator)
+        return {'Closing Price': price, 'Volume': volume}
+
+    def _materialise(self):
+        '''Copies the mapped arrays into a TimeSeries.'''
+
+        if self._materialised is None:
+            self._materialised = timeseries.TimeSeries({
+                _timestamp_to_datetime(ts): self._quote(index)
+                for index, ts in enumerate(self._timestamps)})
+            self._timestamps = self._prices = self._volumes = None
+            self._strings = None
+            self.source = None
+        return self._materialised
+
+def loaded_market_data(filename):
+    '''
+    Returns the market data stored in a columnar file, in the same dict layout
+    as marketdata_coupler.loaded_past_market_data returns.
+    Only the directory is decoded, the series are read on access.
+    '''
+
+    logging.info('Columnar: Loading market data from %s.', filename)
+
+    columnar_file = ColumnarFile(filename)
+    loaded_market_data = {}
+
+    for entry in columnar_file.directory:
+        loaded_market_data[entry['ISIN']] = {
+            'Stock Exchange': entry['Stock Exchange'],
+            'TeleTrader Name': entry['TeleTrader Name'],
+            'Market Data': ColumnarSeries(*columnar_file.columns(entry),
+                                          columnar_file.strings(entry),
+                                          columnar_file)}
+
+    logging.info('Columnar: %d ISIN(s) loaded.', len(loaded_market_data))
+
+    return loaded_market_data
+
+def save_to_file(marketdata, filename):
+    '''Saves the market data dict into a columnar file.
+
+    The file is written next to the target and then renamed, so processes
+    having the old file mapped keep seeing a consistent content. The series
+    of the market data still mapped are copied into memory first and their
+    files closed.'''
+
+    logging.info('Columnar: Saving market data to %s.', filename)
+
+    _release_mapped(marketdata)
+
+    directory = []
+    columns = []
+    strings = []
+    offset = 0
+
+    for isin in sorted(marketdata):
+        series = marketdata[isin]['Market Data']
+        datetimes = sorted(series)
+        count = len(datetimes)
+        columns.append((struct.pack('<%dq' % count,
+                                    *(_datetime_to_timestamp(dt)
+                                      for dt in datetimes)),
+                        struct.pack('<%dd' % count,
+                                    *(_price_to_float(series[dt]['Closing Price'])
+                                      for dt in datetimes)),
+                        struct.pack('<%dq' % count,
+                                    *(_volume_to_int(series[dt]['Volume'])
+                                      for dt in datetimes))))
+        directory.append({'ISIN': isin,
+                          'Stock Exchange': marketdata[isin]['Stock Exchange'],
+                          'TeleTrader Name': marketdata[isin]['TeleTrader Name'],
+                          'Offset': offset,
+                          'Count': count,
+                          'First': _datetime_to_timestamp(datetimes[0]) if count else None,
+                          'Last': _datetime_to_timestamp(datetimes[-1]) if count else None})
+        offset += 3 * count * _item_size
+        strings.append(_record_separator.join(
+            series[dt]['Closing Price'] + _unit_separator + series[dt]['Volume']
+            for dt in datetimes).encode('utf-8'))
+
+    # the string table follows the arrays
+    for entry, encoded_strings in zip(directory, strings):
+        entry['Strings Offset'] = offset
+        entry['Strings Size'] = len(encoded_strings)
+        offset += len(encoded_strings)
+
+    encoded_directory = json.dumps(directory).encode('utf-8')
+    data_start = _aligned(_header.size + len(encoded_directory))
+
+    target_directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_filename = tempfile.mkstemp(dir=target_directory,
+                                         suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_header.pack(_magic, _version, len(encoded_directory)))
+            f.write(encoded_directory)
+            f.write(b'\0' * (data_start - _header.size - len(encoded_directory)))
+            for column_block in columns:
+                f.writelines(column_block)
+            f.writelines(strings)
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+    logging.info('Columnar: %d ISIN(s) saved.', len(directory))
+
+def _release_mapped(marketdata):
+    '''Copies the mapped series of the market data dict into memory and
+    closes their files.'''
+
+    sources = set()
+    for isin in marketdata:
+        series = marketdata[isin]['Market Data']
+        if isinstance(series, ColumnarSeries) and series.source is not None:
+            sources.add(series.source)
+            series._materialise()
+    for source in sources:
+        source.close()
+
+def _array_view(data, offset, size, typecode):
+    '''Returns a typed view on a part of the mapped file.'''
+
+    view = data[offset:offset + size].cast(typecode)
+    if sys.byteorder != 'little':
+        # the file is little-endian, a swapped copy is needed
+        import array
+        swapped = array.array(typecode, view)
+        swapped.byteswap()
+        return memoryview(swapped)
+    return view
+
+def _aligned(position):
+    '''Returns the position rounded up to the array item size.'''
+
+    return -(-position // _item_size) * _item_size
+
+def _datetime_to_timestamp(dt):
+    '''Returns the seconds elapsed since 1970 (naive, no time zone).'''
+
+    return (dt - _epoch) // _one_second
+
+def _timestamp_to_datetime(ts):
+    '''Returns the naive datetime of the given seconds since 1970.'''
+
+    return _epoch + datetime.timedelta(seconds=ts)
+
+def _price_to_float(s):
+    '''Converts a price string (either '1.234,56' or '1234.56') to float.
+    Missing prices are stored as NaN.'''
+
+    s = s.strip()
+    if ',' in s:
+        s = s.replace('.', '').replace(',', '.')
+    try:
+        return float(s)
+    except ValueError:
+        return math.nan
+
+def _volume_to_int(s):
+    '''Converts a volume string to int. Missing volumes are stored as -1.'''
+
+    try:
+        return int(s.strip().replace('.', '').replace(',', ''))
+    except ValueError:
+        return -1
+
+def main():
+    pass
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,26 +1,42 @@
 '''
 Serves as interface to the market data stored persistently.
 
-Can obtain data from CSV files for the time being.
-Planned: obtain from JSON, from the web, etc.
+Can obtain data from CSV files, from columnar (memory-mapped) files, from
+an SQLite database or from monthly partitions. Planned: obtain from JSON, from the web, etc.
 '''
-__last_change__ = '2017.08.29.'
+__last_change__ = '2026.10.18.'
 
-import configparser
 import csv_helper
 import datetime
+import datetime_helper
+import functools
+import glob
+import instrumentation
 import logging
+import os
+import settings
 import sys
-import teletrader
+import timeseries
 
-config = configparser.ConfigParser()
-config.read('config.ini')
+config = settings.config
 
 _market_data_filename = config['Market Data Coupler']['Market Data filename']
 _test_output_market_data_filename = config['Market Data Coupler']['Test Output Market Data filename']
 dateformat = config['DEFAULT']['Date format']
 timeformat = config['Market Data Coupler']['Time format']
+_decode_date = datetime_helper.DateTimeDecoder(dateformat)
+_decode_time = datetime_helper.DateTimeDecoder(timeformat)
+_columnar_market_data_filename = config['Market Data Coupler']['Columnar Market Data filename']
+_sqlite_market_data_filename = config['Market Data Coupler']['SQLite Market Data filename']
+_partitioned_market_data_directory = config['Market Data Coupler']['Partitioned Market Data directory']
+compress_partitions = config['Market Data Coupler'].getboolean('Compress partitions')
+storage_format = config['Market Data Coupler']['Storage format']
+retention_days = config['Market Data Coupler'].getint('Retention days')
+csv_encoding = config['DEFAULT']['CSV encoding']
+incremental_save = config['Market Data Coupler'].getboolean('Incremental save')
+_compaction_after_segments = config['Market Data Coupler'].getint('Compaction after segments')
 
+@instrumentation.timed('Market data load')
 def loaded_past_market_data(converter):
     '''
     Returns the stored market data from file.
@@ -33,33 +49,21 @@ def loaded_past_market_data(converter):
 
     loaded_market_data = {}
 
-    for line in csv_helper.reader(_market_data_filename):
+    _load_rows(loaded_market_data,
+               converter,
+               csv_helper.iter_reader(_market_data_filename,
+                                      encoding=csv_encoding),
+               False)
 
-        id = converter[line['TeleTrader Name']]
-        if id not in loaded_market_data:
-            loaded_market_data[id] = {'Stock Exchange': line['Stock Exchange'],
-                                      'TeleTrader Name': line['TeleTrader Name']}
+    for segment_filename in _journal_segment_filenames():
+        logging.info('MarketDataCoupler: Replaying journal segment %s.',
+                     segment_filename)
+        _load_rows(loaded_market_data,
+                   converter,
+                   csv_helper.iter_reader(segment_filename,
+                                          encoding=csv_encoding),
+                   True)
 
-        date, time = (datetime.datetime.strptime(line['Date'],
-                                          dateformat),
-                      datetime.time(hour=0,
-                                    minute=0,
-                                    second=1))
-
-        if line['Time']:
-            time = datetime.datetime.strptime(line['Time'],
-                                              timeformat)
-        mydatetime = datetime.datetime(date.year,
-                                       date.month,
-                                       date.day,
-                                       time.hour,
-                                       time.minute,
-                                       time.second)
-        if 'Market Data' not in loaded_market_data[id]:
-            loaded_market_data[id]['Market Data'] ={}
-        loaded_market_data[id]['Market Data'][mydatetime] = {'Closing Price' : line['Closing Price'],
-                                                             'Volume' : line['Volume']}
-        
     if len(loaded_market_data):
         logging.info('MarketDataCoupler: %d new ID(s) loaded with market data.',
                      len(loaded_market_data))
@@ -68,13 +72,208 @@ def loaded_past_market_data(converter):
 
     return loaded_market_data
 
-def save_to_file(mylist):
-    '''Saves a list of lists to CSV. The first list is the header.'''
-    
-    csv_helper.writer(mylist,
-                      _market_data_filename,
-                      True)
-    
+def _load_rows(loaded_market_data, converter, lines, replaces_same_day):
+    '''
+    Adds the CSV lines to the loaded market data.
+    Journal rows were accepted by MarketData.append when written, so they
+    replace any quote of the same day (replaces_same_day).
+    '''
+
+    rows = 0
+    for line in lines:
+        rows += 1
+
+        id = converter[line['TeleTrader Name']]
+        if id not in loaded_market_data:
+            loaded_market_data[id] = {'Stock Exchange': line['Stock Exchange'],
+                                      'TeleTrader Name': line['TeleTrader Name']}
+
+        mydatetime = _market_datetime(line['Date'], line['Time'])
+        if 'Market Data' not in loaded_market_data[id]:
+            loaded_market_data[id]['Market Data'] = timeseries.TimeSeries()
+        quote = {'Closing Price' : line['Closing Price'],
+                 'Volume' : line['Volume']}
+        if replaces_same_day:
+            loaded_market_data[id]['Market Data'].replace_day(mydatetime, quote)
+        else:
+            loaded_market_data[id]['Market Data'][mydatetime] = quote
+
+    instrumentation.count('rows_loaded', rows)
+
+@functools.lru_cache(maxsize=65536)
+def _market_datetime(date_string, time_string):
+    '''Returns the datetime of a Date and a Time column. A missing time is
+    taken as 00:00:01.'''
+
+    date = _decode_date(date_string)
+    if not time_string:
+        return datetime.datetime(date.year, date.month, date.day, 0, 0, 1)
+
+    time = _decode_time(time_string)
+    return datetime.datetime(date.year,
+                             date.month,
+                             date.day,
+                             time.hour,
+                             time.minute,
+                             time.second)
+
+@instrumentation.timed('Market data save')
+def save_to_file(rows):
+    '''Saves an iterable of lists to CSV. The first list is the header.
+
+    The whole market data is written, so the journal segments (if any) are
+    folded in and deleted (compaction).'''
+
+    rows = iter(rows)
+    csv_helper.iter_writer(rows,
+                           _market_data_filename,
+                           header=next(rows),
+                           encoding=csv_encoding)
+
+    for segment_filename in _journal_segment_filenames():
+        os.remove(segment_filename)
+        logging.info('MarketDataCoupler: Journal segment %s compacted.',
+                     segment_filename)
+
+@instrumentation.timed('Journal append')
+def append_to_journal(rows):
+    '''Saves an iterable of lists (only the newly added rows) to a new
+    journal segment next to the market data CSV. The first list is the
+    header.'''
+
+    segments = _journal_segment_filenames()
+    next_number = (_journal_segment_number(segments[-1]) + 1
+                   if segments else 1)
+    segment_filename = _journal_segment_filename(next_number)
+
+    rows = iter(rows)
+    csv_helper.iter_writer(rows,
+                           segment_filename,
+                           header=next(rows),
+                           encoding=csv_encoding)
+    logging.info('MarketDataCoupler: Journal segment %s written.',
+                 segment_filename)
+
+def journal_is_appendable():
+    '''Returns True if the next save can be an incremental one, i.e. the
+    base CSV exists and the journal is not due for compaction.'''
+
+    return (incremental_save
+            and os.path.exists(_market_data_filename)
+            and len(_journal_segment_filenames()) < _compaction_after_segments)
+
+def _journal_segment_filename(number):
+    '''Returns the file name of the given journal segment, e.g.
+    market_data.journal.0001.csv'''
+
+    base, extension = os.path.splitext(_market_data_filename)
+    return '{}.journal.{:04d}{}'.format(base, number, extension)
+
+def _journal_segment_number(filename):
+    '''Returns the number of the journal segment from its file name.'''
+
+    return int(os.path.splitext(filename)[0].rsplit('.', 1)[1])
+
+def _journal_segment_filenames():
+    '''Returns the existing journal segment file names in writing order.'''
+
+    base, extension = os.path.splitext(_market_data_filename)
+    return sorted(glob.glob(glob.escape(base) + '.journal.*' + extension),
+                  key=_journal_segment_number)
+
+@instrumentation.timed('Market data load')
+def loaded_columnar_market_data():
+    '''
+    Returns the stored market data from the columnar file. The series are
+    memory-mapped and decoded on access only.
+    '''
+
+    logging.info('MarketDataCoupler: Loading market data from columnar file.')
+
+    # only the columnar storage needs its module (and mmap)
+    import marketdata_columnar
+
+    return marketdata_columnar.loaded_market_data(_columnar_market_data_filename)
+
+@instrumentation.timed('Market data save')
+def save_columnar_to_file(marketdata):
+    '''Saves the market data dict into the columnar file.'''
+
+    import marketdata_columnar
+
+    marketdata_columnar.save_to_file(marketdata,
+                                     _columnar_market_data_filename)
+
+@instrumentation.timed('Market data load')
+def loaded_sqlite_market_data():
+    '''Returns the stored market data from the SQLite database.'''
+
+    logging.info('MarketDataCoupler: Loading market data from SQLite database.')
+
+    # only the SQLite storage needs its module (and sqlite3)
+    import marketdata_sqlite
+
+    return marketdata_sqlite.loaded_market_data(_sqlite_market_data_filename)
+
+@instrumentation.timed('Market data save')
+def save_sqlite_to_file(marketdata, appended, cutoff=None):
+    '''Saves the entries added since the load (the (ISIN, datetime) pairs
+    appended) into the SQLite database, and deletes the entries older than
+    the cutoff (if any).'''
+
+    import marketdata_sqlite
+
+    marketdata_sqlite.save_to_file(marketdata,
+                                   _sqlite_market_data_filename,
+                                   appended,
+                                   cutoff)
+
+@instrumentation.timed('Market data load')
+def loaded_partitioned_market_data(start=None, end=None, isins=None):
+    '''
+    Returns the stored market data from start to end (datetimes, None for no
+    limit) of the ISINs (None for all) from the monthly partitions. Only the
+    partitions overlapping the window are read.
+    '''
+
+    logging.info('MarketDataCoupler: Loading market data from partitions.')
+
+    # only the partitioned storage needs its module (and gzip, json)
+    import marketdata_partitioned
+
+    return marketdata_partitioned.loaded_market_data(
+        _partitioned_market_data_directory, start, end, isins,
+        encoding=csv_encoding)
+
+@instrumentation.timed('Market data save')
+def expired_partitions(cutoff):
+    '''Returns the months of the stored partitions older than the cutoff.'''
+
+    import marketdata_partitioned
+
+    try:
+        partitions = marketdata_partitioned.manifest(
+            _partitioned_market_data_directory)
+    except FileNotFoundError:
+        return []
+    return marketdata_partitioned.expired_months(partitions, cutoff)
+
+def save_partitioned_to_file(marketdata, appended, cutoff=None):
+    '''Saves the entries added since the load (the (ISIN, datetime) pairs
+    appended) into the partitions of their months, and deletes the
+    partitions older than the cutoff (if any).'''
+
+    import marketdata_partitioned
+
+    marketdata_partitioned.save_to_file(marketdata,
+                                        _partitioned_market_data_directory,
+                                        appended,
+                                        compress=compress_partitions,
+                                        encoding=csv_encoding)
+    if cutoff is not None:
+        marketdata_partitioned.delete_expired(
+            _partitioned_market_data_directory, cutoff)
+
 def main():
     pass
 
@@ -2,15 +2,33 @@
 Serves as interface to the web to obtain latest market data.
 '''
 
-__last_change__ = '2017.08.28.'
+__last_change__ = '2026.10.18.'
 
+import codecs
+import collections
+import concurrent.futures
 import csv_helper
 from html.parser import HTMLParser
+import http.client
+import http_cache
+import instrumentation
 import logging
 import sys
 import teletrader
+import time
+import urllib.error
 import urllib.request
 
+# the outcome of fetching one stock exchange page
+FetchResult = collections.namedtuple('FetchResult',
+                                     ('stock_exchange',
+                                      'stocks',
+                                      'attempts',
+                                      'error'))
+
+_response_cache = http_cache.ResponseCache(teletrader.cache_directory,
+                                           teletrader.cache_freshness)
+
 def loaded_market_data(converter,
                        source_is_web = True):
     '''Loads the market data from an html (the web or a file).
@@ -37,27 +55,231 @@ def _tuples_from_html(source_is_web = True):
             'HTMLParser: Loading market data from html file (TEST MODE).')
         return _tuples_loaded_from_file('exp.htm')
 
-def _tuples_loaded_from_urls(urls):
+def _tuples_loaded_from_urls(urls,
+                             workers=None,
+                             timeout=None,
+                             retries=None,
+                             backoff=None):
     '''
     Returns a tuple of dictionaries containing the market data combined from 
-    all the given urls.
+    all the given urls, ordered by stock exchange.
+
+    The urls are fetched concurrently, see _fetch_results.
     '''
 
     content = []
-    for stock_exchange in sorted(urls):
-        content.extend(_tuples_loaded_from_url(stock_exchange,
-                                               urls[stock_exchange]))
+    for result in _fetch_results(urls, workers, timeout, retries, backoff):
+        if result.error is None:
+            content.extend(result.stocks)
     return(tuple(content))
 
-def _tuples_loaded_from_url(stock_exchange_name, url):
+def _fetch_results(urls,
+                   workers=None,
+                   timeout=None,
+                   retries=None,
+                   backoff=None):
+    '''
+    Fetches and parses the urls in a thread pool and returns a list of
+    FetchResult, ordered by stock exchange (as the sequential fetching did).
+    A failed page does not stop the others, it is reported in its result.
+
+    The parameters default to the Fetch settings in config.ini.
+    '''
+
+    workers = workers or teletrader.fetch_workers
+    timeout = timeout or teletrader.fetch_timeout
+    retries = teletrader.fetch_retries if retries is None else retries
+    backoff = teletrader.fetch_backoff if backoff is None else backoff
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_fetch_result,
+                                   stock_exchange,
+                                   urls[stock_exchange],
+                                   timeout,
+                                   retries,
+                                   backoff)
+                   for stock_exchange in sorted(urls)]
+        results = [future.result() for future in futures]
+
+    for result in results:
+        if result.error is None:
+            logging.info('HTMLParser: Stock Exchange: %s, fetched in %d '
+                         'attempt(s), %d paper(s).',
+                         result.stock_exchange,
+                         result.attempts,
+                         len(result.stocks))
+        else:
+            logging.error('HTMLParser: Stock Exchange: %s, failed after %d '
+                          'attempt(s): %s',
+                          result.stock_exchange,
+                          result.attempts,
+                          result.error)
+
+    return results
+
+def _fetch_result(stock_exchange_name, url, timeout, retries, backoff):
+    '''
+    Fetches and parses one url, retrying on network errors (including a body
+    cut short, raised by http.client while streaming) and server side HTTP
+    errors. Returns a FetchResult.
+    '''
+
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            with instrumentation.timer('Fetch', exchange=stock_exchange_name):
+                stocks = _tuples_loaded_from_url(stock_exchange_name,
+                                                 url,
+                                                 timeout)
+            return FetchResult(stock_exchange_name, stocks, attempt, None)
+        except (OSError, http.client.HTTPException) as error:
+            permanent = (isinstance(error, urllib.error.HTTPError)
+                         and error.code < 500)
+            if permanent or attempt > retries:
+                return FetchResult(stock_exchange_name, [], attempt, error)
+            logging.warning('HTMLParser: Stock Exchange: %s, attempt %d '
+                            'failed (%s), retrying.',
+                            stock_exchange_name,
+                            attempt,
+                            error)
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+def _tuples_loaded_from_url(stock_exchange_name, url, timeout=None):
     '''
     Returns a tuple of dictionaries containing the market data parsed from 
     one url.
+
+    If the cache is enabled, the page is fetched through it and the rows of
+    an unchanged page are reused instead of parsing it again.
+    '''
+
+    timeout = timeout or teletrader.fetch_timeout
+
+    if teletrader.streaming_parse:
+        return list(iter_tuples_loaded_from_url(stock_exchange_name,
+                                                url,
+                                                timeout))
+
+    if not teletrader.cache_enabled:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            content = response.read()
+        instrumentation.count('bytes_fetched', len(content),
+                              exchange=stock_exchange_name)
+        return _tuples_parsed_from_html(stock_exchange_name,
+                                        str(content, encoding='utf-8'))
+
+    page = http_cache.fetched(url, _response_cache, timeout)
+    if page.rows is not None:
+        logging.info('HTMLParser: Stock Exchange: %s, page %s, '
+                     '%d paper(s) reused from cache.',
+                     stock_exchange_name,
+                     page.status,
+                     len(page.rows))
+        instrumentation.count('rows_reused', len(page.rows),
+                              exchange=stock_exchange_name)
+        return page.rows
+
+    instrumentation.count('bytes_fetched', len(page.body),
+                          exchange=stock_exchange_name)
+    stocks = _tuples_parsed_from_html(stock_exchange_name,
+                                      str(page.body, encoding='utf-8'))
+    _response_cache.store_rows(url, stocks)
+    return stocks
+
+def iter_tuples_loaded_from_url(stock_exchange_name,
+                                url,
+                                timeout=None,
+                                chunk_size=None):
     '''
+    Yields the market data parsed from one url while it is being downloaded.
 
-    return _tuples_parsed_from_html(stock_exchange_name,
-                                    str(urllib.request.urlopen(url).read(),
-                                        encoding='utf-8'))
+    The page is read in chunks and fed to the parser chunk by chunk, so the
+    parsing overlaps the download and the page is never held in memory as a
+    whole. If the cache is enabled, the page is written to it while read, and
+    the rows of an unchanged page are yielded from it.
+    '''
+
+    timeout = timeout or teletrader.fetch_timeout
+    chunk_size = chunk_size or teletrader.stream_chunk_size
+
+    if teletrader.cache_enabled:
+        page = http_cache.fetched(url, _response_cache, timeout, stream=True)
+        if page.rows is not None:
+            logging.info('HTMLParser: Stock Exchange: %s, page %s, '
+                         '%d paper(s) reused from cache.',
+                         stock_exchange_name,
+                         page.status,
+                         len(page.rows))
+            instrumentation.count('rows_reused', len(page.rows),
+                                  exchange=stock_exchange_name)
+            yield from page.rows
+            return
+        body = page.body
+    else:
+        body = urllib.request.urlopen(url, timeout=timeout)
+
+    # the rows are kept for the cache only, the page itself is not
+    stocks = []
+    with body:
+        for rows in _iter_tuples_parsed_from_chunks(
+                stock_exchange_name,
+                iter(lambda: body.read(chunk_size), b'')):
+            if teletrader.cache_enabled:
+                stocks.extend(rows)
+            yield from rows
+
+    if teletrader.cache_enabled:
+        _response_cache.store_rows(url, stocks)
+
+def _iter_tuples_parsed_from_chunks(stock_exchange_name, chunks):
+    '''
+    Yields lists of the rows parsed from the chunks (bytes) of a page, as
+    soon as they are complete.
+
+    HTMLParser passes the text at the end of a chunk to handle_data even if it
+    continues in the next chunk, so the text is fed only up to the last '<'
+    and the rest is kept for the next chunk.
+    '''
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    t = teletrader.TeletraderHTMLParser(stock_exchange_name)
+    pending = ''
+    counter = 0
+
+    for chunk in chunks:
+        instrumentation.count('bytes_fetched', len(chunk),
+                              exchange=stock_exchange_name)
+        pending += decoder.decode(chunk)
+        last_tag = pending.rfind('<')
+        if last_tag <= 0:
+            continue
+        with instrumentation.timer('HTML parse', exchange=stock_exchange_name):
+            t.feed(pending[:last_tag])
+        pending = pending[last_tag:]
+        if t.stocks:
+            counter += len(t.stocks)
+            yield t.stocks
+            t.stocks = []
+
+    with instrumentation.timer('HTML parse', exchange=stock_exchange_name):
+        t.feed(pending + decoder.decode(b'', final=True))
+        t.close()
+    if t.stocks:
+        counter += len(t.stocks)
+        yield t.stocks
+
+    instrumentation.count('rows_parsed', counter, exchange=stock_exchange_name)
+
+    if counter:
+        logging.info('HTMLParser: Stock Exchange: %s, '
+                     'Number of papers extracted: %d',
+                     stock_exchange_name,
+                     counter)
+    else:
+        logging.warning('HTMLParser: Stock Exchange: %s, '
+                        'No papers extracted',
+                        stock_exchange_name)
 
 def _urls_loaded_from_csv():
     '''
@@ -66,7 +288,8 @@ def _urls_loaded_from_csv():
     
     return {line['Stock Exchange']: line['URL']
             for line
-            in csv_helper.reader(teletrader.urls_filename)}
+            in csv_helper.iter_reader(teletrader.urls_filename,
+                                      encoding=teletrader._csv_encoding)}
 
 def _tuples_loaded_from_file(filename):
     '''
@@ -87,7 +310,10 @@ def _tuples_parsed_from_html(stock_exchange_name,
     '''
     
     t = teletrader.TeletraderHTMLParser(stock_exchange_name)
-    t.feed(html_string)
+    with instrumentation.timer('HTML parse', exchange=stock_exchange_name):
+        t.feed(html_string)
+    instrumentation.count('rows_parsed', len(t.stocks),
+                          exchange=stock_exchange_name)
 
     if t.stocks:
         logging.info('HTMLParser: Stock Exchange: %s, '
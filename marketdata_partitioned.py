@@ -0,0 +1,321 @@
+'''
+Time-partitioned storage of the market data.
+
+The history is split into one CSV file per month (e.g. 2018-07.csv.gz, gzip
+compressed if configured) in a directory, next to a manifest (manifest.json)
+listing the file, the first and last datetime, the number of rows and the
+ISINs of each partition.
+
+A load reads the manifest first and opens only the partitions overlapping
+the requested window (and holding the requested ISINs). A save rewrites only
+the partitions of the months having new entries, merging these into the
+stored ones, so a daily save touches the current month only. The expired
+history is deleted a partition file at a time.
+
+Usage: python marketdata_partitioned.py migrate
+(copies the configured CSV market data, with its journal, into partitions)
+'''
+
+__last_change__ = '2026.10.18.'
+
+import csv
+import datetime
+import functools
+import gzip
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import timeseries
+
+manifest_filename = 'manifest.json'
+_version = 1
+
+_header = ('ISIN',
+           'Datetime',
+           'Closing Price',
+           'Volume',
+           'TeleTrader Name',
+           'Stock Exchange')
+
+def manifest(directory):
+    '''Returns the manifest of the partitions, the months ('YYYY-MM') mapped
+    to their entries. Raises FileNotFoundError if there is none.'''
+
+    with open(os.path.join(directory, manifest_filename),
+              encoding='utf-8') as f:
+        content = json.load(f)
+    if content.get('Version') != _version:
+        raise ValueError('Unknown partition manifest version: {}'.format(
+            content.get('Version')))
+    return content['Partitions']
+
+def overlapping_months(partitions, start=None, end=None, isins=None):
+    '''Returns the sorted months of the manifest entries overlapping the
+    window from start to end (datetimes, both included, None for no limit)
+    and holding any of the ISINs (None for all).'''
+
+    start = _datetime_to_text(start) if start is not None else None
+    end = _datetime_to_text(end) if end is not None else None
+    isins = set(isins) if isins is not None else None
+
+    return sorted(month for month, entry in partitions.items()
+                  if (start is None or entry['Last'] >= start)
+                  and (end is None or entry['First'] <= end)
+                  and (isins is None or not isins.isdisjoint(entry['ISINs'])))
+
+def expired_months(partitions, cutoff):
+    '''Returns the sorted months of the manifest entries all older than the
+    cutoff (a datetime).'''
+
+    cutoff = _datetime_to_text(cutoff)
+    return sorted(month for month, entry in partitions.items()
+                  if entry['Last'] < cutoff)
+
+def loaded_market_data(directory, start=None, end=None, isins=None,
+                       encoding=None):
+    '''
+    Returns the market data from start to end (datetimes, both included,
+    None for no limit) of the ISINs (None for all), in the same dict layout
+    as marketdata_coupler.loaded_past_market_data returns. Only the
+    partitions overlapping the window are opened.
+    '''
+
+    partitions = manifest(directory)
+    months = overlapping_months(partitions, start, end, isins)
+
+    logging.info('Partitioned: Loading market data from %s (%d of %d '
+                 'partition(s)).', directory, len(months), len(partitions))
+
+    lower = _datetime_to_text(start) if start is not None else None
+    upper = _datetime_to_text(end) if end is not None else None
+    isins = set(isins) if isins is not None else None
+
+    loaded_market_data = {}
+    quotes = {}
+    for month in months:
+        for row in _rows(os.path.join(directory, partitions[month]['Filename']),
+                         encoding):
+            isin, this_datetime = row[0], row[1]
+            if ((lower is not None and this_datetime < lower)
+                    or (upper is not None and this_datetime > upper)
+                    or (isins is not None and isin not in isins)):
+                continue
+            if isin not in loaded_market_data:
+                loaded_market_data[isin] = {'Stock Exchange': row[5],
+                                            'TeleTrader Name': row[4]}
+                quotes[isin] = {}
+            quotes[isin][_parsed_datetime(this_datetime)] = {
+                'Closing Price': row[2],
+                'Volume': row[3]}
+
+    for isin in loaded_market_data:
+        loaded_market_data[isin]['Market Data'] = timeseries.TimeSeries(
+            quotes[isin])
+
+    logging.info('Partitioned: %d ISIN(s) loaded.', len(loaded_market_data))
+
+    return loaded_market_data
+
+def save_to_file(marketdata, directory, appended=None, compress=True,
+                 encoding=None):
+    '''
+    Saves the market data dict into partitions and returns the months
+    rewritten.
+
+    Args:
+        appended: the (ISIN, datetime) pairs added since the load; only the
+            partitions of their months are rewritten, the pairs merged into
+            them by replacing the quotes of the same day. None writes the
+            partition of every month of the market data from it alone.
+        compress: gzip the partitions written.
+    '''
+
+    os.makedirs(directory, exist_ok=True)
+    try:
+        partitions = manifest(directory)
+    except FileNotFoundError:
+        partitions = {}
+
+    if appended is None:
+        pairs = ((isin, this_datetime)
+                 for isin in marketdata
+                 for this_datetime in marketdata[isin]['Market Data'])
+    else:
+        pairs = (pair for pair in set(appended)
+                 if pair[0] in marketdata
+                 and pair[1] in marketdata[pair[0]]['Market Data'])
+
+    pairs_of_months = {}
+    for isin, this_datetime in pairs:
+        pairs_of_months.setdefault(_month(this_datetime), []).append(
+            (isin, this_datetime))
+
+    for month, month_pairs in sorted(pairs_of_months.items()):
+        series = {}
+        names = {}
+        if appended is not None and month in partitions:
+            for row in _rows(os.path.join(directory,
+                                          partitions[month]['Filename']),
+                             encoding):
+                series.setdefault(row[0], timeseries.TimeSeries())[
+                    _parsed_datetime(row[1])] = {'Closing Price': row[2],
+                                                 'Volume': row[3]}
+                names[row[0]] = (row[4], row[5])
+
+        for isin, this_datetime in sorted(month_pairs):
+            series.setdefault(isin, timeseries.TimeSeries()).replace_day(
+                this_datetime, marketdata[isin]['Market Data'][this_datetime])
+            names[isin] = (marketdata[isin]['TeleTrader Name'],
+                           marketdata[isin]['Stock Exchange'])
+
+        entry = _written_partition(directory, month, series, names, compress,
+                                   encoding)
+        if (month in partitions
+                and partitions[month]['Filename'] != entry['Filename']):
+            os.remove(os.path.join(directory, partitions[month]['Filename']))
+        partitions[month] = entry
+
+    if pairs_of_months:
+        _save_manifest(directory, partitions)
+
+    logging.info('Partitioned: %d partition(s) rewritten.', len(pairs_of_months))
+    return sorted(pairs_of_months)
+
+def delete_expired(directory, cutoff):
+    '''Deletes the partitions whose entries are all older than the cutoff
+    (a datetime), returns their number.'''
+
+    try:
+        partitions = manifest(directory)
+    except FileNotFoundError:
+        return 0
+
+    expired = expired_months(partitions, cutoff)
+    if not expired:
+        return 0
+
+    filenames = [partitions.pop(month)['Filename'] for month in expired]
+    # the manifest first, so a partition is never listed without its file
+    _save_manifest(directory, partitions)
+    for filename in filenames:
+        os.remove(os.path.join(directory, filename))
+
+    logging.info('Partitioned: %d expired partition(s) deleted (%s ... %s).',
+                 len(expired), expired[0], expired[-1])
+    return len(expired)
+
+def _written_partition(directory, month, series, names, compress, encoding):
+    '''Writes the partition of the month (the series and the names of the
+    ISINs), returns its manifest entry.'''
+
+    filename = month + ('.csv.gz' if compress else '.csv')
+    rows = 0
+    first = last = None
+
+    fd, temp_filename = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            # no timestamp in the gzip header, the same content gives the
+            # same file
+            binary = (gzip.GzipFile(fileobj=raw, mode='wb', mtime=0)
+                      if compress else raw)
+            with io.TextIOWrapper(binary, encoding=encoding,
+                                  newline='') as f:
+                csvwriter = csv.writer(f, delimiter=';')
+                csvwriter.writerow(_header)
+                for isin in sorted(series):
+                    for this_datetime, quote in series[isin].items():
+                        text = _datetime_to_text(this_datetime)
+                        csvwriter.writerow((isin,
+                                            text,
+                                            quote['Closing Price'],
+                                            quote['Volume'],
+                                            names[isin][0],
+                                            names[isin][1]))
+                        rows += 1
+                        first = text if first is None else min(first, text)
+                        last = text if last is None else max(last, text)
+        os.replace(temp_filename, os.path.join(directory, filename))
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+    return {'Filename': filename,
+            'First': first,
+            'Last': last,
+            'Rows': rows,
+            'ISINs': sorted(series)}
+
+def _save_manifest(directory, partitions):
+    '''Saves the manifest of the partitions.'''
+
+    with tempfile.NamedTemporaryFile('w', dir=directory, encoding='utf-8',
+                                     suffix='.tmp', delete=False) as f:
+        json.dump({'Version': _version, 'Partitions': partitions}, f,
+                  indent=1, sort_keys=True)
+    os.replace(f.name, os.path.join(directory, manifest_filename))
+
+def _rows(filename, encoding):
+    '''Yields the rows (lists in header order) of a partition.'''
+
+    opener = gzip.open if filename.endswith('.gz') else open
+    with opener(filename, 'rt', encoding=encoding, newline='') as f:
+        csvreader = csv.reader(f, delimiter=';')
+        next(csvreader, None)
+        for row in csvreader:
+            if row:
+                yield row
+
+def _month(dt):
+    '''Returns the month of the datetime, the key of its partition.'''
+
+    return '{:04d}-{:02d}'.format(dt.year, dt.month)
+
+def _datetime_to_text(dt):
+    '''Returns the datetime as stored, sorting as the datetimes do.'''
+
+    return dt.isoformat(' ', 'seconds')
+
+@functools.lru_cache(maxsize=65536)
+def _parsed_datetime(text):
+    '''Returns the datetime of its stored text.'''
+
+    return datetime.datetime.fromisoformat(text)
+
+def migrated():
+    '''Copies the CSV market data (with its journal segments) into
+    partitions. Returns the months written.'''
+
+    import marketdata_coupler as mdc
+    import teletrader
+
+    start = time.perf_counter()
+    marketdata = mdc.loaded_past_market_data(teletrader.TTConverter())
+    months = save_to_file(marketdata, mdc._partitioned_market_data_directory,
+                          compress=mdc.compress_partitions,
+                          encoding=mdc.csv_encoding)
+
+    logging.info('Partitioned: %d month(s) migrated from %s to %s in %.2f s.',
+                 len(months), mdc._market_data_filename,
+                 mdc._partitioned_market_data_directory,
+                 time.perf_counter() - start)
+    return months
+
+def main(argv=None):
+    '''Migrates the CSV market data into partitions.'''
+
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO)
+
+    if argv != ['migrate']:
+        print(__doc__.strip().splitlines()[-2])
+        return 2
+
+    migrated()
+
+if __name__ == '__main__':
+    sys.exit(main())
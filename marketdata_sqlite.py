@@ -0,0 +1,233 @@
+'''
+SQLite storage of the market data.
+
+The quotes are kept in one table keyed by (ISIN, datetime), the TeleTrader
+names and the stock exchanges of the ISINs in another one. The database is
+in WAL mode, so a save appends to the write-ahead log instead of rewriting
+the file, and a reader is not blocked by a save.
+
+A daily save writes only the quotes added since the load, as bulk upserts
+following the same-day rules of TimeSeries.merge, and deletes the quotes
+older than the retention cutoff through the index on the datetimes.
+
+Usage: python marketdata_sqlite.py migrate
+(copies the configured CSV market data, with its journal, into the database)
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+import logging
+import os
+import sqlite3
+import sys
+import time
+import timeseries
+
+_schema = (
+    '''CREATE TABLE IF NOT EXISTS isins (
+           isin TEXT PRIMARY KEY,
+           teletrader_name TEXT NOT NULL,
+           stock_exchange TEXT NOT NULL)''',
+    '''CREATE TABLE IF NOT EXISTS quotes (
+           isin TEXT NOT NULL,
+           datetime TEXT NOT NULL,
+           closing_price TEXT NOT NULL,
+           volume TEXT NOT NULL,
+           PRIMARY KEY (isin, datetime)) WITHOUT ROWID''',
+    # the retention delete
+    'CREATE INDEX IF NOT EXISTS quotes_datetime ON quotes (datetime)')
+
+# the same-day rules, in this order for a batch of at most one quote per ISIN
+# and day: the latest quote of the day is deleted if earlier than the new one
+# (update), and the new one is inserted unless the day has a quote at the
+# same time or later (discard)
+_delete_earlier = '''
+    DELETE FROM quotes
+    WHERE isin = :isin
+      AND datetime = (SELECT max(datetime) FROM quotes
+                      WHERE isin = :isin
+                        AND datetime >= :day AND datetime < :next_day)
+      AND datetime < :datetime'''
+
+_insert_unless_later = '''
+    INSERT INTO quotes (isin, datetime, closing_price, volume)
+    SELECT :isin, :datetime, :closing_price, :volume
+    WHERE NOT EXISTS (SELECT 1 FROM quotes
+                      WHERE isin = :isin
+                        AND datetime >= :datetime AND datetime < :next_day)'''
+
+_upsert_isin = '''
+    INSERT INTO isins (isin, teletrader_name, stock_exchange)
+    VALUES (?, ?, ?)
+    ON CONFLICT (isin) DO UPDATE SET
+        teletrader_name = excluded.teletrader_name,
+        stock_exchange = excluded.stock_exchange'''
+
+_one_day = datetime.timedelta(days=1)
+
+def connected(filename):
+    '''Returns a connection to the database, creating the tables if
+    missing.'''
+
+    connection = sqlite3.connect(filename)
+    connection.execute('PRAGMA journal_mode = WAL')
+    # in WAL mode a commit is durable after a checkpoint, enough for the
+    # market data
+    connection.execute('PRAGMA synchronous = NORMAL')
+    with connection:
+        for statement in _schema:
+            connection.execute(statement)
+    return connection
+
+def loaded_market_data(filename):
+    '''
+    Returns the market data stored in the database, in the same dict layout
+    as marketdata_coupler.loaded_past_market_data returns. Raises
+    FileNotFoundError if there is no database.
+    '''
+
+    logging.info('SQLite: Loading market data from %s.', filename)
+
+    if not os.path.exists(filename):
+        raise FileNotFoundError('No market data database: ' + filename)
+
+    loaded_market_data = {}
+    connection = connected(filename)
+    try:
+        for isin, teletrader_name, stock_exchange in connection.execute(
+                'SELECT isin, teletrader_name, stock_exchange FROM isins'):
+            loaded_market_data[isin] = {'Stock Exchange': stock_exchange,
+                                        'TeleTrader Name': teletrader_name}
+
+        quotes = {}
+        for isin, this_datetime, closing_price, volume in connection.execute(
+                'SELECT isin, datetime, closing_price, volume FROM quotes '
+                'ORDER BY isin, datetime'):
+            quotes.setdefault(isin, {})[
+                datetime.datetime.fromisoformat(this_datetime)] = {
+                    'Closing Price': closing_price,
+                    'Volume': volume}
+    finally:
+        connection.close()
+
+    for isin, series in quotes.items():
+        loaded_market_data.setdefault(isin, {'Stock Exchange': '',
+                                             'TeleTrader Name': ''})
+        loaded_market_data[isin]['Market Data'] = timeseries.TimeSeries(series)
+    for isin in [isin for isin in loaded_market_data
+                 if 'Market Data' not in loaded_market_data[isin]]:
+        del loaded_market_data[isin]
+
+    logging.info('SQLite: %d ISIN(s) loaded.', len(loaded_market_data))
+
+    return loaded_market_data
+
+def save_to_file(marketdata, filename, appended=None, cutoff=None):
+    '''
+    Saves the market data dict into the database and returns the number of
+    quotes written and deleted.
+
+    Args:
+        appended: the (ISIN, datetime) pairs added since the load; only
+            these are written, by the same-day rules. None replaces the
+            whole content with the market data.
+        cutoff: optional datetime, the quotes older than it are deleted.
+    '''
+
+    connection = connected(filename)
+    try:
+        with connection:
+            if appended is None:
+                connection.execute('DELETE FROM quotes')
+                connection.execute('DELETE FROM isins')
+                pairs = ((isin, this_datetime)
+                         for isin in sorted(marketdata)
+                         for this_datetime in marketdata[isin]['Market Data'])
+            else:
+                pairs = sorted(set(appended))
+
+            rows = [_parameters(marketdata, isin, this_datetime)
+                    for isin, this_datetime in pairs
+                    if isin in marketdata
+                    and this_datetime in marketdata[isin]['Market Data']]
+            isins = sorted({row['isin'] for row in rows})
+
+            if appended is None:
+                written = connection.executemany(
+                    'INSERT INTO quotes (isin, datetime, closing_price, volume) '
+                    'VALUES (:isin, :datetime, :closing_price, :volume)',
+                    rows).rowcount
+            else:
+                connection.executemany(_delete_earlier, rows)
+                written = connection.executemany(_insert_unless_later,
+                                                 rows).rowcount
+            connection.executemany(_upsert_isin,
+                                   [(isin,
+                                     marketdata[isin]['TeleTrader Name'],
+                                     marketdata[isin]['Stock Exchange'])
+                                    for isin in isins])
+
+            deleted = 0
+            if cutoff is not None:
+                deleted = connection.execute(
+                    'DELETE FROM quotes WHERE datetime < ?',
+                    (_datetime_to_text(cutoff),)).rowcount
+                if deleted:
+                    connection.execute(
+                        'DELETE FROM isins WHERE NOT EXISTS '
+                        '(SELECT 1 FROM quotes WHERE quotes.isin = isins.isin)')
+    finally:
+        connection.close()
+
+    logging.info('SQLite: %d quote(s) of %d ISIN(s) written, %d deleted.',
+                 written, len(isins), deleted)
+    return written, deleted
+
+def _parameters(marketdata, isin, this_datetime):
+    '''Returns the statement parameters of one quote.'''
+
+    quote = marketdata[isin]['Market Data'][this_datetime]
+    day = datetime.datetime.combine(this_datetime.date(), datetime.time.min)
+    return {'isin': isin,
+            'datetime': _datetime_to_text(this_datetime),
+            'day': _datetime_to_text(day),
+            'next_day': _datetime_to_text(day + _one_day),
+            'closing_price': quote['Closing Price'],
+            'volume': quote['Volume']}
+
+def _datetime_to_text(dt):
+    '''Returns the datetime as stored, sorting as the datetimes do.'''
+
+    return dt.isoformat(' ', 'seconds')
+
+def migrated():
+    '''Copies the CSV market data (with its journal segments) into the
+    database. Returns the number of quotes copied.'''
+
+    import marketdata_coupler as mdc
+    import teletrader
+
+    start = time.perf_counter()
+    marketdata = mdc.loaded_past_market_data(teletrader.TTConverter())
+    written, _ = save_to_file(marketdata, mdc._sqlite_market_data_filename)
+
+    logging.info('SQLite: %d quote(s) migrated from %s to %s in %.2f s.',
+                 written, mdc._market_data_filename,
+                 mdc._sqlite_market_data_filename, time.perf_counter() - start)
+    return written
+
+def main(argv=None):
+    '''Migrates the CSV market data into the database.'''
+
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO)
+
+    if argv != ['migrate']:
+        print(__doc__.strip().splitlines()[-2])
+        return 2
+
+    migrated()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+'''
+The command line entry point of the Peter project.
+
+    python peter.py fetch                 fetches the closing prices
+    python peter.py screen                assembles the short-list
+    python peter.py import [directory]    imports the daily snapshots
+    python peter.py report                summarises the stored data
+    python peter.py collect [command]     runs the collector, or controls it
+    python peter.py startup [command ...] measures the startup of the commands
+
+config.ini is parsed once into settings.config, and each command imports only
+the modules it needs, so e.g. the report does not load the HTML parser.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import argparse
+import logging
+import os
+import settings
+import subprocess
+import sys
+import time
+import types
+
+# the modules each command needs, imported on running it
+subsystems = {'fetch': ('marketdata',),
+              'screen': ('indicators', 'marketdata', 'registry', 'screener'),
+              'import': ('marketdata', 'snapshot_importer'),
+              'report': ('indicators', 'marketdata', 'query', 'registry'),
+              'collect': ('collector',)}
+
+# the number of the slowest imports shown per command by startup
+_slowest_shown = 5
+
+def imported(command):
+    '''Imports the modules of the command, returns them as the attributes of
+    a namespace.'''
+
+    # __import__ rather than importlib.import_module, whose imports are not
+    # reported by python -X importtime
+    return types.SimpleNamespace(**{name: __import__(name)
+                                    for name in subsystems[command]})
+
+def fetch(arguments):
+    '''Fetches the actual closing prices into the stored market data and
+    folds them into the indicator state.'''
+
+    modules = imported('fetch')
+
+    past_market_data = modules.marketdata.MarketData()
+    past_market_data.load_from_file()
+    past_market_data.clean()
+
+    actual_market_data = modules.marketdata.MarketData()
+    actual_market_data.load_from_html(
+        settings.config['DEFAULT'].getboolean('Source is web'))
+
+    past_market_data.append(actual_market_data.marketdata)
+    past_market_data.clean()
+
+    # only the new quotes are folded into the moving averages; only this
+    # step needs the screener and numpy
+    import indicators
+
+    indicator_state = indicators.IndicatorState()
+    indicator_state.load_from_file()
+    indicator_state.update(past_market_data)
+
+    past_market_data.save_to_file()
+    indicator_state.save_to_file()
+
+def screen(arguments):
+    '''Assembles the short-list of the stored market data.'''
+
+    modules = imported('screen')
+
+    reg = modules.registry.Registry()
+    reg.load_from_file()
+
+    market_data = modules.marketdata.MarketData()
+    market_data.load_from_file()
+
+    # the moving averages are kept up to date incrementally
+    indicator_state = modules.indicators.IndicatorState()
+    indicator_state.load_from_file()
+    indicator_state.update(market_data)
+
+    slist = modules.screener.ShortList(reg)
+    slist.assemble(indicator_state)
+
+    slist.save_to_file()
+    indicator_state.save_to_file()
+
+def import_snapshots(arguments):
+    '''Imports the snapshots of a directory into the stored market data.'''
+
+    modules = imported('import')
+
+    market_data = modules.marketdata.MarketData()
+    try:
+        market_data.load_from_file()
+    except FileNotFoundError:
+        logging.warning('Peter: No stored market data, starting with an '
+                        'empty one.')
+
+    modules.snapshot_importer.import_directory(market_data, arguments.directory)
+    market_data.save_to_file()
+
+def report(arguments):
+    '''Prints a summary of the stored market data, the indicator state and
+    the registry.'''
+
+    modules = imported('report')
+
+    market_data = modules.marketdata.MarketData()
+    market_data.load_from_file()
+    index = modules.query.MarketDataIndex(market_data)
+    quotes = sum(len(index.series(isin).datetimes) for isin in index.isins)
+    last_quotes = index.latest().datetimes
+
+    indicator_state = modules.indicators.IndicatorState()
+    indicator_state.load_from_file()
+
+    reg = modules.registry.Registry()
+    reg.load_from_file()
+    errors = sum(len(value) if isinstance(value, set) else 1
+                 for error, value in reg.errors.items()
+                 if error != 'Errors found' and value)
+
+    print('Market data ({}): {} ISIN(s), {} quote(s)'.format(
+        modules.marketdata.mdc.storage_format, len(index.isins), quotes))
+    if len(last_quotes):
+        print('Last quotes: {} ... {}'.format(last_quotes.min().item(),
+                                              last_quotes.max().item()))
+    print('Indicator state: {} ISIN(s), {} trading day(s)'.format(
+        len(indicator_state.isins), len(indicator_state.calendar)))
+    print('Registry: {} ISIN(s), {} error(s)'.format(len(reg), errors))
+
+def collect(arguments):
+    '''Runs the collector keeping the market data in memory, or sends a
+    command to the running one.'''
+
+    modules = imported('collect')
+
+    if arguments.control:
+        print(modules.collector.sent(modules.collector.control_filename,
+                                     arguments.control))
+        return
+
+    modules.collector.Collector().run()
+
+def startup(arguments):
+    '''Prints the startup time of the commands, each measured in a fresh
+    interpreter with python -X importtime.'''
+
+    print('{:<12} {:>10} {:>10}  {}'.format('Command', 'Import ms', 'Total ms',
+                                          'Slowest imports (cumulative ms)'))
+    for command in [None] + (arguments.commands or list(subsystems)):
+        imports_ms, total_ms, slowest = startup_time(command)
+        print('{:<12} {:>10.1f} {:>10.1f}  {}'.format(
+            command or '(none)', imports_ms, total_ms,
+            ', '.join('{} {:.1f}'.format(name, ms) for name, ms in slowest)))
+
+def startup_time(command=None):
+    '''
+    Returns the startup of a command as (milliseconds spent importing,
+    milliseconds until the command could start, the slowest top level imports
+    as (module, milliseconds) pairs).
+
+    The startup is importing this module, parsing the config and importing
+    the modules of the command (none if None) in a new interpreter.
+    '''
+
+    code = ('import sys; sys.path.insert(0, {!r}); import peter; '
+            'peter.settings.config.sections()').format(
+                os.path.dirname(os.path.abspath(__file__)))
+    if command is not None:
+        code += '; peter.imported({!r})'.format(command)
+
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                             stderr=subprocess.PIPE, universal_newlines=True,
+                             check=True)
+    total_ms = (time.perf_counter() - start) * 1000
+
+    imports_ms = 0.0
+    top_level = []
+    for line in process.stderr.splitlines():
+        # import time:   self [us] | cumulative | imported package
+        fields = line[len('import time:'):].split('|')
+        if not line.startswith('import time:') or not fields[0].strip().isdigit():
+            continue
+        imports_ms += int(fields[0]) / 1000
+        if not fields[2].startswith('  '):
+            top_level.append((fields[2].strip(), int(fields[1]) / 1000))
+
+    slowest = sorted(top_level, key=lambda item: item[1], reverse=True)
+    return imports_ms, total_ms, slowest[:_slowest_shown]
+
+def parsed_arguments(argv=None):
+    '''Returns the parsed command line.'''
+
+    parser = argparse.ArgumentParser(prog='peter',
+                                     description='Stock exchange screening.')
+    parser.add_argument('--debug', action='store_true',
+                        help='log the debug messages too')
+    parser.add_argument('--config', default=settings.config_filename,
+                        help='the config file (default: %(default)s)')
+    parser.add_argument('--instrument', action='store_true',
+                        help='time the stages and count the rows, and save '
+                             'the report (see instrumentation)')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    command = commands.add_parser('fetch', help='fetch the closing prices')
+    command.set_defaults(function=fetch)
+
+    command = commands.add_parser('screen', help='assemble the short-list')
+    command.set_defaults(function=screen)
+
+    command = commands.add_parser('import', help='import the daily snapshots')
+    command.add_argument('directory', nargs='?', default='.',
+                         help='the directory of the snapshots (default: .)')
+    command.set_defaults(function=import_snapshots)
+
+    command = commands.add_parser('report', help='summarise the stored data')
+    command.set_defaults(function=report)
+
+    command = commands.add_parser('collect',
+                                  help='run the collector, or control it')
+    command.add_argument('control', nargs='?',
+                         choices=('fetch', 'flush', 'status', 'shutdown'),
+                         help='the command sent to the running collector')
+    command.set_defaults(function=collect)
+
+    command = commands.add_parser('startup',
+                                  help='measure the startup of the commands')
+    command.add_argument('commands', nargs='*', metavar='command',
+                         help='the commands measured (default: all of {})'
+                         .format(', '.join(subsystems)))
+    command.set_defaults(function=startup)
+
+    arguments = parser.parse_args(argv)
+    for name in getattr(arguments, 'commands', []):
+        if name not in subsystems:
+            parser.error('unknown command to measure: {}'.format(name))
+    return arguments
+
+def main(argv=None):
+    '''Runs the command of the command line.'''
+
+    arguments = parsed_arguments(argv)
+
+    logging.basicConfig(level=logging.DEBUG if arguments.debug else logging.INFO)
+    settings.config.reload(arguments.config)
+
+    # imported after the config is reloaded, as it reads it on import
+    import instrumentation
+    if arguments.instrument:
+        instrumentation.enable()
+
+    arguments.function(arguments)
+
+    if instrumentation.enabled and arguments.function is not startup:
+        instrumentation.save_report()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+'''
+Library to query the stored market data: the series of one ISIN between two
+dates, the cross-section of all the ISINs on a day and the latest quote of
+each ISIN as of a timestamp.
+
+A MarketDataIndex keeps the series of every ISIN as sorted NumPy arrays
+(datetime64[s] timestamps, float closing prices, int volumes), so each lookup
+is a binary search instead of a scan of the market data dict. The series of
+a columnar file are not copied, the arrays are views on the mapped file.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import collections
+import csv_helper
+import datetime
+import logging
+import numpy
+import sys
+
+# the quotes of one ISIN, as read-only arrays; a missing price is NaN, a
+# missing volume -1
+Series = collections.namedtuple('Series',
+                                ('isin', 'datetimes', 'closes', 'volumes'))
+
+# one quote per ISIN, as arrays aligned with the ISINs
+CrossSection = collections.namedtuple('CrossSection',
+                                      ('isins', 'datetimes', 'closes', 'volumes'))
+
+_one_day = numpy.timedelta64(1, 'D')
+
+class MarketDataIndex(object):
+    '''
+    The time index of the market data: the arrays of each ISIN's series.
+
+    The index is a snapshot, the changes of the market data are taken over
+    by update().
+    '''
+
+    def __init__(self, market_data=None):
+        self.isins = []
+        self._columns = {}
+
+        if market_data is not None:
+            self.update(market_data)
+
+    def update(self, market_data, isins=None):
+        '''
+        (Re)builds the arrays of the given ISINs (default: all) from a
+        MarketData or a market data dict. The ISINs no longer in the market
+        data are dropped.
+        '''
+
+        marketdata = getattr(market_data, 'marketdata', market_data)
+
+        for isin in (list(self._columns) if isins is None else isins):
+            if isin not in marketdata:
+                self._columns.pop(isin, None)
+        for isin in (marketdata if isins is None else isins):
+            if isin in marketdata:
+                self._columns[isin] = _columns(marketdata[isin]['Market Data'])
+        self.isins = sorted(self._columns)
+
+        logging.debug('Query: %d ISIN(s) indexed.', len(self.isins))
+
+    def series(self, isin, start=None, end=None):
+        '''
+        Returns the quotes of the ISIN from start to end (both included,
+        dates or datetimes, None for no limit) as views on the index.
+        Raises KeyError for an unknown ISIN.
+        '''
+
+        datetimes, closes, volumes = self._columns[isin]
+        first = (0 if start is None
+                 else numpy.searchsorted(datetimes, _lower_bound(start), 'left'))
+        last = (len(datetimes) if end is None
+                else numpy.searchsorted(datetimes, *_upper_bound(end)))
+
+        return Series(isin, datetimes[first:last], closes[first:last],
+                      volumes[first:last])
+
+    def cross_section(self, day):
+        '''Returns the last quote of each ISIN on the day (a date), for the
+        ISINs quoted on it.'''
+
+        start = _lower_bound(day)
+        return self._cross_section(lambda datetimes: (
+            numpy.searchsorted(datetimes, start, 'left'),
+            numpy.searchsorted(datetimes, start + _one_day, 'left')))
+
+    def latest(self, as_of=None):
+        '''Returns the last quote of each ISIN at or before the timestamp (a
+        date means its end, None the last quote at all), for the ISINs
+        quoted by then.'''
+
+        if as_of is None:
+            return self._cross_section(lambda datetimes: (0, len(datetimes)))
+
+        bound, side = _upper_bound(as_of)
+        return self._cross_section(lambda datetimes: (
+            0, numpy.searchsorted(datetimes, bound, side)))
+
+    def _cross_section(self, bounds):
+        '''Returns the quote before the upper bound of each ISIN, if it is
+        not before the lower bound. bounds returns the (lower, upper)
+        positions in the timestamps of an ISIN.'''
+
+        isins = []
+        positions = []
+        for isin in self.isins:
+            datetimes = self._columns[isin][0]
+            lower, upper = bounds(datetimes)
+            if upper > lower:
+                isins.append(isin)
+                positions.append(upper - 1)
+
+        return CrossSection(
+            numpy.array(isins, dtype=object),
+            numpy.array([self._columns[isin][0][position]
+                         for isin, position in zip(isins, positions)],
+                        dtype='datetime64[s]'),
+            numpy.array([self._columns[isin][1][position]
+                         for isin, position in zip(isins, positions)],
+                        dtype=float),
+            numpy.array([self._columns[isin][2][position]
+                         for isin, position in zip(isins, positions)],
+                        dtype=numpy.int64))
+
+def _columns(series):
+    '''Returns the read-only timestamp, price and volume arrays of a series
+    (a TimeSeries, a ColumnarSeries or a plain dict).'''
+
+    arrays = series.arrays() if hasattr(series, 'arrays') else None
+    if arrays is not None:
+        timestamps, prices, volumes = (numpy.asarray(array) for array in arrays)
+        columns = (timestamps.view('datetime64[s]'), prices, volumes)
+    else:
+        datetimes = list(series) if hasattr(series, 'position') else sorted(series)
+        quotes = [series[this_datetime] for this_datetime in datetimes]
+        columns = (numpy.array(datetimes, dtype='datetime64[s]'),
+                   numpy.array([_price(quote['Closing Price']) for quote in quotes],
+                               dtype=float),
+                   numpy.array([_volume(quote['Volume']) for quote in quotes],
+                               dtype=numpy.int64))
+
+    for column in columns:
+        column.flags.writeable = False
+    return columns
+
+def _price(s):
+    price = csv_helper.to_float(s)
+    return price if price is not None else numpy.nan
+
+def _volume(s):
+    volume = csv_helper.to_int(s.replace('.', '').replace(',', ''))
+    return volume if volume is not None else -1
+
+def _lower_bound(value):
+    '''Returns the first second of a date, or the datetime itself.'''
+
+    if isinstance(value, datetime.datetime):
+        return numpy.datetime64(value, 's')
+    return numpy.datetime64(value, 'D').astype('datetime64[s]')
+
+def _upper_bound(value):
+    '''Returns the bound and the side of searchsorted including the date
+    (up to its end) or the datetime.'''
+
+    if isinstance(value, datetime.datetime):
+        return numpy.datetime64(value, 's'), 'right'
+    return numpy.datetime64(value, 'D').astype('datetime64[s]') + _one_day, 'left'
+
+def main():
+    pass
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,88 +2,137 @@
 Library to handle the stock exchange (registry) basic data.
 '''
 
-__last_change__ = '2017.09.01.'
+__last_change__ = '2026.10.18.'
 
-import configparser
+import collections
 import csv_helper
 import datetime
 import decimal
 import logging
-import marketdata_coupler as mdc
+import os
+import pickle
+import settings
 import sys
-import teletrader
-import unittest
+import tempfile
 
-config = configparser.ConfigParser()
-config.read('config.ini')
+config = settings.config
+
+# the version of the cache layout, a cache of another version is not used
+_cache_version = 1
+
+class RegistryRecord(collections.namedtuple('RegistryRecord',
+                                            ('name',
+                                             'eps',
+                                             'months_in_report',
+                                             'report_expiry_date',
+                                             'own_investor_link',
+                                             'stock_exchange_link'))):
+    '''The basic data of one stock, as a tuple (no dict per stock).'''
+
+    __slots__ = ()
 
 class Registry(dict):
-    '''Keeps all the basic info of all the stocks together.'''
+    '''
+    Keeps all the basic info of all the stocks together: ISIN -> RegistryRecord.
+
+    The errors found while loading are kept apart, in errors. The validated
+    registry is cached in a binary file, which is used as long as the size
+    and the modification time of the CSV file are unchanged.
+    '''
 
     def __init__(self):
         '''Loads the basic data from a CSV file.'''
         logging.info('Registry: Loading basic data from CSV.')
 
-        self['Errors'] = RegistryErrorDict()
+        self.errors = RegistryErrorDict()
 
-    def load_from_file(self):
-        '''Loads the registry CSV file.'''
+    def load_from_file(self, filename=None, cache_filename=None):
+        '''Loads the registry CSV file, or its cache if the file is
+        unchanged.'''
 
-        self.update( {row['ISIN'] : self._registry_row_from_csv(row)
-                      for row
-                      in csv_helper.reader(config['Registry']['Registry filename'])
-                      if self._registry_row_is_addable(row)})
+        filename = filename or config['Registry']['Registry filename']
+        cache_filename = cache_filename or config['Registry']['Registry cache filename']
+
+        status = os.stat(filename)
+        key = (status.st_mtime_ns, status.st_size)
+        cached = _loaded_cache(cache_filename, key)
+
+        if cached is not None:
+            records, self.errors = cached
+            self.update(records)
+            logging.info('Registry: Validated registry loaded from cache.')
+        else:
+            self._load_from_csv(filename)
+            _save_cache(cache_filename, key, dict(self), self.errors)
 
         if len(self):
-            if not self['Errors']['Errors found']:
+            if not self.errors['Errors found']:
                 logging.info('Registry: %d new ISIN loaded. No errors found.', len(self))
             else:
                 logging.error('Registry: The following errors found:')
+                for error, value in self.errors.items():
+                    if error != 'Errors found' and value:
+                        logging.error('Registry: %s: %s', error,
+                                      ', '.join(sorted(value))
+                                      if isinstance(value, set) else value)
         else:
             logging.error('Registry: No ISIN loaded.')
 
+    def _load_from_csv(self, filename):
+        '''Validates and loads the rows of the registry CSV file in one
+        scan. Of duplicate ISINs the last row is kept.'''
+
+        for row in csv_helper.iter_reader(filename,
+                                          encoding=config['DEFAULT']['CSV encoding']):
+            if not self._registry_row_is_addable(row):
+                continue
+            if row['ISIN'] in self:
+                self.errors['Errors found'] = True
+                self.errors['Duplicate ISINs'].add(row['ISIN'])
+            self[row['ISIN']] = self._registry_row_from_csv(row)
+
     def _registry_row_is_addable(self, row):
         '''Checks one stock data in a dict.'''
 
         if not row['ISIN']:
-            self['Errors']['Errors found'] = True
-            self['Errors']['Number of missing ISINs'] += 1
+            self.errors['Errors found'] = True
+            self.errors['Number of missing ISINs'] += 1
             return False
         elif len(row['ISIN']) != 12:
-            self['Errors']['Errors found'] = True
-            self['Errors']['Faulty ISINs'].add(row['ISIN'])
+            self.errors['Errors found'] = True
+            self.errors['Faulty ISINs'].add(row['ISIN'])
             return False
 
         if not row['Name']:
-            self['Errors']['Errors found'] = True
-            self['Errors']['Missing names'].add(row['ISIN'])
+            self.errors['Errors found'] = True
+            self.errors['Missing names'].add(row['ISIN'])
 
         try:
             months = int(row['Months in Report']) if row['Months in Report'] != '' else 0
             if months not in (0, 3, 6, 9, 12):
                 raise ValueError
         except ValueError:
-            self['Errors']['Errors found'] = True
-            self['Errors']['Faulty months in report'].add(row['ISIN'])
+            self.errors['Errors found'] = True
+            self.errors['Faulty months in report'].add(row['ISIN'])
 
         try:
             if row['Report Expiry Date']: datetime.datetime.strptime(row['Report Expiry Date'],
                                                                      config['DEFAULT']['Date format'])
         except ValueError:
-            self['Errors']['Errors found'] = True
-            self['Errors']['Faulty report expiry dates'].add(row['ISIN'])
+            self.errors['Errors found'] = True
+            self.errors['Faulty report expiry dates'].add(row['ISIN'])
 
         return True
 
     def _registry_row_from_csv(self, row):
         '''Processes one stock data from a dict.'''
 
-        return {'Name' : row['Name'],
-                'EPS': _string_to_decimal(row['EPS']),
-                'Months in Report': row['Months in Report'],
-                'Report Expiry Date': row['Report Expiry Date'],
-                'Own Investor Link': row['Own Investor Link'],
-                'Stock Exchange Link': row['Stock Exchange Link']}
+        return RegistryRecord(row['Name'],
+                              _string_to_decimal(row['EPS']),
+                              row['Months in Report'],
+                              row['Report Expiry Date'],
+                              row['Own Investor Link'],
+                              row['Stock Exchange Link'])
 
 class RegistryErrorDict(dict):
     '''Keeps all the error info occuring while processing a registry.'''
@@ -95,128 +144,61 @@ class RegistryErrorDict(dict):
                      'Faulty ISINs': set(),
                      'Missing names': set(),
                      'Faulty months in report': set(),
-                     'Faulty report expiry dates': set()})
+                     'Faulty report expiry dates': set(),
+                     'Duplicate ISINs': set()})
+
+def _loaded_cache(cache_filename, key):
+    '''Returns the (records, errors) of the cache if it was saved for the
+    given (modification time, size) of the CSV file, otherwise None.'''
+
+    try:
+        with open(cache_filename, 'rb') as f:
+            content = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError,
+            IndexError, KeyError, TypeError, ValueError):
+        content = None
+
+    # a truncated or foreign file may unpickle to anything
+    if (not isinstance(content, dict)
+            or not {'Version', 'Key', 'Records', 'Errors'} <= content.keys()):
+        logging.warning('Registry: Cache (%s) is unreadable, ignored.',
+                        cache_filename)
+        return None
+
+    if content['Version'] != _cache_version or content['Key'] != key:
+        logging.info('Registry: Cache is out of date.')
+        return None
+    return content['Records'], content['Errors']
+
+def _save_cache(cache_filename, key, records, errors):
+    '''Saves the validated registry for the given (modification time, size)
+    of the CSV file.'''
+
+    directory = os.path.dirname(os.path.abspath(cache_filename))
+    with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as f:
+        pickle.dump({'Version': _cache_version,
+                     'Key': key,
+                     'Records': records,
+                     'Errors': errors},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f.name, cache_filename)
 
 def _string_to_decimal(s):
     '''Universal converter from string to decimal. Accepts either comma or
     point as decimal mark.'''
 
     if '.' not in s:
-        s.replace(',', '.')
+        s = s.replace(',', '.')
     try:
         return decimal.Decimal(s)
     except decimal.InvalidOperation:
         return decimal.Decimal('0')
 
-class TestRegistryRowIsAddable(unittest.TestCase):
-    '''Tests _registry_row_is_addable.'''
-
-    def setUp(self):
-        self.reg = Registry()
-
-    def test_missing_isin(self):
-        row = {'ISIN' : ''}
-        expected_errors = RegistryErrorDict()
-        expected_errors.update({'Errors found': True,
-                                'Number of missing ISINs': 1})
-        self.assertFalse(self.reg._registry_row_is_addable(row))
-        self.assertEqual(self.reg['Errors'], expected_errors)
-
-    def test_faulty_isin(self):
-        row = {'ISIN' : '12345678901'}
-        expected_errors = RegistryErrorDict()
-        expected_errors.update({'Errors found': True,
-                                'Faulty ISINs': set(['12345678901'])})
-
-        self.assertFalse(self.reg._registry_row_is_addable(row))
-        self.assertEqual(self.reg['Errors'], expected_errors)
-
-    def test_missing_name(self):
-        row = {'ISIN' : '123456789012',
-               'Name' : '',
-               'Months in Report' : '',
-               'Report Expiry Date' : '2000.01.01'}
-        expected_errors = RegistryErrorDict()
-        expected_errors.update({'Errors found': True,
-                                'Missing names': set(['123456789012'])})
-
-        self.assertTrue(self.reg._registry_row_is_addable(row))
-        self.assertEqual(self.reg['Errors'], expected_errors)
-
-    def test_unacceptable_months(self):
-        row = {'ISIN' : '123456789012',
-               'Name' : 'Company',
-               'Report Expiry Date' : '2000.01.01'}
-        expected_errors = RegistryErrorDict()
-        expected_errors.update({'Errors found': True,
-                                'Faulty months in report': set(['123456789012'])})
-
-        for months in ('X', '4'):
-            row['Months in Report'] = months
-            self.assertTrue(self.reg._registry_row_is_addable(row))
-            self.assertEqual(self.reg['Errors'], expected_errors)
-
-    def test_acceptable_months(self):
-
-        row = {'ISIN' : '123456789012',
-               'Name' : 'Company',
-               'Report Expiry Date' : '2000.01.01'}
-
-        for months in ('', '3', '6', '9', '12'):
-            row['Months in Report'] = months
-            self.assertTrue(self.reg._registry_row_is_addable(row))
-            self.assertEqual(self.reg['Errors'], RegistryErrorDict())
-
-    def test_unacceptable_expiry_date(self):
-        row = {'ISIN' : '123456789012',
-               'Name' : 'Company',
-               'Months in Report' : '',
-               'Report Expiry Date' : '20000.01.01'}
-        expected_errors = RegistryErrorDict()
-        expected_errors.update({'Errors found': True,
-                                'Faulty report expiry dates': set(['123456789012'])})
-        self.assertTrue(self.reg._registry_row_is_addable(row))
-        self.assertEqual(self.reg['Errors'], expected_errors)
-
-    def test_acceptable_expiry_dates(self):
-
-        row = {'ISIN' : '123456789012',
-               'Name' : 'Company',
-               'Months in Report' : ''}
-        for dates in ('', '2000.01.01'):
-            row['Report Expiry Date'] = dates
-            self.assertTrue(self.reg._registry_row_is_addable(row))
-            self.assertEqual(self.reg['Errors'], RegistryErrorDict())
-
-class TestRegistryRowFromCSV(unittest.TestCase):
-    '''Tests _registry_row_from_csv.'''
-
-    def setUp(self):
-        self.reg = Registry()
-        self.acceptable_row = {'ISIN': '123456789012',
-                               'Name' : 'Company',
-                               'EPS': '12.34',
-                               'Months in Report': '3',
-                               'Report Expiry Date': '2000.01.01',
-                               'Own Investor Link': 'http',
-                               'Stock Exchange Link': 'http'}
-        self.result_dict = {'Name' : 'Company',
-                            'EPS': decimal.Decimal('12.34'),
-                            'Months in Report': '3',
-                            'Report Expiry Date': '2000.01.01',
-                            'Own Investor Link': 'http',
-                            'Stock Exchange Link': 'http'}
-
-    def test_acceptable_row(self):
-        self.assertTrue(self.reg._registry_row_is_addable(self.acceptable_row))
-        self.assertEqual(self.reg._registry_row_from_csv(self.acceptable_row),
-                         self.result_dict)
-
 def main():
-    '''Entry point for unit testing.'''
-
-    test = TestRegistryRowIsAddable()
+    pass
 
 if __name__ == '__main__':
-    main()
-    unittest.main()
+    sys.exit(main())
@@ -0,0 +1,110 @@
+'''
+Library to join the registry basic data with the market data.
+
+Each registry ISIN is aligned with the latest close of the same ISIN in one
+pass, and the annualised EPS, the P/E and the expired report flag are
+computed as vectors for the screener.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import collections
+import datetime
+import datetime_helper
+import logging
+import numpy
+import registry
+import settings
+import sys
+
+config = settings.config
+
+_decode_date = datetime_helper.DateTimeDecoder(config['DEFAULT']['Date format'])
+
+# the months a report can cover
+_report_months = (3, 6, 9, 12)
+
+# the registry data aligned with the ISINs of the market data, as vectors
+# (NaN/False where the registry has no data), and the unmatched ISINs of
+# both sides
+Joined = collections.namedtuple('Joined',
+                                ('isins', 'matched', 'eps', 'annual_eps', 'pe',
+                                 'expired', 'registry_only', 'market_only'))
+
+def joined(registry, latest, today=None):
+    '''
+    Returns the registry joined with the latest market data.
+
+    Args:
+        registry: a Registry (or a dict of RegistryRecords).
+        latest: the latest indicators of the ISINs (screener.Latest).
+        today: optional date the report expiry is checked against.
+    '''
+
+    registry_isins, eps, months, expiry = _registry_columns(registry)
+    market_isins = numpy.asarray(latest.isins, dtype=str)
+
+    # the registry ISINs are sorted, so each ISIN is found by binary search;
+    # the unmatched ones point to the empty last row
+    positions = numpy.searchsorted(registry_isins[:-1], market_isins)
+    matched = registry_isins[positions] == market_isins
+    positions[~matched] = len(registry_isins) - 1
+    eps = eps[positions]
+    months = months[positions]
+    expiry = expiry[positions]
+
+    annual_eps = numpy.full(len(market_isins), numpy.nan)
+    reported = numpy.isin(months, _report_months)
+    annual_eps[reported] = eps[reported] * 12 / months[reported]
+
+    # the P/E has no meaning without earnings
+    closes = numpy.asarray(latest.closes, dtype=float)
+    pe = numpy.full(len(market_isins), numpy.nan)
+    earning = annual_eps > 0
+    pe[earning] = closes[earning] / annual_eps[earning]
+
+    expired = expiry < numpy.datetime64(today or datetime.date.today(), 'D')
+
+    result = Joined(market_isins, matched, eps, annual_eps, pe, expired,
+                    list(registry_isins[:-1][~numpy.isin(registry_isins[:-1],
+                                                         market_isins)]),
+                    list(market_isins[~matched]))
+
+    logging.info('RegistryJoin: %d ISIN(s) joined.', numpy.count_nonzero(matched))
+    if result.registry_only:
+        logging.warning('RegistryJoin: %d registry ISIN(s) without market data: %s',
+                        len(result.registry_only), ', '.join(result.registry_only))
+    if result.market_only:
+        logging.warning('RegistryJoin: %d ISIN(s) with market data not in '
+                        'registry: %s',
+                        len(result.market_only), ', '.join(result.market_only))
+    return result
+
+def _registry_columns(registry):
+    '''Returns the sorted ISINs of the registry with their EPS, months in
+    report and report expiry dates as vectors, followed by an empty row.'''
+
+    isins = sorted(registry) + ['']
+    eps = numpy.full(len(isins), numpy.nan)
+    months = numpy.zeros(len(isins), dtype=int)
+    expiry = numpy.full(len(isins), numpy.datetime64('NaT'), dtype='datetime64[D]')
+
+    for index, isin in enumerate(isins[:-1]):
+        record = registry[isin]
+        if record.eps is not None:
+            eps[index] = float(record.eps)
+        if record.months_in_report.isdigit():
+            months[index] = int(record.months_in_report)
+        if record.report_expiry_date:
+            try:
+                expiry[index] = _decode_date(record.report_expiry_date).date()
+            except ValueError:
+                pass
+
+    return numpy.array(isins, dtype=str), eps, months, expiry
+
+def main():
+    pass
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,291 @@
 '''
 Library to provide the screener class for the stocks.
+
+The closing prices of all the ISINs are put into one dense matrix
+(ISINs x trading days), and the moving averages are computed for every ISIN
+at once from cumulative sums, without looping over the ISINs.
 '''
 
-__last_change__ = '2017.08.30.'
+__last_change__ = '2026.10.18.'
 
+import collections
+import csv_helper
+import datetime
+import logging
+import numpy
+import registry
+import registry_join
+import settings
 import sys
 
+config = settings.config
+
+fast_sma = config['Screening'].getint('Fast SMA')
+slow_sma = config['Screening'].getint('Slow SMA')
+shortlist_filename = config['Screening']['Short-list filename']
+positions_filename = config['Screening']['Positions filename']
+
+# the reason flags of the short-list, and whether the stocks having them are
+# shown
+flag_shown = collections.OrderedDict([
+    ('Above TAZ', config['Screening'].getboolean('Show stocks above TAZ')),
+    ('In TAZ', config['Screening'].getboolean('Show stocks in TAZ')),
+    ('Below TAZ', config['Screening'].getboolean('Show stocks below TAZ')),
+    ('Losses', config['Screening'].getboolean('Show stocks with losses')),
+    ('Expired Data', config['Screening'].getboolean('Show stocks with expired data')),
+    ('Position', config['Screening'].getboolean('Show stocks with position'))])
+
+# the indicators of each ISIN at its last quote, as vectors
+Latest = collections.namedtuple('Latest',
+                                ('isins', 'days', 'closes', 'fast_sma', 'slow_sma'))
+
+class Screener(object):
+    '''
+    Computes the fast and the slow simple moving averages of all the ISINs.
+
+    The trading days are the days with a quote of any ISIN. A day missing
+    from the history of an ISIN carries its previous close forward, the days
+    before its first and after its last quote are masked out (NaN).
+
+    Attributes:
+        isins: the ISINs, one per row.
+        days: the trading days, one per column (numpy datetime64[D]).
+        quoted: True where the ISIN has a quote on the day.
+        closes: the closing prices, carried forward over the missing days.
+        fast_sma, slow_sma: the moving averages, NaN where the window is not
+            full.
+        last_column: the column of the last quote of each ISIN.
+    '''
+
+    def __init__(self, market_data=None, fast=None, slow=None):
+        self.fast = fast or fast_sma
+        self.slow = slow or slow_sma
+
+        self.isins = []
+        self.days = numpy.empty(0, dtype='datetime64[D]')
+        self.quoted = numpy.empty((0, 0), dtype=bool)
+        self.closes = numpy.empty((0, 0))
+        self.fast_sma = numpy.empty((0, 0))
+        self.slow_sma = numpy.empty((0, 0))
+        self.last_column = numpy.empty(0, dtype=numpy.intp)
+
+        if market_data is not None:
+            self.load(market_data.marketdata)
+            self.compute()
+
+    def load(self, marketdata):
+        '''Builds the price matrix from a market data dict.'''
+
+        logging.info('Screener: Building price matrix.')
+
+        self.isins = sorted(marketdata)
+        rows = []
+        days = []
+        prices = []
+
+        for row, isin in enumerate(self.isins):
+            series = marketdata[isin]['Market Data']
+            closing = daily_closes((this_datetime, series[this_datetime])
+                                   for this_datetime in sorted(series))
+            rows.extend([row] * len(closing))
+            days.extend(closing)
+            prices.extend(closing.values())
+
+        self.days, columns = numpy.unique(numpy.array(days, dtype='datetime64[D]'),
+                                          return_inverse=True)
+        matrix = numpy.full((len(self.isins), len(self.days)), numpy.nan)
+        matrix[rows, columns] = prices
+
+        self.quoted = ~numpy.isnan(matrix)
+        self.closes = _carried_forward(matrix, self.quoted)
+        self.last_column = _last_columns(self.quoted)
+
+        logging.info('Screener: %d ISIN(s) x %d day(s), %d quote(s).',
+                     len(self.isins), len(self.days), len(prices))
+
+    def compute(self):
+        '''Computes the fast and the slow moving averages.'''
+
+        self.fast_sma = moving_average(self.closes, self.fast)
+        self.slow_sma = moving_average(self.closes, self.slow)
+
+    def at_last_quote(self, values):
+        '''Returns the values (e.g. closes or fast_sma) at the last quote of
+        each ISIN, as a vector.'''
+
+        return values[numpy.arange(len(self.isins)), self.last_column]
+
+    def latest(self):
+        '''Returns the indicators of every ISIN at its last quote.'''
+
+        return Latest(numpy.array(self.isins, dtype=object),
+                      self.days[self.last_column],
+                      self.at_last_quote(self.closes),
+                      self.at_last_quote(self.fast_sma),
+                      self.at_last_quote(self.slow_sma))
+
+def daily_closes(quotes):
+    '''Returns the closing prices of the sorted (datetime, quote) pairs as a
+    date -> float dict: the latest valid price of each day.'''
+
+    closing = {}
+    for this_datetime, quote in quotes:
+        price = csv_helper.to_float(quote['Closing Price'])
+        if price is not None:
+            closing[this_datetime.date()] = price
+    return closing
+
+def moving_average(closes, window):
+    '''
+    Returns the simple moving averages of every row of the matrix.
+
+    NaN marks the missing values, and every window containing one. The
+    values of a row are expected to be contiguous (see Screener), so a window
+    is full when both of its ends are.
+    '''
+
+    result = numpy.full(closes.shape, numpy.nan)
+    if window < 1 or window > closes.shape[1]:
+        return result
+
+    valid = ~numpy.isnan(closes)
+    sums = numpy.cumsum(numpy.where(valid, closes, 0.0), axis=1)
+
+    window_sums = sums[:, window - 1:].copy()
+    window_sums[:, 1:] -= sums[:, :-window]
+    full = valid[:, window - 1:] & valid[:, :closes.shape[1] - window + 1]
+
+    result[:, window - 1:] = numpy.where(full, window_sums / window, numpy.nan)
+    return result
+
+def _carried_forward(matrix, quoted):
+    '''Returns the matrix with the missing values between the first and the
+    last quote of each row replaced by the previous quote.'''
+
+    columns = numpy.arange(matrix.shape[1])
+    previous = numpy.maximum.accumulate(numpy.where(quoted, columns, 0), axis=1)
+    filled = numpy.take_along_axis(matrix, previous, axis=1)
+
+    # nothing is carried beyond the last quote
+    filled[columns > _last_columns(quoted)[:, numpy.newaxis]] = numpy.nan
+    return filled
+
+def _last_columns(quoted):
+    '''Returns the column of the last True of each row (0 if none).'''
+
+    if not quoted.shape[1]:
+        return numpy.zeros(quoted.shape[0], dtype=numpy.intp)
+    last = quoted.shape[1] - 1 - numpy.argmax(quoted[:, ::-1], axis=1)
+    return numpy.where(quoted.any(axis=1), last, 0)
+
+class ShortList(object):
+    '''
+    The stocks passing the screening filters of the config.
+
+    The TAZ (trade action zone) is the zone between the fast and the slow
+    SMA. Every flag is evaluated for all the ISINs at once as a boolean
+    mask, and the masks are combined by the 'Show stocks ...' options:
+    - a stock is shown if its TAZ state is shown (no state without a full
+      slow SMA window),
+    - stocks with losses (negative EPS) or with expired data (the report
+      expiry date in the registry has passed) are hidden unless shown, see
+      registry_join,
+    - stocks with position are always shown, or always hidden.
+    '''
+
+    header = (('ISIN', 'Name', 'Date', 'Closing Price', 'Fast SMA', 'Slow SMA',
+               'P/E')
+              + tuple(flag_shown))
+
+    def __init__(self, registry=None, positions=None, shown=None):
+        self.registry = registry if registry is not None else {}
+        self.positions = (positions if positions is not None
+                          else loaded_positions())
+        self.shown = shown or flag_shown
+        self.latest = None
+        self.joined = None
+        self.flags = collections.OrderedDict()
+        self.passing = numpy.empty(0, dtype=bool)
+
+    def assemble(self, source):
+        '''Evaluates the filters for the latest indicators of the source
+        (a Screener or an indicators.IndicatorState).'''
+
+        self.latest = latest = source.latest()
+        low = numpy.minimum(latest.fast_sma, latest.slow_sma)
+        high = numpy.maximum(latest.fast_sma, latest.slow_sma)
+        self.joined = joined = registry_join.joined(self.registry, latest)
+
+        # comparisons with NaN are False, no TAZ state without full windows
+        self.flags['Above TAZ'] = latest.closes > high
+        self.flags['In TAZ'] = (latest.closes >= low) & (latest.closes <= high)
+        self.flags['Below TAZ'] = latest.closes < low
+        self.flags['Losses'] = joined.eps < 0
+        self.flags['Expired Data'] = joined.expired
+        self.flags['Position'] = numpy.isin(latest.isins,
+                                            numpy.array(list(self.positions),
+                                                        dtype=object))
+
+        shown = self.shown
+        self.passing = (((self.flags['Above TAZ'] & shown['Above TAZ'])
+                         | (self.flags['In TAZ'] & shown['In TAZ'])
+                         | (self.flags['Below TAZ'] & shown['Below TAZ']))
+                        & (shown['Losses'] | ~self.flags['Losses'])
+                        & (shown['Expired Data'] | ~self.flags['Expired Data']))
+        if shown['Position']:
+            self.passing |= self.flags['Position']
+        else:
+            self.passing &= ~self.flags['Position']
+
+        logging.info('ShortList: %d of %d ISIN(s) passed the screening.',
+                     numpy.count_nonzero(self.passing), len(latest.isins))
+
+    def save_to_file(self, filename=None):
+        '''Streams the passing stocks with their reason flags into the
+        short-list CSV file.'''
+
+        logging.info('ShortList: Saving short-list.')
+
+        csv_helper.iter_writer(
+            (self._row(index) for index in numpy.flatnonzero(self.passing)),
+            filename or shortlist_filename,
+            header=self.header,
+            encoding=config['DEFAULT']['CSV encoding'])
+
+    def _row(self, index):
+        '''Returns the short-list row of one ISIN.'''
+
+        isin = self.latest.isins[index]
+        return ([isin,
+                 self.registry[isin].name if isin in self.registry else '',
+                 str(self.latest.days[index]),
+                 _price_to_string(self.latest.closes[index]),
+                 _price_to_string(self.latest.fast_sma[index]),
+                 _price_to_string(self.latest.slow_sma[index]),
+                 _price_to_string(self.joined.pe[index])]
+                + [int(flags[index]) for flags in self.flags.values()])
+
+def loaded_positions(filename=None):
+    '''Returns the set of the ISINs held, empty if there is no positions
+    file.'''
+
+    try:
+        return {row['ISIN']
+                for row in csv_helper.iter_reader(
+                    filename or positions_filename,
+                    encoding=config['DEFAULT']['CSV encoding'])
+                if row['ISIN']}
+    except FileNotFoundError:
+        logging.info('ShortList: No positions file.')
+        return set()
+
+def _price_to_string(price):
+    '''Returns the price with decimal comma, as in the market data.'''
+
+    if numpy.isnan(price):
+        return ''
+    return '{:.2f}'.format(price).replace('.', ',')
+
 def main():
     pass
 
@@ -0,0 +1,58 @@
+'''
+Library to provide the configuration shared by all the modules.
+
+config.ini is parsed once, on the first access of the config, instead of by
+every module at import time.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import configparser
+import logging
+import sys
+
+config_filename = 'config.ini'
+
+class LazyConfig(object):
+    '''
+    A ConfigParser reading its file on the first access of a section or an
+    option, e.g. config['Screening'].getint('Fast SMA').
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._parser = None
+
+    def parser(self):
+        '''Returns the ConfigParser, reading the file first if not read yet.'''
+
+        if self._parser is None:
+            self._parser = configparser.ConfigParser()
+            if not self._parser.read(self.filename):
+                logging.warning('Settings: No config file (%s).', self.filename)
+        return self._parser
+
+    def reload(self, filename=None):
+        '''Reads the file (or another one) again on the next access. The
+        values the modules have already taken are not changed.'''
+
+        self.filename = filename or self.filename
+        self._parser = None
+
+    def __getitem__(self, section):
+        return self.parser()[section]
+
+    def __contains__(self, section):
+        return section in self.parser()
+
+    def __getattr__(self, name):
+        # get, getint, getboolean, sections, ...
+        return getattr(self.parser(), name)
+
+config = LazyConfig(config_filename)
+
+def main():
+    pass
+
+if __name__ == '__main__':
+    sys.exit(main())
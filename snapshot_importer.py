@@ -0,0 +1,147 @@
+'''
+Imports the exported daily snapshot CSVs (e.g. 2018-07-20-17-39.csv) into the
+market data.
+
+The snapshots are comma separated, UTF-8 with BOM, have US timestamps
+('6/8/2018 5:35:00 PM'), the volume in 'Volumen' and mostly empty ISINs.
+They are parsed in a process pool, the names are resolved to ISINs through
+the TTConverter, the days present in more snapshots are de-duplicated, and
+the result is merged into the MarketData in one batch.
+
+Usage: python snapshot_importer.py [directory]
+'''
+
+__last_change__ = '2026.10.18.'
+
+import concurrent.futures
+import csv_helper
+import datetime
+import datetime_helper
+import glob
+import html
+import instrumentation
+import logging
+import marketdata
+import os
+import settings
+import sys
+import time
+
+config = settings.config
+
+_filename_pattern = config['Snapshot Import']['Snapshot filename pattern']
+_datetime_format = config['Snapshot Import']['Datetime format']
+_workers = config['Snapshot Import'].getint('Workers')
+
+_delimiter = ','
+_encoding = 'utf-8-sig'
+
+def import_directory(market_data, directory, workers=None):
+    '''
+    Imports all the snapshots of the directory into the MarketData.
+    Returns the number of rows read and the rows/sec throughput.
+    '''
+
+    filenames = sorted(glob.glob(os.path.join(glob.escape(directory),
+                                              _filename_pattern)))
+    logging.info('SnapshotImporter: %d snapshot(s) found in %s.',
+                 len(filenames), directory)
+
+    start = time.perf_counter()
+    with instrumentation.timer('Snapshot parse'):
+        rows = _parsed_snapshots(filenames, workers or _workers)
+    instrumentation.count('rows_parsed', len(rows), exchange='Snapshots')
+    batch = _deduplicated(rows, market_data.converter)
+    market_data.converter.save_resolved()
+    market_data.append(batch)
+    elapsed = time.perf_counter() - start
+
+    rate = len(rows) / elapsed if elapsed else 0.0
+    logging.info('SnapshotImporter: %d row(s) of %d ISIN(s) imported in '
+                 '%.2f s (%.0f rows/sec).',
+                 len(rows), len(batch), elapsed, rate)
+    for name in sorted(market_data.converter.missing_names):
+        logging.warning('SnapshotImporter: TeleTrader name (%s) has no ISIN.',
+                        name)
+
+    return len(rows), rate
+
+def _parsed_snapshots(filenames, workers):
+    '''Returns the rows of all the snapshots, parsed in a process pool, in
+    the order of the file names.'''
+
+    if workers <= 1 or len(filenames) <= 1:
+        results = map(_parsed_snapshot, filenames)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(workers, len(filenames)))
+        with executor:
+            results = list(executor.map(_parsed_snapshot, filenames))
+
+    return [row for rows in results for row in rows]
+
+def _parsed_snapshot(filename):
+    '''
+    Returns the rows of one snapshot as tuples of
+    (name, ISIN, datetime, closing price, volume, stock exchange).
+    The closing price gets a decimal comma and the HTML entities of the name
+    are resolved, as in the TeleTrader pages.
+    '''
+
+    decode_datetime = datetime_helper.DateTimeDecoder(_datetime_format)
+
+    return [(html.unescape(line['Name']),
+             line['ISIN'],
+             decode_datetime(line['DateTime']),
+             line['Closing Price'].replace(',', '').replace('.', ','),
+             line['Volumen'],
+             line['Stock Exchange'])
+            for line
+            in csv_helper.iter_reader(filename,
+                                      delimiter=_delimiter,
+                                      encoding=_encoding)
+            if line['DateTime']]
+
+def _deduplicated(rows, converter):
+    '''
+    Returns the rows as a market data dict, keeping one quote per ISIN and
+    day: the latest one, and of equal ones the one of the later snapshot.
+    '''
+
+    latest = {}
+    for name, isin, this_datetime, price, volume, stock_exchange in rows:
+        key = (isin or converter[name], this_datetime.date())
+        if key not in latest or latest[key][2] <= this_datetime:
+            latest[key] = (name, isin, this_datetime, price, volume, stock_exchange)
+
+    batch = {}
+    for (isin, day), (name, _, this_datetime, price, volume, stock_exchange) \
+            in sorted(latest.items(), key=lambda item: item[1][2]):
+        if isin not in batch:
+            batch[isin] = {'Market Data': {}}
+        batch[isin]['TeleTrader Name'] = name
+        batch[isin]['Stock Exchange'] = stock_exchange
+        batch[isin]['Market Data'][this_datetime] = {'Closing Price': price,
+                                                     'Volume': volume}
+    return batch
+
+def main():
+    '''Imports the snapshots of the given directory (default: the current
+    one) into the stored market data.'''
+
+    logging.basicConfig(level=logging.INFO)
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else '.'
+
+    market_data = marketdata.MarketData()
+    try:
+        market_data.load_from_file()
+    except FileNotFoundError:
+        logging.warning('SnapshotImporter: No stored market data, '
+                        'starting with an empty one.')
+
+    import_directory(market_data, directory)
+    market_data.save_to_file()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,22 +3,38 @@ Contains all the objects, functions and data for parsing data obtained from
 TeleTrader pages.
 '''
 
-__last_change__ = '2017.08.29.'
+__last_change__ = '2026.10.18.'
 
-import configparser
 import csv_helper
 import datetime
+import datetime_helper
+import html
 from html.parser import HTMLParser
 import logging
+import os
+import settings
 import sys
 
-config = configparser.ConfigParser()
-config.read('config.ini')
+config = settings.config
 
 urls_filename = config['TeleTrader']['URLs filename']
 tt2isin_filename = config['TeleTrader']['TeleTrader to ISIN converter filename']
+tt_resolved_filename = config['TeleTrader']['Resolved TeleTrader names filename']
+fetch_workers = config['TeleTrader'].getint('Fetch workers')
+fetch_timeout = config['TeleTrader'].getfloat('Fetch timeout')
+fetch_retries = config['TeleTrader'].getint('Fetch retries')
+fetch_backoff = config['TeleTrader'].getfloat('Fetch backoff')
+streaming_parse = config['TeleTrader'].getboolean('Streaming parse')
+stream_chunk_size = config['TeleTrader'].getint('Stream chunk size')
+cache_enabled = config['TeleTrader'].getboolean('Cache enabled')
+cache_directory = config['TeleTrader']['Cache directory']
+cache_freshness = config['TeleTrader'].getfloat('Cache freshness')
 # source string example: 07.14./17:35
 _datetime_format = config['TeleTrader']['Datetime format']
+_csv_encoding = config['DEFAULT']['CSV encoding']
+_decode_datetime = datetime_helper.DateTimeDecoder(_datetime_format)
+# a truncated name shorter than this is not matched as a prefix
+_minimum_prefix_length = 8
 
 # pattern to process
 pattern = ( ('start', 'tr'),
@@ -51,12 +67,61 @@ pattern = ( ('start', 'tr'),
             ('end', 'tr')
             )
 
+# actions of the end tag table besides moving to a state
+_row_completed = -1
+_row_dropped = -2
+
+def _compiled_pattern(pattern):
+    '''
+    Compiles the pattern into state transition tables. The states are the
+    positions in the pattern, the tags are coded by integers (0 for the tags
+    not in the pattern).
+
+    Returns:
+        tag codes: dict of tag -> code,
+        start table: per state a tuple of the next state by tag code,
+        end table: per state a tuple of the next state (or _row_completed,
+            _row_dropped) by tag code,
+        data table: per state True if the data is to be read.
+    '''
+
+    tags = sorted({tag for kind, tag in pattern if kind in ('start', 'end')})
+    tag_codes = {tag: code for code, tag in enumerate(tags, 1)}
+    coded_tags = [None] + tags
+
+    start_table = []
+    end_table = []
+    data_table = []
+
+    for state, expected in enumerate(pattern):
+        start_table.append(tuple(
+            state + 1 if expected == ('start', tag) else state
+            for tag in coded_tags))
+
+        end_actions = []
+        for tag in coded_tags:
+            if expected == ('end', tag):
+                end_actions.append(_row_completed if tag == 'tr' else state + 1)
+            elif tag == 'tr' or tag == 'td':
+                end_actions.append(_row_dropped)
+            else:
+                end_actions.append(state)
+        end_table.append(tuple(end_actions))
+
+        data_table.append(expected == ('data', 'read'))
+
+    return tag_codes, tuple(start_table), tuple(end_table), tuple(data_table)
+
+_tag_codes, _start_table, _end_table, _data_table = _compiled_pattern(pattern)
+
 class TeletraderHTMLParser(HTMLParser):
     '''
     Parses a Teletrader html page and extracts the closing prices and the
     volume.
 
-    Wraps the HTMLParser class, tailored for Teletrader web pages.
+    Wraps the HTMLParser class, tailored for Teletrader web pages. The
+    pattern is matched by the precompiled state transition tables, so an
+    event costs a dict lookup and a table lookup.
     '''
 
     def __init__(self, stock_exchange):
@@ -69,62 +134,174 @@ class TeletraderHTMLParser(HTMLParser):
     def handle_starttag(self, tag, attrs):
         '''Starts to listen when reaching a start tag.'''
 
-        if pattern[self.pattern_counter] == ('start', tag):
-            self.pattern_counter += 1
+        self.pattern_counter = _start_table[self.pattern_counter][
+            _tag_codes.get(tag, 0)]
 
     def handle_endtag(self, tag):
         '''Stops to listen when reaching an end tag.'''
 
-        if pattern[self.pattern_counter] == ('end', tag):
-            if tag == 'tr':
-                self.pattern_counter = 0
-                self.actual_stock.append(str(self.stock_exchange))
-                self.stocks.append(self.actual_stock)
-                self.actual_stock = []
-            else : self.pattern_counter += 1
-        elif tag == 'tr' or tag == 'td':
+        action = _end_table[self.pattern_counter][_tag_codes.get(tag, 0)]
+        if action >= 0:
+            self.pattern_counter = action
+        elif action == _row_completed:
+            self.pattern_counter = 0
+            self.actual_stock.append(str(self.stock_exchange))
+            self.stocks.append(self.actual_stock)
+            self.actual_stock = []
+        else:
             self.pattern_counter = 0
             self.actual_stock = []
 
     def handle_data(self, data):
         '''If appropriate reads the data.'''
 
-        if pattern[self.pattern_counter] == ('data', 'read'):
+        if _data_table[self.pattern_counter]:
             self.pattern_counter += 1
             self.actual_stock.append(data)
 
 class TTConverter(dict):
-    '''The dictionary to determine the ISIN by the Teletrader names.'''
+    '''
+    The dictionary to determine the ISIN by the Teletrader names.
 
-    def __init__(self):
+    A name is looked up in an index built once at load:
+    - the exact names (and the ones resolved in earlier runs),
+    - the names normalised (case, whitespace and HTML entities ignored),
+    - the truncated names (ending in an ellipsis) as prefixes in a trie, the
+      longest matching one wins.
+    A name resolved by the latter two is memoised as an exact name, and is
+    saved by save_resolved, so it is resolved the slow way only once.
+    '''
+
+    def __init__(self, filename=None, resolved_filename=None):
         super().__init__()
-        if ' ttnames2isin' in self.__dict__:
-            logging.info('TeleTrader: ISINs converter already created.')
-            return self
 
         logging.info('TeleTrader: Loading ISINs from file.')
 
-        self.ttnames2isin = {line['TeleTrader Name']: line['ISIN']
-                             for line
-                             in csv_helper.reader(tt2isin_filename)}
+        self.resolved_filename = resolved_filename or tt_resolved_filename
+        self.ttnames2isin = _loaded_names(filename or tt2isin_filename)
         self.missing_names = set()
+        self.newly_resolved = {}
+
+        self._normalised_names = {}
+        self._prefix_trie = {}
+        for name, isin in self.ttnames2isin.items():
+            prefix = _truncated_prefix(name)
+            if prefix is not None:
+                _insert_prefix(self._prefix_trie, _normalised(prefix), isin)
+            else:
+                _insert_unique(self._normalised_names, _normalised(name), isin)
 
         logging.info(str.format('TeleTrader: {} '
                                  'new TeleTrader Name(s) loaded.',
                                  len(self.ttnames2isin)))
-        
+
+        self.ttnames2isin.update(_loaded_names(self.resolved_filename))
+
     def __getitem__(self, key):
         '''Returns the ISIN by TeleTrader name. In case no ISIN can be returned,
         returns the TeleTrader name itself, and makes an entry in the missing
         names.'''
-        
+
         try:
-            return self.__dict__[key]
+            return self.ttnames2isin[key]
         except KeyError:
+            pass
+        if key in self.missing_names:
+            return key
+
+        isin = self._resolved(key)
+        if isin is None:
             self.missing_names.add(key)
             return key
-            
 
+        logging.info('TeleTrader: Name (%s) resolved to %s.', key, isin)
+        self.ttnames2isin[key] = isin
+        self.newly_resolved[key] = isin
+        return isin
+
+    def _resolved(self, name):
+        '''Returns the ISIN of a name by the normalised names, then by the
+        prefixes, or None.'''
+
+        normalised = _normalised(name)
+        isin = self._normalised_names.get(normalised)
+        if isin is not None:
+            return isin if isin is not _ambiguous else None
+
+        node = self._prefix_trie
+        for character in normalised:
+            node = node.get(character)
+            if node is None:
+                break
+            if None in node:
+                isin = node[None]
+        return isin if isin is not _ambiguous else None
+
+    def save_resolved(self):
+        '''Appends the names resolved since the last save to the resolved
+        names file.'''
+
+        if not self.newly_resolved:
+            return
+
+        exists = os.path.exists(self.resolved_filename)
+        csv_helper.iter_writer(sorted(self.newly_resolved.items()),
+                               self.resolved_filename,
+                               header=None if exists else ('TeleTrader Name', 'ISIN'),
+                               encoding=_csv_encoding,
+                               mode='a')
+        logging.info('TeleTrader: %d resolved name(s) saved.',
+                     len(self.newly_resolved))
+        self.newly_resolved = {}
+
+# the index entry of a name matching more ISINs
+_ambiguous = object()
+
+def _loaded_names(filename):
+    '''Returns the TeleTrader name -> ISIN dict of a file, empty if the
+    file is missing.'''
+
+    try:
+        return {line['TeleTrader Name']: line['ISIN']
+                for line
+                in csv_helper.iter_reader(filename, encoding=_csv_encoding)}
+    except FileNotFoundError:
+        return {}
+
+def _truncated_prefix(name):
+    '''Returns the name without the ellipsis ('...' or its single character
+    form) if it is a truncated name, otherwise None.'''
+
+    if name.endswith('...'):
+        return name[:-3]
+    if name.endswith('\u2026'):
+        return name[:-1]
+    return None
+
+def _normalised(name):
+    '''Returns the name in upper case, with single spaces and the HTML
+    entities resolved.'''
+
+    return ' '.join(html.unescape(name).upper().split())
+
+def _insert_unique(index, key, isin):
+    '''Adds the key to the index, marking it ambiguous if it is already
+    there with another ISIN.'''
+
+    if index.get(key, isin) != isin:
+        isin = _ambiguous
+    index[key] = isin
+
+def _insert_prefix(trie, prefix, isin):
+    '''Adds the prefix to the trie (nested dicts by character, None keys the
+    ISIN). Too short prefixes are skipped.'''
+
+    if len(prefix) < _minimum_prefix_length:
+        return
+    node = trie
+    for character in prefix:
+        node = node.setdefault(character, {})
+    _insert_unique(node, None, isin)
 
 def list_to_dict(raw_list):
     '''
@@ -134,8 +311,7 @@ def list_to_dict(raw_list):
     tuple will be stored in a dictionary.
     '''
 
-    this_datetime = datetime.datetime.strptime(str(raw_list[2]),
-                                               _datetime_format)    
+    this_datetime = _decode_datetime(str(raw_list[2]))
     this_datetime = datetime.datetime(datetime.date.today().year,
                                       this_datetime.month,
                                       this_datetime.day,
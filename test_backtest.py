@@ -0,0 +1,51 @@
+'''
+Unit tests of the backtest module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+from backtest import _forward_returns, _judged, _signals, backtest, rules
+import numpy
+import screener
+import unittest
+
+class TestBacktest(unittest.TestCase):
+    '''Tests backtest.'''
+
+    def setUp(self):
+        random = numpy.random.default_rng(0)
+        self.closes = numpy.cumprod(random.uniform(0.97, 1.035, (30, 120)), axis=1)
+        self.closes[0, :20] = numpy.nan
+        self.closes[1, 100:] = numpy.nan
+
+    def test_pool_same_as_in_process(self):
+        pooled = backtest(self.closes, range(2, 6), range(5, 30, 5), 5, workers=2)
+        in_process = backtest(self.closes, range(2, 6), range(5, 30, 5), 5,
+                              workers=1)
+
+        self.assertEqual(len(pooled), (4 * 5 - 1) * len(rules))
+        self.assertEqual(pooled, in_process)
+
+    def test_judged_against_loop(self):
+        fast_sma = screener.moving_average(self.closes, 3)
+        slow_sma = screener.moving_average(self.closes, 8)
+        returns = _forward_returns(self.closes, 5)
+        crossover, taz_entry = _signals(self.closes, fast_sma, slow_sma)
+
+        expected = []
+        for row in range(self.closes.shape[0]):
+            for column in range(1, self.closes.shape[1] - 5):
+                if (fast_sma[row, column] > slow_sma[row, column]
+                        and fast_sma[row, column - 1] <= slow_sma[row, column - 1]
+                        and not numpy.isnan(self.closes[row, column + 5])):
+                    expected.append(self.closes[row, column + 5]
+                                    / self.closes[row, column] - 1)
+
+        signals, hit_rate, mean_return = _judged(crossover, returns)
+        self.assertEqual(signals, len(expected))
+        self.assertAlmostEqual(hit_rate,
+                               sum(1 for r in expected if r > 0) / len(expected))
+        self.assertAlmostEqual(mean_return, sum(expected) / len(expected))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+'''
+Unit tests of the benchmark module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+from benchmark import compared, loaded_results, save_results, timed
+import os
+import tempfile
+import unittest
+
+class TestTimed(unittest.TestCase):
+    '''Tests timed.'''
+
+    def test_warmup_runs_are_not_timed(self):
+        calls = []
+        elapsed = timed(calls.append, lambda: (len(calls),), warmup=2, repeat=3)
+        self.assertEqual(len(elapsed), 3)
+        self.assertEqual(calls, [0, 1, 2, 3, 4])
+
+class TestCompared(unittest.TestCase):
+    '''Tests compared with saved results.'''
+
+    def test_regression_beyond_threshold(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'benchmark.json')
+            save_results({'Load': [0.010, 0.012], 'Save': [0.020]}, filename)
+            baseline = loaded_results(filename)
+
+        comparison = compared({'Load': [0.0108, 0.011],
+                               'Save': [0.023, 0.030],
+                               'New': [0.001]},
+                              baseline, threshold=10)
+        self.assertEqual([(stage, regressed)
+                          for stage, _, _, _, regressed in comparison],
+                         [('Load', False), ('Save', True)])
+        self.assertAlmostEqual(comparison[1][3], 15.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+'''
+Unit tests of the collector module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+from collector import Collector, next_fetch_time, sent
+import csv_helper
+import datetime
+import indicators
+import marketdata_coupler
+import os
+import signal
+import socket
+import teletrader
+import tempfile
+import threading
+import time
+import unittest
+
+class TestNextFetchTime(unittest.TestCase):
+    '''Tests next_fetch_time.'''
+
+    times = (datetime.time(22, 15), datetime.time(17, 45))
+
+    def test_same_day_and_next_day(self):
+        # a Wednesday
+        self.assertEqual(next_fetch_time(datetime.datetime(2018, 7, 18, 12, 0),
+                                         self.times, False),
+                         datetime.datetime(2018, 7, 18, 17, 45))
+        self.assertEqual(next_fetch_time(datetime.datetime(2018, 7, 18, 17, 45),
+                                         self.times, False),
+                         datetime.datetime(2018, 7, 18, 22, 15))
+        self.assertEqual(next_fetch_time(datetime.datetime(2018, 7, 18, 23, 0),
+                                         self.times, False),
+                         datetime.datetime(2018, 7, 19, 17, 45))
+
+    def test_weekends(self):
+        friday_night = datetime.datetime(2018, 7, 20, 23, 0)
+        self.assertEqual(next_fetch_time(friday_night, self.times, False),
+                         datetime.datetime(2018, 7, 23, 17, 45))
+        self.assertEqual(next_fetch_time(friday_night, self.times, True),
+                         datetime.datetime(2018, 7, 21, 17, 45))
+
+class TestCollector(unittest.TestCase):
+    '''Tests the collector with the market data of exp.htm.'''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.saved_settings = (marketdata_coupler._market_data_filename,
+                               marketdata_coupler.storage_format,
+                               marketdata_coupler.incremental_save,
+                               teletrader.tt_resolved_filename,
+                               indicators.state_filename)
+        self.market_data_filename = os.path.join(self.directory.name,
+                                                 'market_data.csv')
+        marketdata_coupler._market_data_filename = self.market_data_filename
+        marketdata_coupler.storage_format = 'csv'
+        marketdata_coupler.incremental_save = False
+        teletrader.tt_resolved_filename = os.path.join(self.directory.name,
+                                                       'ISIN.resolved.csv')
+        indicators.state_filename = os.path.join(self.directory.name,
+                                                 'indicators.json')
+
+        self.control = os.path.join(self.directory.name, 'collector.sock')
+        # the scheduled fetch is a day away
+        now = datetime.datetime.now() - datetime.timedelta(minutes=1)
+        self.collector = Collector(source_is_web=False, control=self.control,
+                                   times=(now.time(),), weekends=True)
+
+    def tearDown(self):
+        (marketdata_coupler._market_data_filename,
+         marketdata_coupler.storage_format,
+         marketdata_coupler.incremental_save,
+         teletrader.tt_resolved_filename,
+         indicators.state_filename) = self.saved_settings
+        self.directory.cleanup()
+
+    def _wait_for_control(self):
+        for _ in range(500):
+            if os.path.exists(self.control):
+                return
+            time.sleep(0.01)
+        self.fail('The collector did not start.')
+
+    def test_fetch_updates_indicator_state(self):
+        with self.assertLogs(level='INFO'):
+            self.collector.load()
+            self.collector.market_data.rewritten.add('DE0005545503')
+            self.collector.fetch()
+
+        self.assertEqual(self.collector.market_data.rewritten, set())
+        self.assertEqual(sorted(self.collector.indicator_state.isins),
+                         sorted(self.collector.market_data.marketdata))
+        self.assertTrue(os.path.exists(indicators.state_filename))
+
+        state = indicators.IndicatorState()
+        state.load_from_file()
+        self.assertTrue(state.isins)
+        self.assertEqual(state.isins, self.collector.indicator_state.isins)
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'no Unix sockets')
+    def test_control_socket(self):
+        thread = threading.Thread(target=self.collector.run,
+                                  kwargs={'signals': False})
+        thread.start()
+        try:
+            self._wait_for_control()
+            with self.assertLogs(level='INFO'):
+                self.assertIn('fetches: 0', sent(self.control, 'status'))
+                self.assertEqual(sent(self.control, 'fetch'), 'fetched')
+                self.assertIn('fetches: 1', sent(self.control, 'status'))
+                self.assertIn('unsaved changes: False',
+                              sent(self.control, 'status'))
+                self.assertEqual(sent(self.control, 'bogus'),
+                                 'unknown command: bogus')
+        finally:
+            sent(self.control, 'shutdown')
+            thread.join()
+
+        self.assertFalse(os.path.exists(self.control))
+        rows = list(csv_helper.iter_reader(
+            self.market_data_filename,
+            encoding=marketdata_coupler.csv_encoding))
+        self.assertEqual(len(rows), len(self.collector.market_data.marketdata))
+        self.assertTrue(rows)
+
+    @unittest.skipUnless(hasattr(signal, 'SIGUSR1'), 'no SIGUSR1')
+    def test_signals(self):
+        def signalled():
+            self._wait_for_control()
+            os.kill(os.getpid(), signal.SIGUSR1)
+            time.sleep(0.2)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        previous = signal.getsignal(signal.SIGTERM)
+        thread = threading.Thread(target=signalled)
+        thread.start()
+        with self.assertLogs(level='INFO'):
+            self.collector.run()
+        thread.join()
+
+        self.assertEqual(self.collector.fetches, 1)
+        self.assertIs(signal.getsignal(signal.SIGTERM), previous)
+        self.assertTrue(os.path.exists(self.market_data_filename))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+'''
+Unit tests of the datetime_helper module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+from datetime_helper import DateTimeDecoder, _compiled_layout
+import unittest
+
+class TestDateTimeDecoder(unittest.TestCase):
+    '''Tests DateTimeDecoder against datetime.datetime.strptime.'''
+
+    cases = {'%Y.%m.%d': ('2017.07.14', '2000.01.01', '2016.02.29',
+                          '2017.7.4', '2017.07.1', '20000.01.01',
+                          '2017.13.01', '2017.02.30', '2017-07-14', '',
+                          '2O17.07.14', '2017.07.14 '),
+             '%H:%M:%S': ('17:35:00', '00:00:01', '23:59:59', '7:35:00',
+                          '24:00:00', '17:60:00', '17:35:60', '17:35'),
+             '%m.%d./%H:%M': ('07.14./17:35', '12.31./23:59', '7.14./17:35',
+                              '02.29./17:35', '07.14/17:35'),
+             '%d %b %Y': ('14 Jul 2017', '14 Jux 2017'),
+             '%%%Y': ('%2017', '2017')}
+
+    def test_same_as_strptime(self):
+        for format, strings in self.cases.items():
+            decoder = DateTimeDecoder(format)
+            for s in strings:
+                # twice, the second time from the cache
+                for _ in range(2):
+                    try:
+                        expected = datetime.datetime.strptime(s, format)
+                    except ValueError:
+                        with self.assertRaises(ValueError, msg=(format, s)):
+                            decoder(s)
+                    else:
+                        self.assertEqual(decoder(s), expected, msg=(format, s))
+
+    def test_cache_is_bounded(self):
+        decoder = DateTimeDecoder('%H:%M:%S', cache_size=10)
+        for minute in range(60):
+            decoder('17:{:02d}:00'.format(minute))
+        self.assertLessEqual(len(decoder._cache), 10)
+
+    def test_fast_path_used_for_configured_formats(self):
+        for format in ('%Y.%m.%d', '%H:%M:%S', '%m.%d./%H:%M'):
+            self.assertIsNotNone(_compiled_layout(format))
+        for format in ('%d %b %Y', '%I:%M %p', '%Y %m'):
+            self.assertIsNone(_compiled_layout(format))
+
+if __name__ == '__main__':
+    unittest.main()
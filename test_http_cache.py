@@ -0,0 +1,158 @@
+'''
+Unit tests of the http_cache module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import http.client
+import http.server
+import os
+from http_cache import (ConnectionPool, ResponseCache, fetched, fresh, modified,
+                        not_modified, unchanged)
+import tempfile
+import threading
+import unittest
+import unittest.mock
+import urllib.error
+import urllib.parse
+
+class TestFetched(unittest.TestCase):
+    '''Tests fetched against a local HTTP/1.1 server.'''
+
+    def setUp(self):
+        self.page = b'<html>exchange page</html>'
+        self.etag = '"1"'
+        self.requests = []
+        self.client_ports = set()
+        test = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                test.requests.append((self.path, dict(self.headers)))
+                test.client_ports.add(self.client_address[1])
+                # a proxy is asked for the absolute url
+                path = urllib.parse.urlsplit(self.path).path
+                if path == '/etag' and self.headers['If-None-Match'] == test.etag:
+                    self.send_response(304)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if path == '/moved':
+                    self.send_response(302)
+                    self.send_header('Location', '/plain')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if path not in ('/etag', '/plain'):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                if path == '/etag':
+                    self.send_header('ETag', test.etag)
+                self.send_header('Content-Length', str(len(test.page)))
+                self.end_headers()
+                self.wfile.write(test.page)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}/'.format(self.server.server_address[1])
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.directory.name, 0)
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def test_conditional_request(self):
+        url = self.url + 'etag'
+
+        page = fetched(url, self.cache, 5, self.pool)
+        self.assertEqual((page.body, page.rows, page.status),
+                         (self.page, None, modified))
+        self.cache.store_rows(url, [['KRONES AG O.N.', '106,90']])
+
+        page = fetched(url, self.cache, 5, self.pool)
+        self.assertEqual(page.status, not_modified)
+        self.assertEqual(page.body, self.page)
+        self.assertEqual(page.rows, [['KRONES AG O.N.', '106,90']])
+        self.assertEqual(self.requests[1][1]['If-None-Match'], self.etag)
+        # one persistent connection for both requests
+        self.assertEqual(len(self.client_ports), 1)
+
+    def test_unchanged_and_modified_content(self):
+        url = self.url + 'plain'
+
+        fetched(url, self.cache, 5, self.pool)
+        self.cache.store_rows(url, [['row']])
+        self.assertEqual(fetched(url, self.cache, 5, self.pool).status, unchanged)
+
+        self.page = b'<html>new exchange page</html>'
+        page = fetched(url, self.cache, 5, self.pool)
+        self.assertEqual((page.body, page.rows, page.status),
+                         (self.page, None, modified))
+
+    def test_fresh_page_is_not_requested(self):
+        self.cache.freshness = 60
+        url = self.url + 'plain'
+
+        fetched(url, self.cache, 5, self.pool)
+        self.cache.store_rows(url, [['row']])
+        page = fetched(url, self.cache, 5, self.pool)
+
+        self.assertEqual((page.rows, page.status), ([['row']], fresh))
+        self.assertEqual(len(self.requests), 1)
+
+    def test_streamed_body_is_cached(self):
+        url = self.url + 'etag'
+
+        page = fetched(url, self.cache, 5, self.pool, stream=True)
+        with page.body:
+            chunks = list(iter(lambda: page.body.read(4), b''))
+        self.assertEqual(b''.join(chunks), self.page)
+        self.assertEqual(self.cache.body(url), self.page)
+        self.cache.store_rows(url, [['row']])
+
+        page = fetched(url, self.cache, 5, self.pool, stream=True)
+        self.assertEqual((page.body, page.rows, page.status),
+                         (None, [['row']], not_modified))
+        self.assertEqual(len(self.client_ports), 1)
+
+    def test_redirect_and_error(self):
+        self.assertEqual(fetched(self.url + 'moved', self.cache, 5, self.pool).body,
+                         self.page)
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            fetched(self.url + 'missing', self.cache, 5, self.pool)
+        self.assertEqual(context.exception.code, 404)
+
+    def test_http_proxy(self):
+        proxy = urllib.parse.urlsplit(self.url)._replace(
+            netloc='user:secret@' + urllib.parse.urlsplit(self.url).netloc)
+        environment = {'http_proxy': proxy.geturl(), 'no_proxy': ''}
+        with unittest.mock.patch.dict(os.environ, environment):
+            page = fetched('http://exchange.invalid/plain', self.cache, 5,
+                           self.pool)
+
+        self.assertEqual(page.body, self.page)
+        path, headers = self.requests[-1]
+        self.assertEqual(path, 'http://exchange.invalid/plain')
+        self.assertEqual(headers['Proxy-Authorization'],
+                         'Basic dXNlcjpzZWNyZXQ=')
+
+    def test_no_proxy(self):
+        environment = {'http_proxy': 'http://proxy.invalid:3128',
+                       'no_proxy': '127.0.0.1'}
+        with unittest.mock.patch.dict(os.environ, environment):
+            fetched(self.url + 'plain', self.cache, 5, self.pool)
+
+        self.assertEqual(self.requests[-1][0], '/plain')
+
+if __name__ == '__main__':
+    unittest.main()
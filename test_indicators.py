@@ -0,0 +1,149 @@
+'''
+Unit tests of the indicators module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+from indicators import IndicatorState
+import json
+import marketdata
+import numpy
+import os
+import screener
+import tempfile
+import timeseries
+import unittest
+
+class TestIndicatorState(unittest.TestCase):
+    '''Tests IndicatorState against the Screener.'''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'indicators.json')
+        self.market_data = marketdata.MarketData()
+        self.random = numpy.random.default_rng(0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _quotes(self, days, hour=17):
+        '''Returns random quotes of an ISIN for the given days of July.'''
+
+        return {'Market Data': {
+                    datetime.datetime(2018, 7, day, hour, 35):
+                        {'Closing Price': '{:.2f}'.format(
+                             self.random.uniform(10, 20)).replace('.', ','),
+                         'Volume': '1'}
+                    for day in days}}
+
+    def _assert_same_as_screener(self, state):
+        expected = screener.Screener(self.market_data, fast=3, slow=5).latest()
+        latest = state.latest()
+
+        numpy.testing.assert_array_equal(latest.isins, expected.isins)
+        numpy.testing.assert_array_equal(latest.days, expected.days)
+        numpy.testing.assert_array_equal(latest.closes, expected.closes)
+        numpy.testing.assert_allclose(latest.fast_sma, expected.fast_sma)
+        numpy.testing.assert_allclose(latest.slow_sma, expected.slow_sma)
+
+    def _updated_state(self):
+        '''Returns the state updated and saved, then loaded again.'''
+
+        state = IndicatorState(self.filename, fast=3, slow=5)
+        state.load_from_file()
+        state.update(self.market_data)
+        state.save_to_file()
+
+        loaded = IndicatorState(self.filename, fast=3, slow=5)
+        loaded.load_from_file()
+        return state, loaded
+
+    def test_incremental_update(self):
+        self.market_data.append({'A': self._quotes(range(2, 12)),
+                                 'B': self._quotes([3, 5, 6, 9])})
+        state, loaded = self._updated_state()
+        self._assert_same_as_screener(loaded)
+
+        # new days, a missing day and an update of the last day
+        self.market_data.append({'A': self._quotes([12, 13]),
+                                 'B': self._quotes([11]),
+                                 'C': self._quotes([13])})
+        self.market_data.append({'A': self._quotes([13], hour=18)})
+        loaded.update(self.market_data)
+        self._assert_same_as_screener(loaded)
+        self.assertEqual(loaded.isins['A']['Count'], 12)
+
+    def test_backfill_is_rebuilt(self):
+        days = [2, 3, 4, 5, 7, 8]
+        self.market_data.append({'A': self._quotes(days),
+                                 'B': self._quotes(days)})
+        state, loaded = self._updated_state()
+
+        # a quote before the last one of A, on a day new to the calendar,
+        # which B has to carry its close over
+        self.market_data.series('A').update(self._quotes([6])['Market Data'])
+        self.market_data.marketdata['C'] = {
+            'Market Data': timeseries.TimeSeries(self._quotes([9])['Market Data'])}
+
+        loaded.update(self.market_data)
+        self._assert_same_as_screener(loaded)
+        self.assertEqual(len(loaded.isins['B']['Window']), 5)
+
+    def test_clean_into_the_windows_is_rebuilt(self):
+        self.market_data.append({'A': self._quotes(range(2, 12))})
+        state, loaded = self._updated_state()
+
+        self.market_data.series('A').prune_before(datetime.datetime(2018, 7, 9))
+        loaded.update(self.market_data)
+        self._assert_same_as_screener(loaded)
+        self.assertEqual(loaded.isins['A']['First day'], datetime.date(2018, 7, 9))
+
+    def test_clean_before_the_windows_is_not_rebuilt(self):
+        self.market_data.append({'A': self._quotes(range(2, 12)),
+                                 'B': self._quotes([2, 3, 5, 6, 8, 9])})
+        state, loaded = self._updated_state()
+
+        retention_cutoff = marketdata._retention_cutoff
+        marketdata._retention_cutoff = lambda: datetime.datetime(2018, 7, 3)
+        try:
+            self.market_data.clean()
+        finally:
+            marketdata._retention_cutoff = retention_cutoff
+        self.market_data.append({'A': self._quotes([12]),
+                                 'B': self._quotes([12])})
+
+        self.assertEqual(self.market_data.rewritten, set())
+        with self.assertLogs(level='INFO') as logs:
+            loaded.update(self.market_data)
+        self.assertIn('INFO:root:IndicatorState: 2 ISIN(s) updated, '
+                      '0 of them rebuilt.', logs.output)
+        self._assert_same_as_screener(loaded)
+
+    def test_other_format_starts_empty(self):
+        self.market_data.append({'A': self._quotes(range(2, 12))})
+        self._updated_state()
+        with open(self.filename, encoding='utf-8') as f:
+            content = json.load(f)
+        self.assertEqual(sorted(content['ISINs']['A']),
+                         ['Count', 'First day', 'Last', 'Last day', 'Tail',
+                          'Window'])
+
+        del content['Version']
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            json.dump(content, f)
+        state = IndicatorState(self.filename, fast=3, slow=5)
+        with self.assertLogs(level='INFO'):
+            state.load_from_file()
+        self.assertEqual(state.isins, {})
+
+    def test_other_windows_start_empty(self):
+        self.market_data.append({'A': self._quotes(range(2, 12))})
+        self._updated_state()
+
+        state = IndicatorState(self.filename, fast=2, slow=5)
+        state.load_from_file()
+        self.assertEqual(state.isins, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+'''
+Unit tests of the instrumentation module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import instrumentation
+import json
+import os
+import tempfile
+import unittest
+
+class TestInstrumentation(unittest.TestCase):
+    '''Tests the timers, the counters and the reports.'''
+
+    def setUp(self):
+        self.saved_enabled = instrumentation.enabled
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.enable(self.saved_enabled)
+        instrumentation.reset()
+
+    def test_nothing_is_collected_when_off(self):
+        instrumentation.enable(False)
+        with instrumentation.timer('HTML parse', exchange='DAX30'):
+            instrumentation.count('rows_parsed', 50, exchange='DAX30')
+        self.assertEqual(instrumentation.report()['Timers'], [])
+        self.assertEqual(instrumentation.report()['Counters'], [])
+        self.assertEqual(instrumentation.prometheus_text(), '')
+
+    def test_timers_and_counters(self):
+        instrumentation.enable()
+
+        @instrumentation.timed('Append')
+        def append():
+            instrumentation.count('rows_merged', 3)
+
+        append()
+        append()
+        with instrumentation.timer('HTML parse', exchange='DAX30'):
+            instrumentation.count('rows_parsed', 50, exchange='DAX30')
+        instrumentation.count('rows_parsed', 20, exchange='Mdax')
+
+        report = instrumentation.report()
+        self.assertEqual([(timer['stage'], timer.get('exchange'), timer['calls'])
+                          for timer in report['Timers']],
+                         [('Append', None, 2), ('HTML parse', 'DAX30', 1)])
+        self.assertEqual(report['Counters'],
+                         [{'name': 'rows_merged', 'value': 6},
+                          {'exchange': 'DAX30', 'name': 'rows_parsed', 'value': 50},
+                          {'exchange': 'Mdax', 'name': 'rows_parsed', 'value': 20}])
+
+    def test_prometheus_text(self):
+        instrumentation.enable()
+        instrumentation.count('bytes_fetched', 1024, exchange='S&P "500"')
+        instrumentation.count('rows_pruned', 7)
+
+        self.assertEqual(instrumentation.prometheus_text(),
+                         '# TYPE peter_bytes_fetched_total counter\n'
+                         'peter_bytes_fetched_total{exchange="S&P \\"500\\""} 1024\n'
+                         '# TYPE peter_rows_pruned_total counter\n'
+                         'peter_rows_pruned_total 7\n')
+
+    def test_save_report(self):
+        instrumentation.enable()
+        with instrumentation.timer('Clean'):
+            pass
+
+        with tempfile.TemporaryDirectory() as directory:
+            report_filename = os.path.join(directory, 'instrumentation.json')
+            prometheus_filename = os.path.join(directory, 'instrumentation.prom')
+            instrumentation.save_report(report_filename, prometheus_filename)
+
+            with open(report_filename, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['Timers'][0]['stage'], 'Clean')
+            with open(prometheus_filename, encoding='utf-8') as f:
+                self.assertIn('peter_stage_seconds_total{stage="Clean"} ',
+                              f.read())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+'''
+Unit tests of the marketdata_columnar module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+import marketdata
+import marketdata_coupler
+from marketdata_columnar import loaded_market_data, save_to_file
+import os
+import tempfile
+import unittest
+
+class TestColumnarRoundTrip(unittest.TestCase):
+    '''Tests save_to_file and loaded_market_data.'''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'market_data.col')
+        self.marketdata = {
+            'DE0005545503': {
+                'Stock Exchange': 'TechDAX',
+                'TeleTrader Name': '1+1 DRILLISCH AG ...',
+                'Market Data': {
+                    datetime.datetime(2017, 7, 14, 17, 35):
+                        {'Closing Price': '60,05', 'Volume': '86531'},
+                    datetime.datetime(2017, 7, 13, 17, 35):
+                        {'Closing Price': '1.234,5', 'Volume': ''}}},
+            'DE0008402215': {
+                'Stock Exchange': 'DAX30',
+                'TeleTrader Name': 'HANNOVER RUECK SE',
+                'Market Data': {
+                    datetime.datetime(2017, 7, 14, 17, 35):
+                        {'Closing Price': '0,1234', 'Volume': '1'}}}}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        save_to_file(self.marketdata, self.filename)
+        loaded = loaded_market_data(self.filename)
+
+        self.assertEqual(sorted(loaded), sorted(self.marketdata))
+        series = loaded['DE0005545503']['Market Data']
+        self.assertEqual(list(series),
+                         [datetime.datetime(2017, 7, 13, 17, 35),
+                          datetime.datetime(2017, 7, 14, 17, 35)])
+        self.assertEqual(series[datetime.datetime(2017, 7, 13, 17, 35)],
+                         {'Closing Price': '1.234,5', 'Volume': ''})
+        self.assertEqual(
+            loaded['DE0008402215']['Market Data'][
+                datetime.datetime(2017, 7, 14, 17, 35)],
+            {'Closing Price': '0,1234', 'Volume': '1'})
+        self.assertEqual(loaded['DE0008402215']['TeleTrader Name'],
+                         'HANNOVER RUECK SE')
+
+    def test_missing_datetime(self):
+        save_to_file(self.marketdata, self.filename)
+        series = loaded_market_data(self.filename)['DE0008402215']['Market Data']
+
+        self.assertNotIn(datetime.datetime(2017, 7, 14), series)
+        with self.assertRaises(KeyError):
+            series[datetime.datetime(2017, 7, 14)]
+
+    def test_modification_is_not_written_back(self):
+        save_to_file(self.marketdata, self.filename)
+        series = loaded_market_data(self.filename)['DE0005545503']['Market Data']
+
+        del series[datetime.datetime(2017, 7, 13, 17, 35)]
+        series[datetime.datetime(2017, 7, 17, 17, 35)] = {'Closing Price': '61,00',
+                                                          'Volume': '5'}
+
+        self.assertEqual(len(series), 2)
+        self.assertEqual(
+            len(loaded_market_data(self.filename)['DE0005545503']['Market Data']), 2)
+        self.assertNotIn(
+            datetime.datetime(2017, 7, 17, 17, 35),
+            loaded_market_data(self.filename)['DE0005545503']['Market Data'])
+
+    def test_prune_before(self):
+        save_to_file(self.marketdata, self.filename)
+        series = loaded_market_data(self.filename)['DE0005545503']['Market Data']
+
+        self.assertEqual(series.prune_before(datetime.datetime(2017, 7, 14)), 1)
+        self.assertIsNone(series._materialised)
+        self.assertEqual(list(series), [datetime.datetime(2017, 7, 14, 17, 35)])
+        self.assertEqual(series[datetime.datetime(2017, 7, 14, 17, 35)],
+                         {'Closing Price': '60,05', 'Volume': '86531'})
+
+    def test_items_from(self):
+        save_to_file(self.marketdata, self.filename)
+        series = loaded_market_data(self.filename)['DE0005545503']['Market Data']
+
+        self.assertEqual(series.position(datetime.datetime(2017, 7, 14)), 1)
+        self.assertEqual(series.items_from(1),
+                         [(datetime.datetime(2017, 7, 14, 17, 35),
+                           {'Closing Price': '60,05', 'Volume': '86531'})])
+        self.assertIsNone(series._materialised)
+
+    def test_quote_strings_are_kept(self):
+        quotes = {datetime.datetime(2017, 7, day, 17, 35): quote
+                  for day, quote in ((10, {'Closing Price': '1.234,56',
+                                           'Volume': '1.234'}),
+                                     (11, {'Closing Price': '0,12345',
+                                           'Volume': ''}),
+                                     (12, {'Closing Price': '',
+                                           'Volume': '0'}),
+                                     (13, {'Closing Price': '60.05',
+                                           'Volume': '86531'}))}
+        self.marketdata['DE0008402215']['Market Data'] = dict(quotes)
+        save_to_file(self.marketdata, self.filename)
+        series = loaded_market_data(self.filename)['DE0008402215']['Market Data']
+
+        self.assertEqual(dict(series.items()), quotes)
+        self.assertEqual(series.prune_before(datetime.datetime(2017, 7, 12)), 2)
+        self.assertEqual(series.items_from(0),
+                         sorted(quotes.items())[2:])
+        series[datetime.datetime(2017, 7, 14)] = {'Closing Price': '1',
+                                                  'Volume': '1'}
+        self.assertEqual(series[datetime.datetime(2017, 7, 13, 17, 35)],
+                         {'Closing Price': '60.05', 'Volume': '86531'})
+
+    def test_load_append_save(self):
+        saved_settings = (marketdata_coupler._columnar_market_data_filename,
+                          marketdata_coupler.storage_format)
+        marketdata_coupler._columnar_market_data_filename = self.filename
+        marketdata_coupler.storage_format = 'columnar'
+        try:
+            save_to_file(self.marketdata, self.filename)
+            market_data = marketdata.MarketData()
+            with self.assertLogs(level='INFO'):
+                market_data.load_from_file()
+                source = market_data.series('DE0008402215').source
+                market_data.append({'DE0005545503': {
+                    'Stock Exchange': 'TechDAX',
+                    'TeleTrader Name': '1+1 DRILLISCH AG ...',
+                    'Market Data': {datetime.datetime(2017, 7, 17, 17, 35):
+                        {'Closing Price': '61,00', 'Volume': '5'}}}})
+                market_data.save_to_file()
+        finally:
+            (marketdata_coupler._columnar_market_data_filename,
+             marketdata_coupler.storage_format) = saved_settings
+
+        # the file was not mapped any more when replaced
+        self.assertTrue(source._mmap.closed)
+        self.assertIsNone(market_data.series('DE0008402215').source)
+        self.assertEqual(market_data.series('DE0008402215')[
+                             datetime.datetime(2017, 7, 14, 17, 35)],
+                         {'Closing Price': '0,1234', 'Volume': '1'})
+        loaded = loaded_market_data(self.filename)
+        self.assertEqual(len(loaded['DE0005545503']['Market Data']), 3)
+        self.assertEqual(len(loaded['DE0008402215']['Market Data']), 1)
+
+    def test_not_a_columnar_file(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'ISIN;Name\n' * 4)
+        with self.assertRaises(ValueError):
+            loaded_market_data(self.filename)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+'''
+Unit tests of the marketdata_coupler module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+import marketdata
+import marketdata_coupler
+from marketdata_coupler import (_journal_segment_filenames, append_to_journal,
+                                journal_is_appendable, loaded_past_market_data,
+                                save_to_file)
+import marketdata_partitioned
+import os
+import tempfile
+import unittest
+
+class TestJournal(unittest.TestCase):
+    '''Tests the journal segments of the CSV market data.'''
+
+    header = ('Name', 'ISIN', 'Date', 'Time', 'Closing Price', 'Volume',
+              'TeleTrader Name', 'Stock Exchange')
+
+    def setUp(self):
+        self.saved_settings = (marketdata_coupler._market_data_filename,
+                               marketdata_coupler.incremental_save)
+        self.directory = tempfile.TemporaryDirectory()
+        marketdata_coupler._market_data_filename = os.path.join(
+            self.directory.name, 'market_data.csv')
+        marketdata_coupler.incremental_save = True
+        self.converter = {'KRONES AG O.N.': 'DE0006335003'}
+
+    def tearDown(self):
+        (marketdata_coupler._market_data_filename,
+         marketdata_coupler.incremental_save) = self.saved_settings
+        self.directory.cleanup()
+
+    def _row(self, date, time, price):
+        return ['', 'DE0006335003', date, time, price, '100',
+                'KRONES AG O.N.', 'Mdax']
+
+    def test_journal_replaces_same_day(self):
+        save_to_file([self.header,
+                      self._row('2017.07.13', '17:35:00', '105,00'),
+                      self._row('2017.07.14', '12:00:00', '106,00')])
+        self.assertTrue(journal_is_appendable())
+
+        append_to_journal([self.header,
+                           self._row('2017.07.14', '17:35:00', '106,90')])
+        append_to_journal([self.header,
+                           self._row('2017.07.17', '17:35:00', '107,10')])
+
+        self.assertEqual(len(_journal_segment_filenames()), 2)
+        loaded = loaded_past_market_data(self.converter)
+        self.assertEqual(
+            sorted(loaded['DE0006335003']['Market Data'].items()),
+            [(datetime.datetime(2017, 7, 13, 17, 35),
+              {'Closing Price': '105,00', 'Volume': '100'}),
+             (datetime.datetime(2017, 7, 14, 17, 35),
+              {'Closing Price': '106,90', 'Volume': '100'}),
+             (datetime.datetime(2017, 7, 17, 17, 35),
+              {'Closing Price': '107,10', 'Volume': '100'})])
+
+    def test_full_save_compacts_journal(self):
+        save_to_file([self.header,
+                      self._row('2017.07.13', '17:35:00', '105,00')])
+        append_to_journal([self.header,
+                           self._row('2017.07.14', '17:35:00', '106,90')])
+        save_to_file([self.header,
+                      self._row('2017.07.14', '17:35:00', '106,90')])
+
+        self.assertEqual(_journal_segment_filenames(), [])
+        self.assertEqual(
+            len(loaded_past_market_data(self.converter)['DE0006335003']['Market Data']),
+            1)
+
+    def test_no_journal_without_base_file(self):
+        self.assertFalse(journal_is_appendable())
+
+class TestPartitionedMarketData(unittest.TestCase):
+    '''Tests MarketData with partitioned storage.'''
+
+    def setUp(self):
+        self.saved_settings = (
+            marketdata_coupler._partitioned_market_data_directory,
+            marketdata_coupler.storage_format,
+            marketdata._retention_cutoff)
+        self.directory = tempfile.TemporaryDirectory()
+        marketdata_coupler._partitioned_market_data_directory = (
+            self.directory.name)
+        marketdata_coupler.storage_format = 'partitioned'
+        marketdata._retention_cutoff = lambda: datetime.datetime(2017, 7, 1)
+
+        marketdata_partitioned.save_to_file(
+            {'DE0006335003': {
+                'Stock Exchange': 'Mdax',
+                'TeleTrader Name': 'KRONES AG O.N.',
+                'Market Data': {
+                    datetime.datetime(2017, 6, 13, 17, 35):
+                        {'Closing Price': '105,00', 'Volume': '100'},
+                    datetime.datetime(2017, 7, 14, 17, 35):
+                        {'Closing Price': '106,90', 'Volume': '100'}}}},
+            self.directory.name, compress=False)
+
+    def tearDown(self):
+        (marketdata_coupler._partitioned_market_data_directory,
+         marketdata_coupler.storage_format,
+         marketdata._retention_cutoff) = self.saved_settings
+        self.directory.cleanup()
+
+    def test_expired_partitions_deleted_by_save(self):
+        market_data = marketdata.MarketData()
+        with self.assertLogs(level='INFO'):
+            market_data.load_from_file()
+            # the expired partition is not even loaded
+            self.assertEqual(len(market_data.series('DE0006335003')), 1)
+
+            market_data.clean()
+            self.assertTrue(market_data.changed_after_load)
+            self.assertEqual(sorted(os.listdir(self.directory.name)),
+                             ['2017-06.csv', '2017-07.csv', 'manifest.json'])
+
+            market_data.save_to_file()
+        self.assertEqual(sorted(os.listdir(self.directory.name)),
+                         ['2017-07.csv', 'manifest.json'])
+        self.assertIsNone(market_data.cleaned_before)
+
+    def test_no_change_without_expired_partition(self):
+        market_data = marketdata.MarketData()
+        with self.assertLogs(level='INFO'):
+            market_data.load_from_file()
+            market_data.clean()
+            market_data.save_to_file()
+            market_data.clean()
+
+        self.assertFalse(market_data.changed_after_load)
+        self.assertIsNone(market_data.cleaned_before)
+
+    def test_load_discards_appended(self):
+        market_data = marketdata.MarketData()
+        with self.assertLogs(level='INFO'):
+            market_data.load_from_file()
+            market_data.append({'DE0006335003': {
+                'Stock Exchange': 'Mdax',
+                'TeleTrader Name': 'KRONES AG O.N.',
+                'Market Data': {datetime.datetime(2017, 7, 17, 17, 35):
+                    {'Closing Price': '107,10', 'Volume': '100'}}}})
+            self.assertEqual(len(market_data.appended), 1)
+
+            market_data.load_from_file()
+        self.assertEqual(market_data.appended, [])
+
+if __name__ == '__main__':
+    unittest.main()
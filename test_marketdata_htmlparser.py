@@ -0,0 +1,177 @@
+'''
+Unit tests of the marketdata_htmlparser module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import http.client
+import http.server
+import http_cache
+import marketdata_htmlparser
+from marketdata_htmlparser import (_fetch_results,
+                                   _iter_tuples_parsed_from_chunks,
+                                   _tuples_loaded_from_file,
+                                   _tuples_loaded_from_urls,
+                                   iter_tuples_loaded_from_url)
+import teletrader
+import tempfile
+import threading
+import unittest
+import unittest.mock
+import urllib.error
+import urllib.request
+
+class TestIterTuplesParsedFromChunks(unittest.TestCase):
+    '''Tests _iter_tuples_parsed_from_chunks.'''
+
+    def test_same_rows_for_any_chunk_size(self):
+        with open('exp.htm', 'rb') as f:
+            page = f.read()
+        expected = _tuples_loaded_from_file('exp.htm')
+
+        for chunk_size in (1, 7, 100, 4096, len(page)):
+            chunks = (page[start:start + chunk_size]
+                      for start in range(0, len(page), chunk_size))
+            rows = [row
+                    for rows in _iter_tuples_parsed_from_chunks('Not specified',
+                                                                chunks)
+                    for row in rows]
+            self.assertEqual(rows, expected, msg=chunk_size)
+
+class TestFetchResults(unittest.TestCase):
+    '''Tests _fetch_results against a local HTTP server serving exp.htm.'''
+
+    @classmethod
+    def setUpClass(cls):
+        with open('exp.htm', 'rb') as f:
+            page = f.read()
+        flaky_requests = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/flaky' and not flaky_requests:
+                    flaky_requests.append(self.path)
+                    self.send_error(503)
+                elif self.path == '/truncated':
+                    # a chunked body cut short by the server
+                    self.send_response(200)
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    self.wfile.write(b'%x\r\n%s\r\n' % (1024, page[:1024]))
+                    self.wfile.write(b'%x\r\n' % 4096 + page[1024:2048])
+                    self.close_connection = True
+                elif self.headers['If-None-Match'] == '"exp"':
+                    self.send_response(304)
+                    self.end_headers()
+                elif self.path in ('/exp.htm', '/flaky'):
+                    self.send_response(200)
+                    self.send_header('ETag', '"exp"')
+                    self.send_header('Content-Type', 'text/html; charset=UTF-8')
+                    self.send_header('Content-Length', str(len(page)))
+                    self.end_headers()
+                    self.wfile.write(page)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever,
+                                      daemon=True)
+        cls.thread.start()
+        cls.url = 'http://127.0.0.1:{}/'.format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        http_cache._pool.close()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.saved_cache = marketdata_htmlparser._response_cache
+        self.cache_directory = tempfile.TemporaryDirectory()
+        marketdata_htmlparser._response_cache = http_cache.ResponseCache(
+            self.cache_directory.name, 0)
+
+    def tearDown(self):
+        marketdata_htmlparser._response_cache = self.saved_cache
+        self.cache_directory.cleanup()
+
+    def test_results_are_ordered_by_stock_exchange(self):
+        urls = {'Sdax': self.url + 'exp.htm',
+                'ATX': self.url + 'missing',
+                'Mdax': self.url + 'flaky',
+                'DAX30': self.url + 'exp.htm'}
+
+        results = _fetch_results(urls, workers=4, timeout=5, retries=1,
+                                 backoff=0)
+
+        self.assertEqual([result.stock_exchange for result in results],
+                         ['ATX', 'DAX30', 'Mdax', 'Sdax'])
+        self.assertIsInstance(results[0].error, urllib.error.HTTPError)
+        self.assertEqual(results[0].attempts, 1)
+        self.assertEqual(results[2].attempts, 2)
+        for result in results[1:]:
+            self.assertIsNone(result.error)
+            self.assertEqual(len(result.stocks), 50)
+            self.assertEqual(result.stocks[0][-1], result.stock_exchange)
+
+    def test_truncated_body_fails_its_exchange_only(self):
+        urls = {'Mdax': self.url + 'truncated',
+                'DAX30': self.url + 'exp.htm'}
+
+        results = _fetch_results(urls, workers=2, timeout=5, retries=1,
+                                 backoff=0)
+
+        self.assertIsInstance(results[1].error, http.client.IncompleteRead)
+        self.assertEqual(results[1].attempts, 2)
+        self.assertIsNone(results[0].error)
+        self.assertEqual(len(results[0].stocks), 50)
+        # the partial page is not cached
+        self.assertIsNone(marketdata_htmlparser._response_cache.entry(
+            self.url + 'truncated'))
+
+    def test_incomplete_read_is_retried(self):
+        rows = _tuples_loaded_from_file('exp.htm')
+        side_effects = [http.client.IncompleteRead(b'<html>', 100), rows]
+
+        with unittest.mock.patch.object(marketdata_htmlparser,
+                                        '_tuples_loaded_from_url',
+                                        side_effect=side_effects):
+            results = _fetch_results({'Mdax': self.url + 'exp.htm'},
+                                     workers=1, timeout=5, retries=1,
+                                     backoff=0)
+
+        self.assertIsNone(results[0].error)
+        self.assertEqual(results[0].attempts, 2)
+        self.assertEqual(results[0].stocks, rows)
+
+    def test_same_rows_as_from_file(self):
+        urls = {'Not specified': self.url + 'exp.htm'}
+
+        self.assertEqual(_tuples_loaded_from_urls(urls, workers=1),
+                         tuple(_tuples_loaded_from_file('exp.htm')))
+
+    def test_rows_are_yielded_while_downloading(self):
+        rows = iter_tuples_loaded_from_url('Mdax', self.url + 'exp.htm',
+                                           timeout=5, chunk_size=1024)
+
+        self.assertEqual(next(rows)[0], 'RATIONAL AG')
+        self.assertEqual(len(list(rows)), 49)
+        self.assertEqual(len(_tuples_loaded_from_urls({'Mdax': self.url + 'exp.htm'})),
+                         50)
+
+    def test_unchanged_page_is_not_parsed_again(self):
+        urls = {'Mdax': self.url + 'exp.htm'}
+        first = _tuples_loaded_from_urls(urls)
+
+        with unittest.mock.patch.object(teletrader,
+                                        'TeletraderHTMLParser') as parser:
+            second = _tuples_loaded_from_urls(urls)
+
+        parser.assert_not_called()
+        self.assertEqual(first, second)
+
+if __name__ == '__main__':
+    unittest.main()
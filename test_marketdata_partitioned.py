@@ -0,0 +1,129 @@
+'''
+Unit tests of the marketdata_partitioned module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+from marketdata_partitioned import (delete_expired, loaded_market_data,
+                                    manifest, save_to_file)
+import os
+import tempfile
+import unittest
+
+class TestPartitionedStorage(unittest.TestCase):
+    '''Tests save_to_file, loaded_market_data and delete_expired.'''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'market_data.parts')
+        self.marketdata = {
+            'DE0005545503': {
+                'Stock Exchange': 'TechDAX',
+                'TeleTrader Name': '1+1 DRILLISCH AG ...',
+                'Market Data': {
+                    datetime.datetime(2017, 7, 14, 17, 35):
+                        {'Closing Price': '60,05', 'Volume': '86531'},
+                    datetime.datetime(2017, 6, 13, 17, 35):
+                        {'Closing Price': '1.234,5', 'Volume': ''}}},
+            'DE0008402215': {
+                'Stock Exchange': 'DAX30',
+                'TeleTrader Name': 'HANNOVER RUECK SE',
+                'Market Data': {
+                    datetime.datetime(2017, 7, 14, 17, 35):
+                        {'Closing Price': '0,1234', 'Volume': '1'}}}}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(save_to_file(self.marketdata, self.path),
+                         ['2017-06', '2017-07'])
+        loaded = loaded_market_data(self.path)
+
+        self.assertEqual(sorted(loaded), sorted(self.marketdata))
+        series = loaded['DE0005545503']['Market Data']
+        self.assertEqual(list(series),
+                         [datetime.datetime(2017, 6, 13, 17, 35),
+                          datetime.datetime(2017, 7, 14, 17, 35)])
+        self.assertEqual(series[datetime.datetime(2017, 6, 13, 17, 35)],
+                         {'Closing Price': '1.234,5', 'Volume': ''})
+        self.assertEqual(loaded['DE0008402215']['TeleTrader Name'],
+                         'HANNOVER RUECK SE')
+
+    def test_manifest(self):
+        save_to_file(self.marketdata, self.path)
+        partitions = manifest(self.path)
+
+        self.assertEqual(partitions['2017-06'],
+                         {'Filename': '2017-06.csv.gz',
+                          'First': '2017-06-13 17:35:00',
+                          'Last': '2017-06-13 17:35:00',
+                          'Rows': 1,
+                          'ISINs': ['DE0005545503']})
+        self.assertEqual(partitions['2017-07']['ISINs'],
+                         ['DE0005545503', 'DE0008402215'])
+
+    def test_uncompressed(self):
+        save_to_file(self.marketdata, self.path, compress=False)
+
+        with open(os.path.join(self.path, '2017-07.csv')) as f:
+            self.assertTrue(f.readline().startswith('ISIN;Datetime;'))
+        self.assertEqual(len(loaded_market_data(self.path)), 2)
+
+    def test_window_opens_overlapping_partitions(self):
+        save_to_file(self.marketdata, self.path)
+        os.remove(os.path.join(self.path, '2017-06.csv.gz'))
+
+        loaded = loaded_market_data(self.path,
+                                    start=datetime.datetime(2017, 7, 1))
+
+        self.assertEqual(len(loaded['DE0005545503']['Market Data']), 1)
+
+    def test_isins_open_their_partitions(self):
+        save_to_file(self.marketdata, self.path)
+        os.remove(os.path.join(self.path, '2017-06.csv.gz'))
+
+        loaded = loaded_market_data(self.path, isins=['DE0008402215'])
+
+        self.assertEqual(list(loaded), ['DE0008402215'])
+
+    def test_missing_manifest(self):
+        with self.assertRaises(FileNotFoundError):
+            loaded_market_data(self.path)
+
+    def test_only_months_of_appended_rewritten(self):
+        save_to_file(self.marketdata, self.path)
+        june = os.stat(os.path.join(self.path, '2017-06.csv.gz')).st_mtime_ns
+        later = datetime.datetime(2017, 7, 14, 22, 0)
+        marketdata = {'DE0008402215': dict(self.marketdata['DE0008402215'],
+                                           **{'Market Data': {later: {
+                                               'Closing Price': '0,2',
+                                               'Volume': '2'}}})}
+
+        months = save_to_file(marketdata, self.path,
+                              [('DE0008402215', later)])
+
+        self.assertEqual(months, ['2017-07'])
+        self.assertEqual(
+            os.stat(os.path.join(self.path, '2017-06.csv.gz')).st_mtime_ns,
+            june)
+        loaded = loaded_market_data(self.path)
+        # merged by replacing the quote of the same day, the other ISIN kept
+        self.assertEqual(list(loaded['DE0008402215']['Market Data'].items()),
+                         [(later, {'Closing Price': '0,2', 'Volume': '2'})])
+        self.assertEqual(len(loaded['DE0005545503']['Market Data']), 2)
+
+    def test_delete_expired(self):
+        save_to_file(self.marketdata, self.path)
+
+        self.assertEqual(delete_expired(self.path,
+                                        datetime.datetime(2017, 7, 1)), 1)
+        self.assertEqual(sorted(os.listdir(self.path)),
+                         ['2017-07.csv.gz', 'manifest.json'])
+        self.assertEqual(list(manifest(self.path)), ['2017-07'])
+        self.assertEqual(delete_expired(self.path,
+                                        datetime.datetime(2017, 7, 1)), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+'''
+Unit tests of the marketdata_sqlite module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+from marketdata_sqlite import connected, loaded_market_data, save_to_file
+import os
+import tempfile
+import unittest
+
+class TestSQLiteStorage(unittest.TestCase):
+    '''Tests save_to_file and loaded_market_data.'''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'market_data.sqlite')
+        self.marketdata = {
+            'DE0005545503': {
+                'Stock Exchange': 'TechDAX',
+                'TeleTrader Name': '1+1 DRILLISCH AG ...',
+                'Market Data': {
+                    datetime.datetime(2017, 7, 14, 17, 35):
+                        {'Closing Price': '60,05', 'Volume': '86531'},
+                    datetime.datetime(2017, 7, 13, 17, 35):
+                        {'Closing Price': '1.234,5', 'Volume': ''}}},
+            'DE0008402215': {
+                'Stock Exchange': 'DAX30',
+                'TeleTrader Name': 'HANNOVER RUECK SE',
+                'Market Data': {
+                    datetime.datetime(2017, 7, 14, 17, 35):
+                        {'Closing Price': '0,1234', 'Volume': '1'}}}}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def quotes(self):
+        connection = connected(self.filename)
+        try:
+            return connection.execute(
+                'SELECT isin, datetime, closing_price FROM quotes '
+                'ORDER BY isin, datetime').fetchall()
+        finally:
+            connection.close()
+
+    def test_round_trip(self):
+        save_to_file(self.marketdata, self.filename)
+        loaded = loaded_market_data(self.filename)
+
+        self.assertEqual(sorted(loaded), sorted(self.marketdata))
+        series = loaded['DE0005545503']['Market Data']
+        self.assertEqual(list(series),
+                         [datetime.datetime(2017, 7, 13, 17, 35),
+                          datetime.datetime(2017, 7, 14, 17, 35)])
+        self.assertEqual(series[datetime.datetime(2017, 7, 13, 17, 35)],
+                         {'Closing Price': '1.234,5', 'Volume': ''})
+        self.assertEqual(loaded['DE0008402215']['TeleTrader Name'],
+                         'HANNOVER RUECK SE')
+
+    def test_wal_mode(self):
+        save_to_file(self.marketdata, self.filename)
+        connection = connected(self.filename)
+        try:
+            self.assertEqual(
+                connection.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        finally:
+            connection.close()
+
+    def test_missing_database(self):
+        with self.assertRaises(FileNotFoundError):
+            loaded_market_data(self.filename)
+
+    def test_only_appended_written(self):
+        save_to_file(self.marketdata, self.filename)
+        new_datetime = datetime.datetime(2017, 7, 17, 17, 35)
+        series = self.marketdata['DE0008402215']['Market Data']
+        series[new_datetime] = {'Closing Price': '0,2', 'Volume': '2'}
+        # not appended, so not written
+        series[datetime.datetime(2017, 7, 14, 17, 35)]['Closing Price'] = '9,99'
+
+        written, deleted = save_to_file(self.marketdata, self.filename,
+                                        [('DE0008402215', new_datetime)])
+
+        self.assertEqual((written, deleted), (1, 0))
+        self.assertEqual(self.quotes()[-2:],
+                         [('DE0008402215', '2017-07-14 17:35:00', '0,1234'),
+                          ('DE0008402215', '2017-07-17 17:35:00', '0,2')])
+
+    def test_same_day_update(self):
+        save_to_file(self.marketdata, self.filename)
+        later = datetime.datetime(2017, 7, 14, 22, 0)
+        self.marketdata['DE0008402215']['Market Data'] = {
+            later: {'Closing Price': '0,2', 'Volume': '2'}}
+
+        save_to_file(self.marketdata, self.filename,
+                     [('DE0008402215', later)])
+
+        self.assertEqual(self.quotes()[-1:],
+                         [('DE0008402215', '2017-07-14 22:00:00', '0,2')])
+
+    def test_same_day_discard(self):
+        save_to_file(self.marketdata, self.filename)
+        earlier = datetime.datetime(2017, 7, 14, 9, 0)
+        self.marketdata['DE0008402215']['Market Data'] = {
+            earlier: {'Closing Price': '0,2', 'Volume': '2'}}
+
+        written, _ = save_to_file(self.marketdata, self.filename,
+                                  [('DE0008402215', earlier)])
+
+        self.assertEqual(written, 0)
+        self.assertEqual(self.quotes()[-1:],
+                         [('DE0008402215', '2017-07-14 17:35:00', '0,1234')])
+
+    def test_retention(self):
+        save_to_file(self.marketdata, self.filename)
+
+        _, deleted = save_to_file(self.marketdata, self.filename, [],
+                                  datetime.datetime(2017, 7, 14))
+
+        self.assertEqual(deleted, 1)
+        self.assertEqual([row[1] for row in self.quotes()],
+                         ['2017-07-14 17:35:00', '2017-07-14 17:35:00'])
+
+        _, deleted = save_to_file(self.marketdata, self.filename, [],
+                                  datetime.datetime(2017, 7, 15))
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(loaded_market_data(self.filename), {})
+
+if __name__ == '__main__':
+    unittest.main()
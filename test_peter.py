@@ -0,0 +1,72 @@
+'''
+Unit tests of the peter module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import contextlib
+import io
+from peter import import_snapshots, parsed_arguments, startup_time, subsystems
+import subprocess
+import sys
+import unittest
+
+class TestParsedArguments(unittest.TestCase):
+    '''Tests parsed_arguments.'''
+
+    def test_import_directory(self):
+        arguments = parsed_arguments(['import', 'snapshots'])
+        self.assertIs(arguments.function, import_snapshots)
+        self.assertEqual(arguments.directory, 'snapshots')
+        self.assertEqual(parsed_arguments(['import']).directory, '.')
+
+    def test_unknown_command_to_measure(self):
+        self.assertEqual(parsed_arguments(['startup', 'screen']).commands,
+                         ['screen'])
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                parsed_arguments(['startup', 'bogus'])
+
+class TestLazyImports(unittest.TestCase):
+    '''Tests that the subsystems are imported by their commands only.'''
+
+    def _modules_imported(self, code):
+        process = subprocess.run([sys.executable, '-c',
+                                  code + '; print(*sorted(sys.modules))'],
+                                 stdout=subprocess.PIPE,
+                                 universal_newlines=True, check=True)
+        return set(process.stdout.split())
+
+    def test_no_subsystem_on_start(self):
+        modules = self._modules_imported('import peter, sys')
+        self.assertFalse(modules & {name for names in subsystems.values()
+                                    for name in names})
+
+    def test_report_does_not_import_html_parser(self):
+        modules = self._modules_imported(
+            "import peter, sys; peter.imported('report')")
+        self.assertIn('registry', modules)
+        self.assertNotIn('marketdata_htmlparser', modules)
+        self.assertNotIn('http_cache', modules)
+
+    def test_fetch_does_not_import_numpy(self):
+        modules = self._modules_imported(
+            "import peter, sys; peter.imported('fetch')")
+        self.assertIn('marketdata', modules)
+        self.assertFalse(modules & {'indicators', 'numpy', 'registry',
+                                    'screener'})
+
+    def test_startup_time(self):
+        imports_ms, total_ms, slowest = startup_time('import')
+        modules = self._modules_imported(
+            "import peter, sys; peter.imported('import')")
+
+        self.assertGreater(imports_ms, 0)
+        self.assertLessEqual(len(slowest), 5)
+        # top level imports of the command, whatever their timing order
+        self.assertLessEqual({name for name, ms in slowest}, modules)
+        self.assertEqual(slowest, sorted(slowest, key=lambda item: item[1],
+                                         reverse=True))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+'''
+Unit tests of the query module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+import marketdata_columnar
+import numpy
+import os
+from query import MarketDataIndex
+import tempfile
+import timeseries
+import unittest
+
+class TestMarketDataIndex(unittest.TestCase):
+    '''Tests MarketDataIndex on in-memory and on columnar market data.'''
+
+    def setUp(self):
+        self.marketdata = {
+            'DE0000000001': {
+                'Stock Exchange': 'DAX30',
+                'TeleTrader Name': 'FIRST',
+                'Market Data': timeseries.TimeSeries({
+                    datetime.datetime(2018, 7, 19, 17, 35):
+                        {'Closing Price': '10,5', 'Volume': '100'},
+                    datetime.datetime(2018, 7, 20, 12, 0):
+                        {'Closing Price': '11', 'Volume': ''},
+                    datetime.datetime(2018, 7, 20, 17, 35):
+                        {'Closing Price': '1.234,5', 'Volume': '300'},
+                    datetime.datetime(2018, 7, 23, 17, 35):
+                        {'Closing Price': '', 'Volume': '400'}})},
+            'DE0000000002': {
+                'Stock Exchange': 'Mdax',
+                'TeleTrader Name': 'SECOND',
+                'Market Data': timeseries.TimeSeries({
+                    datetime.datetime(2018, 7, 20, 17, 35):
+                        {'Closing Price': '20', 'Volume': '10'}})}}
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'market_data.col')
+        marketdata_columnar.save_to_file(self.marketdata, self.filename)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _indexes(self):
+        '''Returns the index of the market data in memory and the one loaded
+        from a columnar file.'''
+
+        return (MarketDataIndex(self.marketdata),
+                MarketDataIndex(marketdata_columnar.loaded_market_data(self.filename)))
+
+    def test_series_between_dates(self):
+        for index in self._indexes():
+            series = index.series('DE0000000001',
+                                  datetime.date(2018, 7, 20),
+                                  datetime.date(2018, 7, 23))
+            self.assertEqual(list(series.datetimes.astype(datetime.datetime)),
+                             [datetime.datetime(2018, 7, 20, 12, 0),
+                              datetime.datetime(2018, 7, 20, 17, 35),
+                              datetime.datetime(2018, 7, 23, 17, 35)])
+            numpy.testing.assert_array_equal(series.closes,
+                                             [11.0, 1234.5, numpy.nan])
+            numpy.testing.assert_array_equal(series.volumes, [-1, 300, 400])
+            self.assertFalse(series.closes.flags.writeable)
+
+            series = index.series('DE0000000001',
+                                  end=datetime.datetime(2018, 7, 20, 12, 0))
+            self.assertEqual(len(series.datetimes), 2)
+            self.assertEqual(len(index.series('DE0000000001').closes), 4)
+            with self.assertRaises(KeyError):
+                index.series('XX0000000000')
+
+    def test_cross_section(self):
+        for index in self._indexes():
+            section = index.cross_section(datetime.date(2018, 7, 20))
+            self.assertEqual(list(section.isins), ['DE0000000001', 'DE0000000002'])
+            numpy.testing.assert_array_equal(section.closes, [1234.5, 20.0])
+
+            section = index.cross_section(datetime.date(2018, 7, 19))
+            self.assertEqual(list(section.isins), ['DE0000000001'])
+            self.assertEqual(len(index.cross_section(datetime.date(2018, 7, 21)).isins),
+                             0)
+
+    def test_latest(self):
+        for index in self._indexes():
+            latest = index.latest(datetime.datetime(2018, 7, 20, 12, 0))
+            self.assertEqual(list(latest.isins), ['DE0000000001'])
+            numpy.testing.assert_array_equal(latest.closes, [11.0])
+
+            latest = index.latest(datetime.date(2018, 7, 22))
+            numpy.testing.assert_array_equal(latest.closes, [1234.5, 20.0])
+
+            latest = index.latest()
+            self.assertEqual(list(latest.datetimes.astype(datetime.datetime)),
+                             [datetime.datetime(2018, 7, 23, 17, 35),
+                              datetime.datetime(2018, 7, 20, 17, 35)])
+
+    def test_update(self):
+        index = MarketDataIndex(self.marketdata)
+        self.marketdata['DE0000000002']['Market Data'][
+            datetime.datetime(2018, 7, 23, 17, 35)] = {'Closing Price': '21',
+                                                       'Volume': '5'}
+        del self.marketdata['DE0000000001']
+        index.update(self.marketdata, ['DE0000000001', 'DE0000000002'])
+
+        self.assertEqual(index.isins, ['DE0000000002'])
+        numpy.testing.assert_array_equal(index.latest().closes, [21.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+'''
+Unit tests of the registry module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import decimal
+import os
+import pickle
+from registry import (Registry, RegistryErrorDict, RegistryRecord,
+                      _string_to_decimal, config)
+import tempfile
+import unittest
+import unittest.mock
+
+class TestRegistryRowIsAddable(unittest.TestCase):
+    '''Tests _registry_row_is_addable.'''
+
+    def setUp(self):
+        self.reg = Registry()
+
+    def test_missing_isin(self):
+        row = {'ISIN' : ''}
+        expected_errors = RegistryErrorDict()
+        expected_errors.update({'Errors found': True,
+                                'Number of missing ISINs': 1})
+        self.assertFalse(self.reg._registry_row_is_addable(row))
+        self.assertEqual(self.reg.errors, expected_errors)
+
+    def test_faulty_isin(self):
+        row = {'ISIN' : '12345678901'}
+        expected_errors = RegistryErrorDict()
+        expected_errors.update({'Errors found': True,
+                                'Faulty ISINs': set(['12345678901'])})
+
+        self.assertFalse(self.reg._registry_row_is_addable(row))
+        self.assertEqual(self.reg.errors, expected_errors)
+
+    def test_missing_name(self):
+        row = {'ISIN' : '123456789012',
+               'Name' : '',
+               'Months in Report' : '',
+               'Report Expiry Date' : '2000.01.01'}
+        expected_errors = RegistryErrorDict()
+        expected_errors.update({'Errors found': True,
+                                'Missing names': set(['123456789012'])})
+
+        self.assertTrue(self.reg._registry_row_is_addable(row))
+        self.assertEqual(self.reg.errors, expected_errors)
+
+    def test_unacceptable_months(self):
+        row = {'ISIN' : '123456789012',
+               'Name' : 'Company',
+               'Report Expiry Date' : '2000.01.01'}
+        expected_errors = RegistryErrorDict()
+        expected_errors.update({'Errors found': True,
+                                'Faulty months in report': set(['123456789012'])})
+
+        for months in ('X', '4'):
+            row['Months in Report'] = months
+            self.assertTrue(self.reg._registry_row_is_addable(row))
+            self.assertEqual(self.reg.errors, expected_errors)
+
+    def test_acceptable_months(self):
+
+        row = {'ISIN' : '123456789012',
+               'Name' : 'Company',
+               'Report Expiry Date' : '2000.01.01'}
+
+        for months in ('', '3', '6', '9', '12'):
+            row['Months in Report'] = months
+            self.assertTrue(self.reg._registry_row_is_addable(row))
+            self.assertEqual(self.reg.errors, RegistryErrorDict())
+
+    def test_unacceptable_expiry_date(self):
+        row = {'ISIN' : '123456789012',
+               'Name' : 'Company',
+               'Months in Report' : '',
+               'Report Expiry Date' : '20000.01.01'}
+        expected_errors = RegistryErrorDict()
+        expected_errors.update({'Errors found': True,
+                                'Faulty report expiry dates': set(['123456789012'])})
+        self.assertTrue(self.reg._registry_row_is_addable(row))
+        self.assertEqual(self.reg.errors, expected_errors)
+
+    def test_acceptable_expiry_dates(self):
+
+        row = {'ISIN' : '123456789012',
+               'Name' : 'Company',
+               'Months in Report' : ''}
+        for dates in ('', '2000.01.01'):
+            row['Report Expiry Date'] = dates
+            self.assertTrue(self.reg._registry_row_is_addable(row))
+            self.assertEqual(self.reg.errors, RegistryErrorDict())
+
+class TestRegistryRowFromCSV(unittest.TestCase):
+    '''Tests _registry_row_from_csv.'''
+
+    def setUp(self):
+        self.reg = Registry()
+        self.acceptable_row = {'ISIN': '123456789012',
+                               'Name' : 'Company',
+                               'EPS': '12.34',
+                               'Months in Report': '3',
+                               'Report Expiry Date': '2000.01.01',
+                               'Own Investor Link': 'http',
+                               'Stock Exchange Link': 'http'}
+        self.result_record = RegistryRecord('Company',
+                                            decimal.Decimal('12.34'),
+                                            '3',
+                                            '2000.01.01',
+                                            'http',
+                                            'http')
+
+    def test_acceptable_row(self):
+        self.assertTrue(self.reg._registry_row_is_addable(self.acceptable_row))
+        self.assertEqual(self.reg._registry_row_from_csv(self.acceptable_row),
+                         self.result_record)
+
+class TestLoadFromFile(unittest.TestCase):
+    '''Tests load_from_file with the cache.'''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'registry.csv')
+        self.cache_filename = os.path.join(self.directory.name, 'registry.cache')
+        self._write('NL0011540547;ABN AMRO;;;;;\n'
+                    'DE0005408116;Aareal Bank AG;2,08;6;2016.11.10;;\n'
+                    'NL0011540547;ABN AMRO Group;1,5;12;;;\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, content):
+        with open(self.filename, 'w', encoding=config['DEFAULT']['CSV encoding']) as f:
+            f.write('ISIN;Name;EPS;Months in Report;Report Expiry Date;'
+                    'Own Investor Link;Stock Exchange Link\n' + content)
+
+    def _loaded(self):
+        reg = Registry()
+        reg.load_from_file(self.filename, self.cache_filename)
+        return reg
+
+    def test_duplicates(self):
+        reg = self._loaded()
+
+        self.assertEqual(len(reg), 2)
+        self.assertEqual(reg['NL0011540547'].name, 'ABN AMRO Group')
+        self.assertEqual(reg['DE0005408116'].eps, decimal.Decimal('2.08'))
+        self.assertEqual(reg.errors['Duplicate ISINs'], {'NL0011540547'})
+        self.assertTrue(reg.errors['Errors found'])
+
+    def test_cache_used_while_unchanged(self):
+        expected = self._loaded()
+
+        with unittest.mock.patch.object(Registry, '_load_from_csv') as load:
+            reg = self._loaded()
+        load.assert_not_called()
+        self.assertEqual(reg, expected)
+        self.assertEqual(reg.errors, expected.errors)
+
+    def test_cache_not_used_after_change(self):
+        self._loaded()
+        self._write('DE0005408116;Aareal Bank AG;2,08;6;2016.11.10;;\n')
+
+        reg = self._loaded()
+        self.assertEqual(list(reg), ['DE0005408116'])
+        self.assertFalse(reg.errors['Errors found'])
+
+    def test_unreadable_cache_is_rebuilt(self):
+        expected = self._loaded()
+        with open(self.cache_filename, 'rb') as f:
+            truncated = f.read()[:20]
+
+        for content in (truncated,
+                        pickle.dumps(['Version', 'Key']),
+                        pickle.dumps({'Version': 1})):
+            with open(self.cache_filename, 'wb') as f:
+                f.write(content)
+
+            with self.assertLogs(level='WARNING'):
+                reg = self._loaded()
+            self.assertEqual(reg, expected)
+            with unittest.mock.patch.object(Registry, '_load_from_csv') as load:
+                self.assertEqual(self._loaded(), expected)
+            load.assert_not_called()
+
+class TestStringToDecimal(unittest.TestCase):
+    '''Tests _string_to_decimal.'''
+
+    def test_point(self):
+        self.assertEqual(_string_to_decimal('12.34'), decimal.Decimal('12.34'))
+
+    def test_comma(self):
+        self.assertEqual(_string_to_decimal('12,34'), decimal.Decimal('12.34'))
+        self.assertEqual(_string_to_decimal('-0,5'), decimal.Decimal('-0.5'))
+
+    def test_invalid(self):
+        self.assertEqual(_string_to_decimal('1,234.5'), decimal.Decimal('0'))
+        self.assertEqual(_string_to_decimal(''), decimal.Decimal('0'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+'''
+Unit tests of the registry_join module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import collections
+import datetime
+import numpy
+import registry
+from registry_join import joined
+import unittest
+
+class TestJoined(unittest.TestCase):
+    '''Tests joined.'''
+
+    def setUp(self):
+        self.registry = {
+            'DE0000000001': registry.RegistryRecord('Half Year AG', '1.5', '6',
+                                                    '2018.08.01', '', ''),
+            'DE0000000002': registry.RegistryRecord('Loss AG', '-2', '12',
+                                                    '2018.07.01', '', ''),
+            'DE0000000003': registry.RegistryRecord('Unreported AG', '0', '',
+                                                    '', '', ''),
+            'DE0000000009': registry.RegistryRecord('Delisted AG', '1', '12',
+                                                    '2018.08.01', '', '')}
+        self.latest = collections.namedtuple('Latest', ('isins', 'closes'))(
+            numpy.array(['DE0000000001', 'DE0000000002', 'DE0000000003',
+                         'DE0000000004'], dtype=object),
+            numpy.array([30.0, 10.0, 5.0, 7.0]))
+
+    def test_joined(self):
+        result = joined(self.registry, self.latest, datetime.date(2018, 7, 20))
+
+        numpy.testing.assert_array_equal(result.matched, [True, True, True, False])
+        numpy.testing.assert_array_equal(result.eps, [1.5, -2, 0, numpy.nan])
+        numpy.testing.assert_array_equal(result.annual_eps,
+                                         [3, -2, numpy.nan, numpy.nan])
+        numpy.testing.assert_array_equal(result.pe,
+                                         [10, numpy.nan, numpy.nan, numpy.nan])
+        numpy.testing.assert_array_equal(result.expired,
+                                         [False, True, False, False])
+        self.assertEqual(result.registry_only, ['DE0000000009'])
+        self.assertEqual(result.market_only, ['DE0000000004'])
+
+    def test_empty_registry(self):
+        result = joined({}, self.latest)
+
+        self.assertFalse(result.matched.any())
+        self.assertTrue(numpy.isnan(result.pe).all())
+        self.assertEqual(len(result.market_only), 4)
+
+if __name__ == '__main__':
+    unittest.main()
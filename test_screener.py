@@ -0,0 +1,163 @@
+'''
+Unit tests of the screener module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import collections
+import csv_helper
+import datetime
+import numpy
+import os
+import registry
+from screener import (Latest, Screener, ShortList, config, fast_sma,
+                      moving_average, slow_sma)
+import tempfile
+import unittest
+
+class TestScreener(unittest.TestCase):
+    '''Tests Screener.'''
+
+    def _marketdata(self, closes):
+        '''Returns a market data dict of {ISIN: {day: price}}.'''
+
+        return {isin: {'Market Data': {
+                    datetime.datetime(2018, 7, day, 17, 35):
+                        {'Closing Price': price, 'Volume': '1'}
+                    for day, price in quotes.items()}}
+                for isin, quotes in closes.items()}
+
+    def _screener(self, closes, fast, slow):
+        screener = Screener(fast=fast, slow=slow)
+        screener.load(self._marketdata(closes))
+        screener.compute()
+        return screener
+
+    def test_ragged_and_missing_days(self):
+        screener = self._screener({'A': {2: '1', 3: '2', 4: '3', 5: '4', 6: '5'},
+                                   'B': {4: '10,5', 6: '12,5'}},
+                                  fast=2, slow=3)
+
+        self.assertEqual(screener.isins, ['A', 'B'])
+        self.assertEqual(len(screener.days), 5)
+        numpy.testing.assert_array_equal(
+            screener.closes,
+            [[1, 2, 3, 4, 5],
+             [numpy.nan, numpy.nan, 10.5, 10.5, 12.5]])
+        numpy.testing.assert_array_equal(
+            screener.quoted[1], [False, False, True, False, True])
+        numpy.testing.assert_array_equal(
+            screener.fast_sma,
+            [[numpy.nan, 1.5, 2.5, 3.5, 4.5],
+             [numpy.nan, numpy.nan, numpy.nan, 10.5, 11.5]])
+        numpy.testing.assert_allclose(
+            screener.slow_sma,
+            [[numpy.nan, numpy.nan, 2, 3, 4],
+             [numpy.nan, numpy.nan, numpy.nan, numpy.nan, (10.5 + 10.5 + 12.5) / 3]])
+
+    def test_history_ending_early(self):
+        screener = self._screener({'A': {2: '1', 3: '2', 4: '3'},
+                                   'B': {2: '1', 3: '2', 4: '3', 5: '4'}},
+                                  fast=2, slow=3)
+
+        numpy.testing.assert_array_equal(screener.last_column, [2, 3])
+        numpy.testing.assert_array_equal(screener.closes[0],
+                                         [1, 2, 3, numpy.nan])
+        latest = screener.latest()
+        numpy.testing.assert_array_equal(latest.days,
+                                         numpy.array(['2018-07-04', '2018-07-05'],
+                                                     dtype='datetime64[D]'))
+        numpy.testing.assert_array_equal(latest.fast_sma, [2.5, 3.5])
+        numpy.testing.assert_array_equal(latest.slow_sma, [2, 3])
+
+    def test_window_longer_than_history(self):
+        screener = self._screener({'A': {2: '1', 3: '2'}}, fast=2, slow=3)
+
+        self.assertTrue(numpy.isnan(screener.slow_sma).all())
+        numpy.testing.assert_array_equal(screener.fast_sma, [[numpy.nan, 1.5]])
+
+    def test_random_against_loop(self):
+        random = numpy.random.default_rng(0)
+        closes = random.uniform(1, 100, (20, 60))
+        for row in closes:
+            start, end = sorted(random.integers(0, 61, 2))
+            row[:start] = numpy.nan
+            row[end:] = numpy.nan
+
+        for window in (1, 7, 21):
+            expected = numpy.full(closes.shape, numpy.nan)
+            for row in range(closes.shape[0]):
+                for column in range(window - 1, closes.shape[1]):
+                    values = closes[row, column - window + 1:column + 1]
+                    if not numpy.isnan(values).any():
+                        expected[row, column] = values.mean()
+            numpy.testing.assert_allclose(moving_average(closes, window),
+                                          expected)
+
+class TestShortList(unittest.TestCase):
+    '''Tests ShortList.'''
+
+    class Source(object):
+        def latest(self):
+            return Latest(numpy.array(['ABOVE', 'IN', 'BELOW', 'SHORT', 'LOSS',
+                                       'EXPIRED', 'HELD'], dtype=object),
+                          numpy.full(7, numpy.datetime64('2018-07-20')),
+                          numpy.array([12, 10, 8, 10, 8, 8, 12], dtype=float),
+                          numpy.array([11, 9, 9, 9, 9, 9, 11], dtype=float),
+                          numpy.array([9, 11, 11, numpy.nan, 11, 11, 9]))
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'shortlist.csv')
+        self.registry = {
+            'LOSS': registry.RegistryRecord('Loss AG', -1, '12', '', '', ''),
+            'EXPIRED': registry.RegistryRecord('Expired AG', 1, '12',
+                                               '2000.01.01', '', ''),
+            'BELOW': registry.RegistryRecord('Below AG', 1, '12', '2100.01.01',
+                                             '', '')}
+        self.shown = collections.OrderedDict([('Above TAZ', False),
+                                              ('In TAZ', True),
+                                              ('Below TAZ', True),
+                                              ('Losses', False),
+                                              ('Expired Data', False),
+                                              ('Position', True)])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _passing(self, **shown):
+        self.shown.update(shown)
+        shortlist = ShortList(self.registry, {'HELD'}, self.shown)
+        shortlist.assemble(self.Source())
+        return list(shortlist.latest.isins[shortlist.passing])
+
+    def test_default_filters(self):
+        self.assertEqual(self._passing(), ['IN', 'BELOW', 'HELD'])
+
+    def test_enabled_filters(self):
+        self.assertEqual(self._passing(**{'Above TAZ': True, 'Losses': True,
+                                          'Expired Data': True}),
+                         ['ABOVE', 'IN', 'BELOW', 'LOSS', 'EXPIRED', 'HELD'])
+
+    def test_hidden_position(self):
+        self.assertEqual(self._passing(**{'Above TAZ': True, 'Position': False}),
+                         ['ABOVE', 'IN', 'BELOW'])
+
+    def test_save_to_file(self):
+        shortlist = ShortList(self.registry, {'HELD'}, self.shown)
+        shortlist.assemble(self.Source())
+        shortlist.save_to_file(self.filename)
+
+        rows = csv_helper.reader(self.filename,
+                                 encoding=config['DEFAULT']['CSV encoding'])
+        self.assertEqual([row['ISIN'] for row in rows], ['IN', 'BELOW', 'HELD'])
+        self.assertEqual(rows[1],
+                         {'ISIN': 'BELOW', 'Name': 'Below AG',
+                          'Date': '2018-07-20', 'Closing Price': '8,00',
+                          'Fast SMA': '9,00', 'Slow SMA': '11,00',
+                          'P/E': '8,00',
+                          'Above TAZ': '0', 'In TAZ': '0', 'Below TAZ': '1',
+                          'Losses': '0', 'Expired Data': '0', 'Position': '0'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+'''
+Unit tests of the settings module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import os
+from settings import LazyConfig
+import tempfile
+import unittest
+
+class TestLazyConfig(unittest.TestCase):
+    '''Tests LazyConfig.'''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'config.ini')
+        self._write('7')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, fast):
+        with open(self.filename, 'w') as f:
+            f.write('[Screening]\nFast SMA = {}\n'.format(fast))
+
+    def test_file_is_read_on_first_access_only(self):
+        config = LazyConfig(self.filename)
+        self._write('5')
+        self.assertEqual(config['Screening'].getint('Fast SMA'), 5)
+
+        self._write('3')
+        self.assertEqual(config['Screening'].getint('Fast SMA'), 5)
+        self.assertIn('Screening', config)
+        self.assertEqual(config.sections(), ['Screening'])
+
+    def test_reload(self):
+        config = LazyConfig(self.filename)
+        self.assertEqual(config['Screening'].getint('Fast SMA'), 7)
+
+        self._write('3')
+        config.reload()
+        self.assertEqual(config['Screening'].getint('Fast SMA'), 3)
+
+    def test_missing_file_is_empty(self):
+        config = LazyConfig(os.path.join(self.directory.name, 'missing.ini'))
+        with self.assertLogs(level='WARNING'):
+            self.assertNotIn('Screening', config)
+
+if __name__ == '__main__':
+    unittest.main()
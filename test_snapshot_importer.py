@@ -0,0 +1,62 @@
+'''
+Unit tests of the snapshot_importer module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+import marketdata
+import os
+from snapshot_importer import _encoding, import_directory
+import tempfile
+import unittest
+
+class TestImportDirectory(unittest.TestCase):
+    '''Tests import_directory.'''
+
+    header = ('Name,ISIN,Closing Price,DateTime,Volumen,'
+              'Previous Day Closing Price,Stock Exchange\n')
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self._write('2018-07-20-17-39.csv',
+                    '"KRONES AG O.N.",,106.9,7/19/2018 5:35:00 PM,30964,106.8,Mdax\n'
+                    '"KRONES AG O.N.",,107.1,7/20/2018 1:00:00 PM,100,106.9,Mdax\n'
+                    '"UNKNOWN &amp; CO",,"1,234.5",7/20/2018 5:35:00 PM,1,1,File #3\n')
+        self._write('2018-07-23-17-39.csv',
+                    '"KRONES AG O.N.",,107.5,7/20/2018 5:35:00 PM,200,106.9,Mdax\n'
+                    '"KRONES AG O.N.",,108,7/23/2018 5:35:00 PM,300,107.5,Mdax\n')
+        self._write('notes.csv', 'not a snapshot\n')
+
+        self.market_data = marketdata.MarketData()
+        self.market_data.converter.ttnames2isin = {'KRONES AG O.N.': 'DE0006335003'}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, filename, content):
+        with open(os.path.join(self.directory.name, filename), 'w',
+                  encoding=_encoding) as f:
+            f.write(self.header + content)
+
+    def test_import(self):
+        rows, rate = import_directory(self.market_data, self.directory.name,
+                                      workers=2)
+
+        self.assertEqual(rows, 5)
+        self.assertEqual(
+            list(self.market_data.marketdata['DE0006335003']['Market Data'].items()),
+            [(datetime.datetime(2018, 7, 19, 17, 35),
+              {'Closing Price': '106,9', 'Volume': '30964'}),
+             (datetime.datetime(2018, 7, 20, 17, 35),
+              {'Closing Price': '107,5', 'Volume': '200'}),
+             (datetime.datetime(2018, 7, 23, 17, 35),
+              {'Closing Price': '108', 'Volume': '300'})])
+        self.assertEqual(
+            self.market_data.marketdata['UNKNOWN & CO']['Market Data'][
+                datetime.datetime(2018, 7, 20, 17, 35)],
+            {'Closing Price': '1234,5', 'Volume': '1'})
+        self.assertEqual(self.market_data.converter.missing_names, {'UNKNOWN & CO'})
+
+if __name__ == '__main__':
+    unittest.main()
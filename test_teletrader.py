@@ -0,0 +1,131 @@
+'''
+Unit tests of the teletrader module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import csv_helper
+import html
+import os
+from teletrader import (TTConverter, TeletraderHTMLParser, _compiled_pattern,
+                        _csv_encoding, _row_completed, _row_dropped)
+import tempfile
+import unittest
+
+class TestTeletraderHTMLParser(unittest.TestCase):
+    '''Tests TeletraderHTMLParser.'''
+
+    row = ('<tr><td title="x"><div><a href="#">{}</a></div></td>'
+           '<td class="aright"><div>{}</div></td>'
+           '<td><img src="trend_up.gif"></td>'
+           '<td><span>0,10</span></td><td><span>0,09%</span></td>'
+           '<td><div>{}</div></td><td><div><div>{}</div></div></td>'
+           '<td><div>106,80</div></td></tr>')
+
+    def _parsed(self, html):
+        t = TeletraderHTMLParser('Mdax')
+        t.feed(html)
+        t.close()
+        return t.stocks
+
+    def test_rows(self):
+        html = ('<table><tr><th>Name</th></tr>'
+                + self.row.format('KRONES AG O.N.', '106,90', '07.14./17:35', '30964')
+                + self.row.format('RATIONAL AG', '517,40', '07.14./17:35', '9775')
+                + '</table>')
+
+        self.assertEqual(self._parsed(html),
+                         [['KRONES AG O.N.', '106,90', '07.14./17:35', '30964', 'Mdax'],
+                          ['RATIONAL AG', '517,40', '07.14./17:35', '9775', 'Mdax']])
+
+    def test_incomplete_row_is_dropped(self):
+        html = ('<tr><td>NO PRICE</td><td></td><td></td></tr>'
+                + self.row.format('KRONES AG O.N.', '106,90', '07.14./17:35', '30964'))
+
+        self.assertEqual(self._parsed(html),
+                         [['KRONES AG O.N.', '106,90', '07.14./17:35', '30964', 'Mdax']])
+
+    def test_exp_htm(self):
+        with open('exp.htm', encoding='utf-8') as f:
+            stocks = self._parsed(f.read())
+
+        self.assertEqual(len(stocks), 50)
+        self.assertEqual(stocks[0], ['RATIONAL AG', '517,40', '07.14./17:35',
+                                     '9775', 'Mdax'])
+
+    def test_compiled_pattern(self):
+        tag_codes, start_table, end_table, data_table = _compiled_pattern(
+            (('start', 'tr'), ('data', 'read'), ('end', 'tr')))
+
+        self.assertEqual(tag_codes, {'tr': 1})
+        self.assertEqual(start_table, ((0, 1), (1, 1), (2, 2)))
+        self.assertEqual(end_table, ((0, _row_dropped),
+                                     (1, _row_dropped),
+                                     (2, _row_completed)))
+        self.assertEqual(data_table, (False, True, False))
+
+class TestTTConverter(unittest.TestCase):
+    '''Tests TTConverter.'''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'ISIN.csv')
+        self.resolved_filename = os.path.join(self.directory.name,
+                                              'ISIN.resolved.csv')
+        with open(self.filename, 'w', encoding=_csv_encoding) as f:
+            f.write('TeleTrader Name;ISIN\n'
+                    '1+1 DRILLISCH AG ...;DE0005545503\n'
+                    'ADO PROPERTIES S....;LU1250154413\n'
+                    'HAPAG-LLOYD AG NA\u2026;DE000HLAG475\n'
+                    'AT&S Austria Tech...;AT0000969985\n'
+                    'AT&S AUSTRIA TECH...;AT0000969985\n'
+                    'DELIVERY HERO AG ...;DE000A2E4K43\n'
+                    'DELIVERY HERO AG ...X;DE0000000000\n'
+                    'EVONIK INDUSTRIES AG;DE000EVNK013\n'
+                    'SAME NAME AG;DE0000000001\n'
+                    'Same Name AG;DE0000000002\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _converter(self):
+        return TTConverter(self.filename, self.resolved_filename)
+
+    def test_exact(self):
+        converter = self._converter()
+        self.assertEqual(converter['EVONIK INDUSTRIES AG'], 'DE000EVNK013')
+        self.assertEqual(converter.newly_resolved, {})
+
+    def test_normalised(self):
+        converter = self._converter()
+        self.assertEqual(converter['Evonik  Industries AG'], 'DE000EVNK013')
+        self.assertEqual(converter['SAME NAME  AG'], 'SAME NAME  AG')
+        self.assertEqual(converter.missing_names, {'SAME NAME  AG'})
+
+    def test_prefix(self):
+        converter = self._converter()
+        self.assertEqual(converter['1+1 DRILLISCH AG O.N.'], 'DE0005545503')
+        self.assertEqual(converter['ADO PROPERTIES S.A. NPV'], 'LU1250154413')
+        self.assertEqual(converter['HAPAG-LLOYD AG NA O.N.'], 'DE000HLAG475')
+        self.assertEqual(converter['AT&amp;S AUSTRIA TECH.&SYSTEMTECH.'],
+                         'AT0000969985')
+        self.assertEqual(converter['DELIVERY HERO SE NA O.N.'],
+                         'DELIVERY HERO SE NA O.N.')
+
+    def test_resolved_names_saved(self):
+        converter = self._converter()
+        converter['1+1 DRILLISCH AG O.N.']
+        converter['ADO PROPERTIES S.A. NPV']
+        converter.save_resolved()
+        converter['Evonik Industries AG']
+        converter.save_resolved()
+
+        converter = self._converter()
+        converter._resolved = None
+        self.assertEqual(converter['1+1 DRILLISCH AG O.N.'], 'DE0005545503')
+        self.assertEqual(converter['Evonik Industries AG'], 'DE000EVNK013')
+        self.assertEqual(len(csv_helper.reader(self.resolved_filename,
+                                               encoding=_csv_encoding)), 3)
+
+if __name__ == '__main__':
+    unittest.main()
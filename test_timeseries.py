@@ -0,0 +1,143 @@
+'''
+Unit tests of the timeseries module.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import datetime
+import random
+import timeseries
+from timeseries import TimeSeries, _bisect_merge_limit
+import unittest
+import unittest.mock
+
+class TestMerge(unittest.TestCase):
+    '''Tests TimeSeries.merge.'''
+
+    def setUp(self):
+        self.series = TimeSeries({
+            datetime.datetime(2017, 7, 12, 17, 35): 'existing 12',
+            datetime.datetime(2017, 7, 13, 12, 0): 'existing 13',
+            datetime.datetime(2017, 7, 14, 17, 35): 'existing 14'})
+
+    def _check(self, quotes, expected_added, expected):
+        # both the bisecting and the linear merge
+        for limit in (_bisect_merge_limit, 0):
+            with unittest.mock.patch.object(timeseries,
+                                            '_bisect_merge_limit',
+                                            limit):
+                series = TimeSeries(dict(self.series))
+                self.assertEqual(series.merge(quotes), expected_added)
+                self.assertEqual(list(series.items()), expected)
+
+    def test_discard_same_day_later_or_equal(self):
+        self._check([(datetime.datetime(2017, 7, 14, 17, 0), 'new'),
+                     (datetime.datetime(2017, 7, 14, 17, 35), 'new')],
+                    [],
+                    list(self.series.items()))
+
+    def test_update_same_day_earlier(self):
+        self._check([(datetime.datetime(2017, 7, 13, 17, 35), 'new 13')],
+                    [datetime.datetime(2017, 7, 13, 17, 35)],
+                    [(datetime.datetime(2017, 7, 12, 17, 35), 'existing 12'),
+                     (datetime.datetime(2017, 7, 13, 17, 35), 'new 13'),
+                     (datetime.datetime(2017, 7, 14, 17, 35), 'existing 14')])
+
+    def test_insert_new_days(self):
+        self._check([(datetime.datetime(2017, 7, 17, 17, 35), 'new 17'),
+                     (datetime.datetime(2017, 7, 11, 17, 35), 'new 11'),
+                     (datetime.datetime(2017, 7, 17, 12, 0), 'early 17')],
+                    [datetime.datetime(2017, 7, 11, 17, 35),
+                     datetime.datetime(2017, 7, 17, 17, 35)],
+                    [(datetime.datetime(2017, 7, 11, 17, 35), 'new 11'),
+                     (datetime.datetime(2017, 7, 12, 17, 35), 'existing 12'),
+                     (datetime.datetime(2017, 7, 13, 12, 0), 'existing 13'),
+                     (datetime.datetime(2017, 7, 14, 17, 35), 'existing 14'),
+                     (datetime.datetime(2017, 7, 17, 17, 35), 'new 17')])
+
+    def test_replace_day(self):
+        self.series.replace_day(datetime.datetime(2017, 7, 13, 9, 0), 'new 13')
+        self.assertEqual(list(self.series),
+                         [datetime.datetime(2017, 7, 12, 17, 35),
+                          datetime.datetime(2017, 7, 13, 9, 0),
+                          datetime.datetime(2017, 7, 14, 17, 35)])
+
+    def test_prune_before(self):
+        self.assertEqual(
+            self.series.prune_before(datetime.datetime(2017, 7, 13, 12, 0)), 1)
+        self.assertEqual(list(self.series),
+                         [datetime.datetime(2017, 7, 13, 12, 0),
+                          datetime.datetime(2017, 7, 14, 17, 35)])
+        self.assertEqual(self.series.prune_before(datetime.datetime(2018, 1, 1)), 2)
+        self.assertFalse(self.series)
+
+    def test_position(self):
+        this_datetime = datetime.datetime(2017, 7, 13, 12, 0)
+        self.assertEqual(self.series.position(this_datetime), 1)
+        self.assertEqual(self.series.items_from(1),
+                         [(this_datetime, 'existing 13'),
+                          (datetime.datetime(2017, 7, 14, 17, 35), 'existing 14')])
+        self.assertEqual(self.series.items_from(3), [])
+
+    def test_dict_behaviour(self):
+        del self.series[datetime.datetime(2017, 7, 13, 12, 0)]
+        self.series[datetime.datetime(2017, 7, 1)] = 'first'
+        self.assertEqual(list(self.series),
+                         [datetime.datetime(2017, 7, 1),
+                          datetime.datetime(2017, 7, 12, 17, 35),
+                          datetime.datetime(2017, 7, 14, 17, 35)])
+        self.assertNotIn(datetime.datetime(2017, 7, 13, 12, 0), self.series)
+
+class TestMergeAgainstOneAtATime(unittest.TestCase):
+    '''Compares TimeSeries.merge with the former MarketData.append, which
+    applied the same-day rules to one quote at a time.'''
+
+    def _merged_one_at_a_time(self, existing, quotes):
+        '''Returns the quotes merged into the existing dict by the former
+        loop, except that a quote older than every existing one is inserted
+        instead of dropped.'''
+
+        merged = dict(existing)
+        for addable_datetime, quote in quotes:
+            for existing_datetime in sorted(merged, reverse=True):
+                same_day = existing_datetime.date() == addable_datetime.date()
+                if same_day and existing_datetime >= addable_datetime:
+                    break
+                if existing_datetime < addable_datetime:
+                    if same_day:
+                        del merged[existing_datetime]
+                    merged[addable_datetime] = quote
+                    break
+            else:
+                merged[addable_datetime] = quote
+        return sorted(merged.items())
+
+    def _random_datetimes(self, rng, count):
+        return [datetime.datetime(2017, 7, rng.randint(1, 20),
+                                  rng.randint(9, 17), rng.choice((0, 35)))
+                for _ in range(count)]
+
+    def test_random_batches(self):
+        rng = random.Random(0)
+        for batch in range(3000):
+            existing = {this_datetime: 'existing'
+                        for this_datetime in self._random_datetimes(
+                            rng, rng.randint(0, 15))}
+            # one quote per day and time in a batch, as on the pages
+            quotes = list({this_datetime: 'new {}'.format(number)
+                           for number, this_datetime in enumerate(
+                               self._random_datetimes(rng, rng.randint(1, 15)))
+                           }.items())
+            expected = self._merged_one_at_a_time(existing, quotes)
+
+            for limit in (_bisect_merge_limit, 0):
+                with unittest.mock.patch.object(timeseries,
+                                                '_bisect_merge_limit',
+                                                limit):
+                    series = TimeSeries(existing)
+                    series.merge(quotes)
+                    self.assertEqual(list(series.items()), expected,
+                                     'batch {}'.format(batch))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+'''
+Library to provide the ordered time series of one ISIN's market data.
+'''
+
+__last_change__ = '2026.10.18.'
+
+import bisect
+import collections.abc
+import datetime
+import operator
+import sys
+
+# below this number of incoming days bisecting each one is cheaper than
+# merging the whole series
+_bisect_merge_limit = 16
+
+class TimeSeries(collections.abc.MutableMapping):
+    '''
+    The market data of one ISIN: datetime -> {'Closing Price', 'Volume'}.
+
+    Behaves as a dict, but the datetimes are kept sorted, so the quotes of a
+    day are found by binary search and batches are merged in one pass.
+    '''
+
+    def __init__(self, quotes=None):
+        self._values = dict(quotes) if quotes is not None else {}
+        self._keys = sorted(self._values)
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __reversed__(self):
+        return reversed(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __setitem__(self, key, value):
+        if key not in self._values:
+            bisect.insort(self._keys, key)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        del self._values[key]
+        del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def __repr__(self):
+        return 'TimeSeries({!r})'.format(
+            {key: self._values[key] for key in self._keys})
+
+    def position(self, this_datetime):
+        '''Returns the number of datetimes before the given one.'''
+
+        return bisect.bisect_left(self._keys, this_datetime)
+
+    def items_from(self, index):
+        '''Returns the (datetime, quote) pairs from the given position on.'''
+
+        return [(this_datetime, self._values[this_datetime])
+                for this_datetime in self._keys[index:]]
+
+    def day_slice(self, day):
+        '''Returns the (start, end) positions of the datetimes on the given
+        date.'''
+
+        start = datetime.datetime.combine(day, datetime.time.min)
+        return (bisect.bisect_left(self._keys, start),
+                bisect.bisect_left(self._keys,
+                                   start + datetime.timedelta(days=1)))
+
+    def replace_day(self, this_datetime, quote):
+        '''Stores the quote and deletes every other quote of the same day.'''
+
+        start, end = self.day_slice(this_datetime.date())
+        for existing_datetime in self._keys[start:end]:
+            del self._values[existing_datetime]
+        self._keys[start:end] = [this_datetime]
+        self._values[this_datetime] = quote
+
+    def prune_before(self, cutoff):
+        '''Deletes the quotes older than the cutoff datetime in one step and
+        returns their number.'''
+
+        index = bisect.bisect_left(self._keys, cutoff)
+        for expired_datetime in self._keys[:index]:
+            del self._values[expired_datetime]
+        del self._keys[:index]
+        return index
+
+    def merge(self, quotes):
+        '''
+        Merges a batch of quotes (a dict or (datetime, quote) pairs) and
+        returns the list of datetimes added.
+
+        The rules per day are the same as for one quote at a time:
+        - discard: the day already has a quote at the same time or later,
+        - update: the day has only earlier quotes, the latest one of them is
+          replaced,
+        - insert: the day has no quote yet.
+        '''
+
+        if isinstance(quotes, collections.abc.Mapping):
+            quotes = quotes.items()
+
+        # only the latest quote of a day can survive the rules
+        latest = []
+        for this_datetime, quote in sorted(quotes, key=operator.itemgetter(0)):
+            if latest and latest[-1][0].date() == this_datetime.date():
+                latest[-1] = (this_datetime, quote)
+            else:
+                latest.append((this_datetime, quote))
+
+        if len(latest) < _bisect_merge_limit:
+            return [this_datetime
+                    for this_datetime, quote in latest
+                    if self._merge_one(this_datetime, quote)]
+        return self._merge_sorted(latest)
+
+    def _merge_one(self, this_datetime, quote):
+        '''Merges one quote, finding its day by binary search. Returns True
+        if the quote is added.'''
+
+        start, end = self.day_slice(this_datetime.date())
+        if start == end:
+            self._keys.insert(start, this_datetime)
+        elif self._keys[end - 1] >= this_datetime:
+            return False
+        else:
+            del self._values[self._keys[end - 1]]
+            self._keys[end - 1] = this_datetime
+        self._values[this_datetime] = quote
+        return True
+
+    def _merge_sorted(self, latest):
+        '''Merges the sorted quotes (at most one per day) into the series in
+        one linear pass. Returns the list of datetimes added.'''
+
+        keys = self._keys
+        merged_keys = []
+        added = []
+        index = 0
+
+        for this_datetime, quote in latest:
+            day = this_datetime.date()
+            while index < len(keys) and keys[index].date() < day:
+                merged_keys.append(keys[index])
+                index += 1
+            day_end = index
+            while day_end < len(keys) and keys[day_end].date() == day:
+                day_end += 1
+
+            if day_end > index and keys[day_end - 1] >= this_datetime:
+                merged_keys.extend(keys[index:day_end])
+            else:
+                if day_end > index:
+                    merged_keys.extend(keys[index:day_end - 1])
+                    del self._values[keys[day_end - 1]]
+                merged_keys.append(this_datetime)
+                self._values[this_datetime] = quote
+                added.append(this_datetime)
+            index = day_end
+
+        merged_keys.extend(keys[index:])
+        self._keys = merged_keys
+        return added
+
+def main():
+    pass
+
+if __name__ == '__main__':
+    sys.exit(main())